@@ -0,0 +1 @@
+# analytics 패키지
@@ -0,0 +1,264 @@
+"""
+Payment Server 결제 분석
+결제 데이터를 컬럼 배열(NumPy)로 유지하고 구간별 집계를 벡터 연산으로 계산합니다.
+"""
+from typing import Dict, Any, List
+import logging
+
+import numpy as np
+
+from storage.payment_backend import PAYMENT_STATUSES
+from storage.payment_storage import payment_storage
+from utils.payment_utils import iso_to_epoch_ns, epoch_ns_to_iso
+
+log = logging.getLogger("payment_analytics")
+
+_STATUS_CODES = {status: code for code, status in enumerate(PAYMENT_STATUSES)}
+_UNKNOWN_STATUS = -1
+_COMPLETED = _STATUS_CODES["PAYMENT_COMPLETED"]
+_MISSING_NS = -1  # confirmed_at 없음
+_LATENCY_PERCENTILES = (50, 90, 95, 99)
+_DENSE_USER_ID_LIMIT = 1 << 16  # 배열 인덱스로 바로 합산할 user_id 상한 (배열 1개 512KB)
+MAX_THROUGHPUT_BUCKETS = 10_000  # 처리량 버킷 수 상한 (넘으면 AnalyticsWindowTooLarge)
+
+
+class AnalyticsWindowTooLarge(ValueError):
+    """처리량 버킷 수가 MAX_THROUGHPUT_BUCKETS를 넘는 조회 (구간을 줄이거나 bucket_sec를 키워야 함)"""
+
+
+class PaymentColumns:
+    """결제 컬럼 저장소 (amount/status/user_id/created_at/confirmed_at)"""
+
+    def __init__(self, capacity: int = 1024):
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        # 행은 생성 순서대로 추가되므로 created_ns는 보통 정렬 상태 (구간 조회 시 searchsorted 사용)
+        self._created_sorted = True
+        self._amount = np.zeros(capacity, dtype=np.int64)
+        self._status = np.zeros(capacity, dtype=np.int8)
+        self._user_id = np.zeros(capacity, dtype=np.int64)
+        self._created_ns = np.zeros(capacity, dtype=np.int64)
+        self._confirmed_ns = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self) -> None:
+        """용량 2배 확장 (추가 비용 amortized O(1))"""
+        capacity = len(self._amount) * 2
+        for name in ("_amount", "_status", "_user_id", "_created_ns", "_confirmed_ns"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def observe(self, payment: Dict[str, Any]) -> None:
+        """저장소 변경 반영 (PaymentStorage 구독자)"""
+        payment_id = payment["payment_id"]
+        row = self._rows.get(payment_id)
+        if row is None:
+            if self._size == len(self._amount):
+                self._grow()
+            row = self._size
+            self._rows[payment_id] = row
+            self._size += 1
+
+        created_ns = iso_to_epoch_ns(payment["created_at"])
+        confirmed_at = payment.get("confirmed_at")
+        self._amount[row] = payment["amount"]
+        self._status[row] = _STATUS_CODES.get(payment["status"], _UNKNOWN_STATUS)
+        self._user_id[row] = payment["user_id"]
+        self._created_ns[row] = created_ns
+        self._confirmed_ns[row] = iso_to_epoch_ns(confirmed_at) if confirmed_at else _MISSING_NS
+
+        if self._created_sorted and (
+            (row > 0 and self._created_ns[row - 1] > created_ns)
+            or (row < self._size - 1 and self._created_ns[row + 1] < created_ns)
+        ):
+            self._created_sorted = False
+
+    def _window(self, start_ns: int | None, end_ns: int | None) -> slice | np.ndarray:
+        """created_at [start_ns, end_ns) 구간 선택자"""
+        created = self._created_ns[: self._size]
+        if self._created_sorted:
+            lo = 0 if start_ns is None else int(np.searchsorted(created, start_ns, side="left"))
+            hi = self._size if end_ns is None else int(np.searchsorted(created, end_ns, side="left"))
+            return slice(lo, hi)
+        mask = np.ones(self._size, dtype=bool)
+        if start_ns is not None:
+            mask &= created >= start_ns
+        if end_ns is not None:
+            mask &= created < end_ns
+        return mask
+
+    def summarize(
+        self,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+        bucket_sec: int = 60,
+        top_n: int = 10,
+    ) -> Dict[str, Any]:
+        """created_at 구간 내 결제 집계"""
+        selector = self._window(start_ns, end_ns)
+        amount = self._amount[: self._size][selector]
+        status = self._status[: self._size][selector]
+        user_id = self._user_id[: self._size][selector]
+        created = self._created_ns[: self._size][selector]
+        confirmed = self._confirmed_ns[: self._size][selector]
+        completed = status == _COMPLETED
+
+        return {
+            "window": {
+                "since": epoch_ns_to_iso(start_ns) if start_ns is not None else None,
+                "until": epoch_ns_to_iso(end_ns) if end_ns is not None else None,
+                "count": int(len(amount)),
+            },
+            "by_status": self._by_status(amount, status),
+            "throughput": self._throughput(created, confirmed[completed], start_ns, bucket_sec),
+            "completion_latency_ms": self._latency(created[completed], confirmed[completed]),
+            "top_users": self._top_users(user_id[completed], amount[completed], top_n),
+        }
+
+    @staticmethod
+    def _by_status(amount: np.ndarray, status: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """상태별 건수/금액 합계 (금액은 int64로 합산 - float 가중치는 2^53 이상에서 부정확)"""
+        known = status >= 0
+        codes = status[known].astype(np.intp)
+        counts = np.bincount(codes, minlength=len(_STATUS_CODES))
+        totals = np.zeros(len(_STATUS_CODES), dtype=np.int64)
+        np.add.at(totals, codes, amount[known])
+        return {
+            status_name: {"count": int(counts[code]), "amount": int(totals[code])}
+            for status_name, code in _STATUS_CODES.items()
+        }
+
+    @staticmethod
+    def _throughput(
+        created: np.ndarray, confirmed: np.ndarray, start_ns: int | None, bucket_sec: int
+    ) -> List[Dict[str, Any]]:
+        """
+        bucket_sec 단위 생성/완료 건수 (비어있지 않은 버킷만)
+
+        버킷은 구간 시작이 아니라 실제 첫 결제 시각부터 세므로 since를 아주 이르게 줘도 배열이 커지지 않고,
+        그래도 버킷 수가 MAX_THROUGHPUT_BUCKETS를 넘으면 AnalyticsWindowTooLarge를 발생시킵니다.
+        """
+        if len(created) == 0:
+            return []
+        bucket_ns = bucket_sec * 1_000_000_000
+        origin = int(created.min())
+        if start_ns is not None:
+            origin = max(origin, start_ns)
+        origin -= origin % bucket_ns
+
+        last = max(int(created.max()), int(confirmed.max(initial=origin)))
+        length = (last - origin) // bucket_ns + 1
+        if length > MAX_THROUGHPUT_BUCKETS:
+            raise AnalyticsWindowTooLarge(
+                f"처리량 버킷이 {length}개로 상한({MAX_THROUGHPUT_BUCKETS})을 넘습니다 - bucket_sec를 늘리거나 구간을 줄이세요"
+            )
+
+        created_buckets = (created - origin) // bucket_ns
+        confirmed_buckets = (confirmed - origin) // bucket_ns
+        confirmed_buckets = confirmed_buckets[confirmed_buckets >= 0]
+
+        created_counts = np.bincount(created_buckets, minlength=length)
+        completed_counts = np.bincount(confirmed_buckets, minlength=length)
+        return [
+            {
+                "bucket": epoch_ns_to_iso(origin + int(i) * bucket_ns),
+                "created": int(created_counts[i]),
+                "completed": int(completed_counts[i]),
+            }
+            for i in np.flatnonzero(created_counts | completed_counts)
+        ]
+
+    @staticmethod
+    def _latency(created: np.ndarray, confirmed: np.ndarray) -> Dict[str, float] | None:
+        """완료 지연(confirmed_at - created_at) 백분위수 (ms)"""
+        valid = confirmed != _MISSING_NS
+        if not valid.any():
+            return None
+        latency_ms = (confirmed[valid] - created[valid]) / 1_000_000
+        percentiles = np.percentile(latency_ms, _LATENCY_PERCENTILES)
+        result = {f"p{p}": round(float(v), 3) for p, v in zip(_LATENCY_PERCENTILES, percentiles)}
+        result["mean"] = round(float(latency_ms.mean()), 3)
+        result["max"] = round(float(latency_ms.max()), 3)
+        result["count"] = int(len(latency_ms))
+        return result
+
+    @staticmethod
+    def _top_users(user_id: np.ndarray, amount: np.ndarray, top_n: int) -> List[Dict[str, int]]:
+        """완료 금액 기준 상위 사용자"""
+        if len(user_id) == 0 or top_n <= 0:
+            return []
+        low, high = int(user_id.min()), int(user_id.max())
+        if low >= 0 and high < _DENSE_USER_ID_LIMIT:
+            # user_id가 작은 정수 범위면 정렬 없이 user_id 인덱스로 합산 (int64 누적으로 금액 정확히 유지)
+            volume_by_user = np.zeros(high + 1, dtype=np.int64)
+            np.add.at(volume_by_user, user_id, amount)
+            counts_by_user = np.bincount(user_id)
+            users = np.flatnonzero(counts_by_user)
+            volume = volume_by_user[users]
+            counts = counts_by_user[users]
+        else:
+            order = np.argsort(user_id, kind="stable")
+            sorted_users = user_id[order]
+            starts = np.flatnonzero(np.r_[True, sorted_users[1:] != sorted_users[:-1]])
+            users = sorted_users[starts]
+            volume = np.add.reduceat(amount[order], starts)
+            counts = np.diff(np.r_[starts, len(sorted_users)])
+
+        k = min(top_n, len(users))
+        top = np.argpartition(-volume, k - 1)[:k]
+        top = top[np.argsort(-volume[top], kind="stable")]
+        return [
+            {"user_id": int(users[i]), "amount": int(volume[i]), "count": int(counts[i])}
+            for i in top
+        ]
+
+
+def merge_summaries(parts: List[Dict[str, Any]], top_n: int) -> Dict[str, Any]:
+    """
+    샤드별 summarize 결과 합치기 (샤드 모드 프런트용)
+
+    건수/금액/처리량 버킷은 정확히 합산합니다 (버킷 경계는 epoch 기준 bucket_sec 배수라 샤드 간에 같음).
+    완료 지연의 평균은 건수로 가중 평균하고 백분위수는 샤드별 값 중 최댓값(상한)을 사용합니다.
+    상위 사용자는 샤드별 상위 top_n을 합산해 다시 고르므로, 여러 샤드에 나뉜 사용자의 순위는 근사입니다.
+    """
+    by_status = {status_name: {"count": 0, "amount": 0} for status_name in _STATUS_CODES}
+    buckets: Dict[str, Dict[str, int]] = {}
+    users: Dict[int, Dict[str, int]] = {}
+    latencies = [part["completion_latency_ms"] for part in parts if part["completion_latency_ms"]]
+    for part in parts:
+        for status_name, totals in part["by_status"].items():
+            by_status[status_name]["count"] += totals["count"]
+            by_status[status_name]["amount"] += totals["amount"]
+        for bucket in part["throughput"]:
+            merged = buckets.setdefault(bucket["bucket"], {"bucket": bucket["bucket"], "created": 0, "completed": 0})
+            merged["created"] += bucket["created"]
+            merged["completed"] += bucket["completed"]
+        for user in part["top_users"]:
+            merged = users.setdefault(user["user_id"], {"user_id": user["user_id"], "amount": 0, "count": 0})
+            merged["amount"] += user["amount"]
+            merged["count"] += user["count"]
+
+    latency = None
+    if latencies:
+        count = sum(item["count"] for item in latencies)
+        latency = {f"p{p}": max(item[f"p{p}"] for item in latencies) for p in _LATENCY_PERCENTILES}
+        latency["mean"] = round(sum(item["mean"] * item["count"] for item in latencies) / count, 3)
+        latency["max"] = max(item["max"] for item in latencies)
+        latency["count"] = count
+
+    return {
+        "window": {**parts[0]["window"], "count": sum(part["window"]["count"] for part in parts)},
+        "by_status": by_status,
+        "throughput": [buckets[key] for key in sorted(buckets)],
+        "completion_latency_ms": latency,
+        "top_users": sorted(users.values(), key=lambda user: -user["amount"])[:top_n],
+    }
+
+
+# 전역 분석 컬럼 인스턴스 (저장소 변경 구독)
+payment_columns = PaymentColumns()
+payment_storage.subscribe(payment_columns.observe)
@@ -0,0 +1,189 @@
+"""
+응답 압축 벤치마크
+
+결제 수별로 인메모리 저장소(PaymentStorage)를 채우고 라우트와 같은 함수로 결제 목록(JSON)과
+내보내기(NDJSON) 응답 본문을 만들어 압축 방식마다 다음을 비교합니다.
+- 크기/압축률, 압축·해제 시간 (MB/s)
+- --mbps 링크로 보낼 때 예상 전송 시간과 (압축 + 전송 + 해제) 합계
+
+캐시된 목록 응답은 세대마다 한 번만 압축하고 이후에는 압축된 바이트를 재사용하므로,
+반복 조회에서 실제로 드는 비용은 전송/해제뿐입니다 (첫 조회만 압축 시간 추가).
+
+실행: python benchmarks/bench_compression.py [--counts 100,1000,10000] [--mbps 100] [--rounds 5]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 라우트의 전역 저장소가 인메모리 PaymentStorage가 되도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "bench_webhook_secret")
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["PAYMENT_SHARDS"] = "0"
+
+from routes.payment_routes import _encode_json, _list_payments_content
+from storage.payment_backend import iter_payments_by_time_range
+from storage.payment_storage import payment_storage
+from utils.compression import compress_stream
+from utils.payment_utils import create_payment_id
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 최종 상태 분포 (완료 대부분, 일부 대기/취소/만료)
+_OUTCOMES = ("PAYMENT_COMPLETED",) * 7 + ("PENDING", "PAYMENT_CANCELLED", "PAYMENT_EXPIRED")
+
+
+def _timestamp(i: int, offset_us: int = 0) -> str:
+    micros = i * 1_013 + offset_us
+    seconds, micros = divmod(micros, 1_000_000)
+    return f"2024-01-01T{(seconds // 3600) % 24:02d}:{(seconds // 60) % 60:02d}:{seconds % 60:02d}.{micros:06d}Z"
+
+
+async def _fill_storage(start: int, count: int) -> None:
+    """
+    start_payment_v2/confirm과 같은 형식으로 start번부터 count건이 될 때까지 결제를 만들고 상태를 전환
+    결제 내용은 번호로 정해지므로 결제 수를 늘려 가며 채워도 처음부터 채운 것과 같습니다.
+    """
+    for i in range(start, count):
+        tx_id = f"{100000 + i}-{(i * 2654435761) % 10**10:010d}"
+        await payment_storage.create_payment({
+            "payment_id": create_payment_id(tx_id),
+            "order_id": 100000 + i,
+            "tx_id": tx_id,
+            "user_id": (i * 7919) % 50000,
+            "amount": 1000 + (i * 37) % 500000,
+            "status": "PENDING",
+            "created_at": _timestamp(i),
+            "confirmed_at": None,
+            "callback_url": f"https://shop-{i % 20}.example.com/api/orders/payment/webhook/v2/{tx_id}",
+        })
+        outcome = _OUTCOMES[i % len(_OUTCOMES)]
+        if outcome == "PENDING":
+            continue
+        payment_id = create_payment_id(tx_id)
+        if outcome == "PAYMENT_EXPIRED":
+            await payment_storage.transition(payment_id, "PENDING", outcome)
+            continue
+        await payment_storage.transition(
+            payment_id, "PENDING", "PAYMENT_COMPLETED", {"confirmed_at": _timestamp(i, 5_000_000)}
+        )
+        if outcome == "PAYMENT_CANCELLED":
+            # 웹훅 실패로 취소된 결제
+            await payment_storage.transition(payment_id, "PAYMENT_COMPLETED", outcome)
+
+
+async def _list_body() -> bytes:
+    """GET /api/v2/pending-payments (쿼리 없음) 응답 본문"""
+    return _encode_json(await _list_payments_content(None, None, None, None, None, "asc"))
+
+
+async def _export_lines() -> list:
+    """GET /api/v2/payments/export 스트림의 줄 목록"""
+    return [
+        json.dumps(payment, ensure_ascii=False).encode("utf-8") + b"\n"
+        async for payment in iter_payments_by_time_range(payment_storage)
+    ]
+
+
+def _codecs() -> list:
+    """(이름, 압축 함수, 해제 함수)"""
+    codecs = [("identity", lambda body: body, lambda body: body)]
+    for level in (1, 6, 9):
+        codecs.append((
+            f"gzip-{level}",
+            lambda body, level=level: _gzip(body, level),
+            gzip.decompress,
+        ))
+    if zstandard is not None:
+        decompressor = zstandard.ZstdDecompressor()
+        for level in (1, 3, 9):
+            codecs.append((
+                f"zstd-{level}",
+                lambda body, level=level: zstandard.ZstdCompressor(level=level).compress(body),
+                decompressor.decompress,
+            ))
+    return codecs
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _best_time(func, arg, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _report(title: str, body: bytes, rounds: int, mbps: float) -> None:
+    print(f"\n{title}: {len(body):,} bytes")
+    print(f"  {'방식':<10}{'크기':>12}{'압축률':>8}{'압축 MB/s':>11}{'해제 MB/s':>11}"
+          f"{'압축 ms':>9}{'전송 ms':>9}{'합계 ms':>9}")
+    bytes_per_s = mbps * 1_000_000 / 8
+    for name, compress_func, decompress_func in _codecs():
+        compressed = compress_func(body)
+        assert decompress_func(compressed) == body
+        compress_s = _best_time(compress_func, body, rounds)
+        decompress_s = _best_time(decompress_func, compressed, rounds)
+        transfer_s = len(compressed) / bytes_per_s
+        total_ms = (compress_s + transfer_s + decompress_s) * 1000
+        compress_rate = len(body) / compress_s / 1e6 if name != "identity" else float("inf")
+        decompress_rate = len(body) / decompress_s / 1e6 if name != "identity" else float("inf")
+        print(f"  {name:<10}{len(compressed):>12,}{len(body) / len(compressed):>7.1f}x"
+              f"{compress_rate:>11,.0f}{decompress_rate:>11,.0f}"
+              f"{compress_s * 1000:>9.2f}{transfer_s * 1000:>9.2f}{total_ms:>9.2f}")
+
+
+def _report_stream(title: str, lines: list, rounds: int) -> None:
+    """내보내기 스트리밍 압축 (compress_stream, 서버 설정 레벨)"""
+    raw = sum(map(len, lines))
+    print(f"\n{title} 스트리밍 압축 (compress_stream, RESPONSE_GZIP_LEVEL/RESPONSE_ZSTD_LEVEL)")
+    for encoding in ("gzip", "zstd") if zstandard is not None else ("gzip",):
+        best = float("inf")
+        size = 0
+        for _ in range(rounds):
+            started = time.perf_counter()
+            size = sum(len(chunk) for chunk in compress_stream(iter(lines), encoding))
+            best = min(best, time.perf_counter() - started)
+        print(f"  {encoding:<10}{size:>12,}{raw / size:>7.1f}x{raw / best / 1e6:>11,.0f} MB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="응답 압축 벤치마크")
+    parser.add_argument("--counts", default="100,1000,10000", help="응답에 담을 결제 수 (쉼표 구분)")
+    parser.add_argument("--mbps", type=float, default=100.0, help="예상 전송 시간 계산용 링크 대역폭(Mbps)")
+    parser.add_argument("--rounds", type=int, default=5, help="측정 반복 횟수 (최고 기록 사용)")
+    args = parser.parse_args()
+
+    if zstandard is None:
+        print("zstandard 미설치: gzip만 측정합니다")
+    print(f"링크 {args.mbps:g} Mbps 기준, 합계 = 압축 + 전송 + 해제")
+    asyncio.run(_run(sorted(int(value) for value in args.counts.split(",") if value.strip()), args))
+
+
+async def _run(counts: list, args: argparse.Namespace) -> None:
+    filled = 0
+    for count in counts:
+        await _fill_storage(filled, count)
+        filled = count
+        _report(f"결제 목록 JSON ({count:,}건)", await _list_body(), args.rounds, args.mbps)
+        lines = await _export_lines()
+        _report(f"내보내기 NDJSON ({count:,}건)", b"".join(lines), args.rounds, args.mbps)
+        _report_stream(f"내보내기 NDJSON ({count:,}건)", lines, args.rounds)
+
+if __name__ == "__main__":
+    main()
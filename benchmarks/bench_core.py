@@ -0,0 +1,276 @@
+"""
+요청 경로 핵심 함수 마이크로벤치마크 (기준선 비교)
+
+저장소 크기(기본 1k/10k/100k, 최대 1M)별로 인메모리 PaymentStorage의
+create_payment/update_payment/transition/get_payment_count_by_status와,
+크기와 무관한 create_webhook_payload/sign_webhook/now_iso/페이로드 JSON 인코딩의
+초당 처리량(ops/sec)과 호출당 메모리를 측정합니다 (tracemalloc).
+    alloc_bytes_per_op     호출 1회 동안 늘어난 할당량의 최고점 평균 (호출마다 reset_peak) - 곧 해제되는 임시 할당 포함
+    retained_bytes_per_op  측정 전후 남아 있는 메모리 증가량 / 호출 수 (저장소에 쌓이는 데이터 등)
+
+결과는 benchmarks/baseline.json과 비교해 처리량이 threshold% 넘게 떨어지거나
+호출당 할당(alloc_bytes_per_op)이 threshold% 넘게 늘어난 항목이 있으면 종료 코드 1로 끝납니다.
+--runs N이면 전체 측정을 N번 반복해 항목별 중앙값을 사용합니다 (기준선 갱신 시 권장).
+기준선은 측정한 머신 기준이므로 다른 머신에서는 --update-baseline으로 먼저 기록하고,
+공유 CI 러너처럼 측정 편차가 큰 환경에서는 --threshold를 높여 사용하세요.
+
+실행:
+    python benchmarks/bench_core.py                              # 측정 + 기준선 비교
+    python benchmarks/bench_core.py --sizes 1000,1000000         # 저장소 크기 지정
+    python benchmarks/bench_core.py --update-baseline --runs 5   # 기준선 갱신 (5회 중앙값)
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 서명 키가 없으면 sign_webhook이 실패하므로 벤치마크용 키 지정
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "bench_webhook_secret")
+
+from storage.payment_storage import PaymentStorage
+from utils.payment_utils import now_iso, create_webhook_payload, sign_webhook
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = "1000,10000,100000"
+
+
+def _payment(i: int, created_at: str) -> Dict[str, Any]:
+    return {
+        "payment_id": f"pay_tx_{i}",
+        "order_id": i,
+        "tx_id": f"tx_{i}",
+        "user_id": i % 997,
+        "amount": 1000 + i % 50000,
+        "status": "PENDING",
+        "created_at": created_at,
+        "confirmed_at": None,
+        "callback_url": f"https://ops-{i % 4}.example.com/api/orders/payment/webhook/v2",
+    }
+
+
+async def _filled_storage(size: int) -> PaymentStorage:
+    storage = PaymentStorage()
+    created_at = now_iso()
+    for i in range(size):
+        await storage.create_payment(_payment(i, created_at))
+    # 상태 분포를 실제와 비슷하게 (약 70% 완료, 10% 취소)
+    for i in range(0, size, 10):
+        for j in range(i, min(i + 7, size)):
+            storage._payments[f"pay_tx_{j}"]["status"] = "PAYMENT_COMPLETED"
+        if i + 7 < size:
+            storage._payments[f"pay_tx_{i + 7}"]["status"] = "PAYMENT_CANCELLED"
+    return storage
+
+
+def _alloc_stats(total_peak: int, retained: int, ops: int) -> Dict[str, float]:
+    return {"alloc_bytes_per_op": total_peak / ops, "retained_bytes_per_op": max(0, retained) / ops}
+
+
+def _measure_sync(func: Callable[[int], Any], ops: int, repeat: int) -> Dict[str, float]:
+    """func(i)를 ops번 호출, repeat회 중 최고 처리량 + 호출당 할당/잔류 메모리"""
+    best = 0.0
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        for i in range(ops):
+            func(i)
+        best = max(best, ops / (time.perf_counter() - started))
+    gc.collect()
+    tracemalloc.start()
+    start_current, _ = tracemalloc.get_traced_memory()
+    total_peak = 0
+    for i in range(ops):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func(i)
+        _, peak = tracemalloc.get_traced_memory()
+        total_peak += peak - current
+    end_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops_per_sec": best, **_alloc_stats(total_peak, end_current - start_current, ops)}
+
+
+async def _measure_async(make: Callable[[int], Any], ops: int, repeat: int, setup=None) -> Dict[str, float]:
+    """await make(i)를 ops번 실행 (setup이 있으면 매 회차 전에 await setup())"""
+    best = 0.0
+    for _ in range(repeat):
+        if setup is not None:
+            await setup()
+        gc.collect()
+        started = time.perf_counter()
+        for i in range(ops):
+            await make(i)
+        best = max(best, ops / (time.perf_counter() - started))
+    if setup is not None:
+        await setup()
+    gc.collect()
+    tracemalloc.start()
+    start_current, _ = tracemalloc.get_traced_memory()
+    total_peak = 0
+    for i in range(ops):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await make(i)
+        _, peak = tracemalloc.get_traced_memory()
+        total_peak += peak - current
+    end_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops_per_sec": best, **_alloc_stats(total_peak, end_current - start_current, ops)}
+
+
+async def bench_storage(size: int, ops: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """저장소 크기 size에서 저장소 연산 측정"""
+    storage = await _filled_storage(size)
+    created_at = now_iso()
+    results = {}
+    # 저장소 크기가 바뀌지 않는 조회/업데이트를 먼저 측정한 뒤 생성/전환 측정
+    count_ops = max(1, min(ops, 2_000_000 // max(size, 1)))
+
+    async def count(_: int) -> None:
+        await storage.get_payment_count_by_status()
+
+    results["storage.get_payment_count_by_status"] = await _measure_async(count, count_ops, repeat)
+
+    async def update(i: int) -> None:
+        await storage.update_payment(f"pay_tx_{i % size}", {"amount": i})
+
+    results["storage.update_payment"] = await _measure_async(update, ops, repeat)
+
+    # 기존 결제와 겹치지 않는 새 payment_id로 생성 (같은 id를 재생성하면 덮어쓰기 경로가 됨)
+    counter = [size]
+
+    async def create(_: int) -> None:
+        counter[0] += 1
+        await storage.create_payment(_payment(counter[0], created_at))
+
+    results["storage.create_payment"] = await _measure_async(create, ops, repeat)
+
+    # transition은 PENDING -> COMPLETED를 반복할 수 있도록 매 회차 전 대상 결제를 PENDING으로 되돌림
+    targets = [f"pay_tx_{size + 1 + i}" for i in range(ops)]
+
+    async def reset() -> None:
+        for payment_id in targets:
+            storage._payments[payment_id]["status"] = "PENDING"
+
+    async def transition(i: int) -> None:
+        await storage.transition(targets[i], "PENDING", "PAYMENT_COMPLETED", {"confirmed_at": created_at})
+
+    results["storage.transition"] = await _measure_async(transition, ops, repeat, setup=reset)
+    return results
+
+
+def bench_serialization(ops: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """저장소 크기와 무관한 요청 경로 함수 측정"""
+    payment = _payment(1, now_iso())
+    payment.update({"status": "PAYMENT_COMPLETED", "confirmed_at": now_iso(), "version": 2})
+    payload = create_webhook_payload(payment)
+    raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return {
+        "now_iso": _measure_sync(lambda i: now_iso(), ops, repeat),
+        "create_webhook_payload": _measure_sync(lambda i: create_webhook_payload(payment), ops, repeat),
+        "json.payload_encode": _measure_sync(
+            lambda i: json.dumps(payload, ensure_ascii=False).encode("utf-8"), ops, repeat
+        ),
+        "sign_webhook": _measure_sync(lambda i: sign_webhook(raw), ops, repeat),
+    }
+
+
+def run_suite(sizes: List[int], ops: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """전체 항목 1회 측정"""
+    results: Dict[str, Dict[str, float]] = dict(bench_serialization(ops, repeat))
+    for size in sizes:
+        for name, result in asyncio.run(bench_storage(size, ops, repeat)).items():
+            results[f"{name}@{size}"] = result
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """기준선 대비 회귀 항목 목록"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        floor = base["ops_per_sec"] * (1 - threshold / 100)
+        if result["ops_per_sec"] < floor:
+            regressions.append(
+                f"{name}: 처리량 {result['ops_per_sec']:,.0f} ops/s < 기준 {base['ops_per_sec']:,.0f} (-{threshold}%)"
+            )
+        # 할당량은 작은 값의 흔들림을 피하려고 64 bytes 여유를 둠 (이전 형식 기준선은 할당 비교 생략)
+        if "retained_bytes_per_op" not in base:
+            continue
+        ceiling = base["alloc_bytes_per_op"] * (1 + threshold / 100) + 64
+        if result["alloc_bytes_per_op"] > ceiling:
+            regressions.append(
+                f"{name}: 할당 {result['alloc_bytes_per_op']:,.0f} B/op > 기준 {base['alloc_bytes_per_op']:,.0f} (+{threshold}%)"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="요청 경로 핵심 함수 마이크로벤치마크")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="저장소 크기 목록 (쉼표 구분, 예: 1000,1000000)")
+    parser.add_argument("--ops", type=int, default=20000, help="항목당 측정 호출 수")
+    parser.add_argument("--repeat", type=int, default=5, help="측정 반복 횟수 (최고값 사용)")
+    parser.add_argument("--runs", type=int, default=1, help="전체 측정 반복 횟수 (항목별 중앙값 사용)")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_REGRESSION_THRESHOLD", "20")),
+                        help="회귀 판정 비율(%%), 기본 20 (환경변수 BENCH_REGRESSION_THRESHOLD)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="기준선 파일 경로")
+    parser.add_argument("--update-baseline", action="store_true", help="측정 결과로 기준선 갱신")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    runs = [run_suite(sizes, args.ops, args.repeat) for _ in range(max(1, args.runs))]
+    results = {
+        name: {key: statistics.median(run[name][key] for run in runs) for key in runs[0][name]}
+        for name in runs[0]
+    }
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'항목':<48}{'ops/sec':>14}{'기준 대비':>10}{'할당 B/op':>12}{'잔류 B/op':>12}")
+        for name, result in results.items():
+            base = baseline.get(name)
+            ratio = f"{result['ops_per_sec'] / base['ops_per_sec']:.2f}x" if base else "-"
+            print(f"{name:<48}{result['ops_per_sec']:>14,.0f}{ratio:>10}"
+                  f"{result['alloc_bytes_per_op']:>12,.0f}{result['retained_bytes_per_op']:>12,.0f}")
+
+    if args.update_baseline:
+        # 이번에 측정하지 않은 크기의 기존 항목은 유지
+        merged = {**baseline, **{
+            name: {key: round(value, 1) for key, value in result.items()} for name, result in results.items()
+        }}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": merged}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"기준선 갱신: {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n성능 회귀 {len(regressions)}건 (threshold {args.threshold}%):")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    if baseline:
+        print(f"\n기준선 대비 회귀 없음 (threshold {args.threshold}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+웹훅 서명 처리량 벤치마크
+
+배치로 만든 웹훅 페이로드에 대해 다음을 비교합니다.
+- 기존 방식: 메시지마다 키 인코딩 + hmac.new (키 설정 반복)
+- WebhookSigner: 미리 키 설정한 HMAC 상태를 copy()해서 서명 (키 1개 / 키 교체 중 2개)
+
+실행: python benchmarks/bench_signing.py [--batch 10000] [--rounds 5]
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.payment_utils import create_webhook_payload
+from utils.webhook_signer import WebhookSigner
+
+_SECRET = "bench_current_secret_0123456789"
+_NEXT_SECRET = "bench_next_secret_9876543210"
+
+
+def _payloads(count: int) -> list:
+    bodies = []
+    for i in range(count):
+        payment = {
+            "payment_id": f"pay_tx_{i}",
+            "order_id": i,
+            "tx_id": f"tx_{i}",
+            "user_id": i % 97,
+            "amount": 1000 + i,
+            "status": "PAYMENT_COMPLETED",
+            "created_at": "2024-01-01T00:00:00Z",
+            "confirmed_at": "2024-01-01T00:00:02Z",
+        }
+        bodies.append(json.dumps(create_webhook_payload(payment), ensure_ascii=False).encode("utf-8"))
+    return bodies
+
+
+def legacy_sign(body: bytes) -> str:
+    mac = hmac.new(_SECRET.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(mac).decode("ascii")
+
+
+def _throughput(func, bodies: list, rounds: int) -> float:
+    """초당 서명 수 (rounds회 중 최고)"""
+    best = 0.0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for body in bodies:
+            func(body)
+        best = max(best, len(bodies) / (time.perf_counter() - started))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="웹훅 서명 처리량 벤치마크")
+    parser.add_argument("--batch", type=int, default=10000, help="배치 페이로드 수")
+    parser.add_argument("--rounds", type=int, default=5, help="측정 반복 횟수")
+    args = parser.parse_args()
+
+    bodies = _payloads(args.batch)
+    single = WebhookSigner(secret=_SECRET, next_secret="", secrets_file="")
+    rotating = WebhookSigner(secret=_SECRET, next_secret=_NEXT_SECRET, secrets_file="")
+    assert single.signature(bodies[0]) == legacy_sign(bodies[0])
+
+    results = [
+        ("기존 hmac.new (키 1개)", _throughput(legacy_sign, bodies, args.rounds)),
+        ("WebhookSigner.signature (키 1개)", _throughput(single.signature, bodies, args.rounds)),
+        ("WebhookSigner.headers (키 1개)", _throughput(single.headers, bodies, args.rounds)),
+        ("WebhookSigner.headers (키 교체 중 2개)", _throughput(rotating.headers, bodies, args.rounds)),
+    ]
+    baseline = results[0][1]
+    print(f"페이로드 {args.batch}건 (평균 {sum(map(len, bodies)) / len(bodies):.0f} bytes)")
+    for name, rate in results:
+        print(f"  {name:<40} {rate:>12,.0f} 서명/초  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+결제 생성 요청 검증/응답 직렬화 마이크로벤치마크
+
+기존 경로(AnyHttpUrl 파싱 + str 변환 + 반환 dict의 response_model 재검증)와
+현재 경로(캐시된 callback_url 검증 + model_construct + 바로 JSON 직렬화)의 요청당 비용을 비교합니다.
+
+실행: python benchmarks/bench_validation.py [--number 20000] [--urls 4] [--per-tx]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Literal
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, AnyHttpUrl, TypeAdapter
+
+from models.payment_models import PaymentInitV2, PaymentCreateResponse, normalize_callback_url
+
+
+class LegacyPaymentInitV2(BaseModel):
+    """기존 요청 모델 (callback_url: AnyHttpUrl)"""
+    version: Literal["v2"] = "v2"
+    tx_id: str
+    order_id: int
+    user_id: int
+    amount: int
+    callback_url: AnyHttpUrl
+
+
+# FastAPI가 response_model로 반환값을 검증할 때와 같은 방식 (반환 dict 검증 후 JSON 호환 변환)
+_LEGACY_RESPONSE = TypeAdapter(PaymentCreateResponse)
+
+
+def _bodies(count: int, urls: int, per_tx: bool) -> list:
+    return [
+        json.dumps({
+            "tx_id": f"tx_{i}",
+            "order_id": i,
+            "user_id": i % 97,
+            "amount": 1000 + i,
+            "callback_url": f"https://ops-{i % urls}.example.com/api/orders/payment/webhook/v2"
+                            + (f"/tx_{i}" if per_tx else ""),
+        }).encode()
+        for i in range(count)
+    ]
+
+
+def legacy_request(body: bytes) -> bytes:
+    req = LegacyPaymentInitV2.model_validate(json.loads(body))
+    callback_url = str(req.callback_url)
+    payment_id = f"pay_{req.tx_id}"
+    result = {"ok": True, "tx_id": req.tx_id, "status": "PAYMENT_COMPLETED", "payment_id": payment_id}
+    validated = _LEGACY_RESPONSE.validate_python(result)
+    return json.dumps(jsonable_encoder(validated)).encode() if callback_url else b""
+
+
+def fast_request(body: bytes) -> bytes:
+    req = PaymentInitV2.model_validate(json.loads(body))
+    callback_url = req.callback_url
+    payment_id = f"pay_{req.tx_id}"
+    response = PaymentCreateResponse.model_construct(
+        ok=True, tx_id=req.tx_id, status="PAYMENT_COMPLETED", payment_id=payment_id
+    )
+    return response.model_dump_json().encode() if callback_url else b""
+
+
+def _measure(func, bodies: list, number: int) -> float:
+    """요청 1건당 평균 시간(µs), 3회 측정 중 최솟값"""
+    rounds = []
+    for _ in range(3):
+        elapsed = timeit.timeit(lambda: [func(body) for body in bodies], number=max(1, number // len(bodies)))
+        rounds.append(elapsed / (max(1, number // len(bodies)) * len(bodies)))
+    return min(rounds) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="결제 생성 요청 검증 마이크로벤치마크")
+    parser.add_argument("--number", type=int, default=20000, help="측정할 요청 수")
+    parser.add_argument("--urls", type=int, default=4, help="서로 다른 콜백 호스트 수")
+    parser.add_argument("--per-tx", action="store_true", help="callback_url 경로에 tx_id 포함 (URL 캐시 미적중)")
+    args = parser.parse_args()
+
+    bodies = _bodies(1000, max(1, args.urls), args.per_tx)
+    # 두 경로의 결과가 같은지 먼저 확인
+    for body in bodies[:10]:
+        assert json.loads(legacy_request(body)) == json.loads(fast_request(body))
+    normalize_callback_url.cache_clear()
+
+    legacy = _measure(legacy_request, bodies, args.number)
+    fast = _measure(fast_request, bodies, args.number)
+    print(f"요청 {args.number}건, 콜백 호스트 {args.urls}개, tx_id별 URL: {args.per_tx}")
+    print(f"  기존 경로: {legacy:8.2f} µs/요청")
+    print(f"  현재 경로: {fast:8.2f} µs/요청  ({legacy / fast:.2f}x)")
+    print(f"  callback_url 캐시: {normalize_callback_url.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Payment Server 로깅 설정
+QueueHandler/QueueListener 기반 비동기 로깅과 JSON 구조화 로그, 메시지 유형별 샘플링을 설정합니다.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict
+
+from config.settings import LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES, LOG_QUEUE_SIZE, LOG_QUEUE_RESERVE
+
+# 로그 레코드에 extra로 전달되는 구조화 필드
+STRUCTURED_FIELDS = ("msg_type", "payment_id", "tx_id", "order_id", "url", "status_code", "attempt")
+
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 JSON 로그 포매터"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat().replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    메시지 유형(msg_type)별 샘플링 필터
+    WARNING 이상은 항상 통과하고, 샘플링 비율이 지정된 유형의 INFO/DEBUG만 확률적으로 버립니다.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(getattr(record, "msg_type", None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    레코드를 포맷하지 않고 그대로 큐에 넣는 QueueHandler
+
+    기본 QueueHandler.prepare()는 호출 스레드(이벤트 루프)에서 메시지를 포맷하므로,
+    같은 프로세스의 리스너 스레드가 포맷하도록 레코드를 그대로 넘깁니다.
+    큐에 limit건 이상 쌓이면 INFO 이하는 버리고, WARNING 이상은 큐 용량(limit + 예비 자리)까지 받습니다.
+    예비 자리까지 차면 WARNING은 버리고 따로 세지만, ERROR 이상은 버리지 않고 fallback 핸들러로 호출 스레드에서
+    바로 출력합니다 (큐에 남은 레코드보다 먼저 출력될 수 있음). 큐가 빌 때까지 호출 스레드를 기다리게 하지는 않습니다.
+    """
+
+    def __init__(self, log_queue: queue.Queue, limit: int, fallback: logging.Handler):
+        super().__init__(log_queue)
+        self.limit = limit
+        self.fallback = fallback
+        self.dropped = 0
+        self.dropped_warnings = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno < logging.WARNING and self.queue.qsize() >= self.limit:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.ERROR:
+                self.fallback.handle(record)
+            elif record.levelno >= logging.WARNING:
+                self.dropped_warnings += 1
+            else:
+                self.dropped += 1
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """'payment.created=0.1,webhook.sent=0.5' 형식의 샘플링 설정 파싱"""
+    rates = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        msg_type, rate = item.split("=", 1)
+        rates[msg_type.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def setup_logging() -> QueueListener:
+    """루트 로거를 큐 기반 핸들러로 설정하고 리스너 스레드 시작 (중복 호출 시 기존 리스너 반환)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE + max(0, LOG_QUEUE_RESERVE))
+    queue_handler = _DeferredQueueHandler(log_queue, LOG_QUEUE_SIZE, stream_handler)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(getattr(logging, LOG_LEVEL))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener, _listener, queue_handler, stream_handler)
+    return _listener
+
+
+def _stop_listener(
+    listener: QueueListener, queue_handler: _DeferredQueueHandler, stream_handler: logging.Handler
+) -> None:
+    """리스너 종료 (남은 레코드 출력) 후 큐 포화로 버린 로그 수를 직접 출력"""
+    listener.stop()
+    if queue_handler.dropped or queue_handler.dropped_warnings:
+        stream_handler.handle(logging.LogRecord(
+            "logging", logging.WARNING, __file__, 0,
+            "로그 큐 포화로 버린 로그: INFO 이하 %d건, WARNING %d건",
+            (queue_handler.dropped, queue_handler.dropped_warnings), None,
+        ))
@@ -9,6 +9,13 @@ load_dotenv()
 
 # ---- 환경변수 설정 ----
 WEBHOOK_SECRET = os.getenv("PAYMENT_WEBHOOK_SECRET", "")
+WEBHOOK_SECRET_ID = os.getenv("PAYMENT_WEBHOOK_SECRET_ID", "v1")
+# 키 교체 중 함께 서명할 다음 키 (선택)
+WEBHOOK_NEXT_SECRET = os.getenv("PAYMENT_WEBHOOK_NEXT_SECRET", "")
+WEBHOOK_NEXT_SECRET_ID = os.getenv("PAYMENT_WEBHOOK_NEXT_SECRET_ID", "v2")
+# 웹훅 키 JSON 파일 ({"current": {"kid", "secret"}, "next": {...}}), 설정 시 위 환경변수 대신 사용하고 변경 시 자동 반영
+WEBHOOK_SECRETS_FILE = os.getenv("WEBHOOK_SECRETS_FILE", "")
+WEBHOOK_SECRETS_RELOAD_INTERVAL = float(os.getenv("WEBHOOK_SECRETS_RELOAD_INTERVAL", "5.0"))
 SERVICE_AUTH_TOKEN = os.getenv("SERVICE_AUTH_TOKEN", "")
 
 # ---- 웹훅 재시도 설정 ----
@@ -16,6 +23,96 @@ WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "3"))
 WEBHOOK_RETRY_DELAY = float(os.getenv("WEBHOOK_RETRY_DELAY", "1.0"))
 WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10.0"))
 
+# ---- 웹훅 연결 설정 ----
+WEBHOOK_POOL_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_POOL_MAX_CONNECTIONS", "100"))
+# 콜백 호스트 DNS 캐시 TTL(초), 0이면 캐시하지 않음
+WEBHOOK_DNS_CACHE_TTL = float(os.getenv("WEBHOOK_DNS_CACHE_TTL", "60.0"))
+# 유휴 콜백 호스트 keep-alive 요청(HEAD /) 주기(초), 0이면 비활성화 (기본 - 수신 서버에 요청이 가므로 필요할 때만 켬)
+# 켜면 시작 시에도 콜백 호스트에 HEAD 요청을 보내 연결을 미리 열어 둠 (끄면 DNS만 미리 조회)
+WEBHOOK_KEEPALIVE_INTERVAL = float(os.getenv("WEBHOOK_KEEPALIVE_INTERVAL", "0"))
+# 웹훅 동시 전송 상한 (전체 / 콜백 호스트별)
+WEBHOOK_GLOBAL_CONCURRENCY = int(os.getenv("WEBHOOK_GLOBAL_CONCURRENCY", "64"))
+WEBHOOK_HOST_CONCURRENCY = int(os.getenv("WEBHOOK_HOST_CONCURRENCY", "8"))
+# 콜백 호스트별 스케줄링 가중치 (예: "ops-a.example.com=2,ops-b.example.com:8443=0.5", 기본 1)
+WEBHOOK_HOST_WEIGHTS = os.getenv("WEBHOOK_HOST_WEIGHTS", "")
+# 웹훅 전송 시도 기록 크기 (호스트별 링 버퍼 / 결제별 최근 시도 / 이력을 유지할 결제 수)
+WEBHOOK_ATTEMPTS_PER_HOST = int(os.getenv("WEBHOOK_ATTEMPTS_PER_HOST", "1000"))
+WEBHOOK_ATTEMPTS_PER_PAYMENT = int(os.getenv("WEBHOOK_ATTEMPTS_PER_PAYMENT", "20"))
+WEBHOOK_ATTEMPTS_MAX_PAYMENTS = int(os.getenv("WEBHOOK_ATTEMPTS_MAX_PAYMENTS", "10000"))
+# 시작 시 미리 연결할 콜백 URL/호스트 목록 (쉼표 구분, 예: "https://ops.example.com")
+WEBHOOK_WARM_HOSTS = [h.strip() for h in os.getenv("WEBHOOK_WARM_HOSTS", "").split(",") if h.strip()]
+
+# ---- 결제 만료 설정 ----
+# PENDING 상태로 TTL(초)을 넘긴 결제는 PAYMENT_EXPIRED로 전환 (기본 0: 비활성화, 켜려면 양수 지정)
+PAYMENT_PENDING_TTL = float(os.getenv("PAYMENT_PENDING_TTL", "0"))
+PAYMENT_EXPIRY_INTERVAL = float(os.getenv("PAYMENT_EXPIRY_INTERVAL", "1.0"))
+PAYMENT_EXPIRY_WEBHOOK = os.getenv("PAYMENT_EXPIRY_WEBHOOK", "false").lower() in ("1", "true", "yes")
+
+# ---- 결제 처리 흐름 설정 ----
+# 결제 생성 후 자동 완료까지 대기 시간(초)
+AUTO_COMPLETE_DELAY = float(os.getenv("AUTO_COMPLETE_DELAY", "2.0"))
+# 종료 시 진행 중 작업(자동 완료 예약, 웹훅 전송/재시도)을 기다리는 최대 시간(초)
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20.0"))
+# 종료 시간 안에 끝나지 않은 작업을 저장했다가 다음 시작 시 재개하는 파일
+WORK_STATE_FILE = os.getenv("WORK_STATE_FILE", "data/pending_work.json")
+
+# ---- 저장소 설정 ----
+# memory: 프로세스 내 인메모리 / redis: Redis 공유 저장소 (여러 인스턴스가 상태 공유)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "payment")
+# 상태 전환 락 스트라이프 개수 (payment_id 해시로 락 선택)
+STORAGE_LOCK_STRIPES = int(os.getenv("STORAGE_LOCK_STRIPES", "64"))
+
+# ---- 샤드 설정 ----
+# 결제 상태 머신을 N개 워커 프로세스로 분할 (payment_id 해시로 담당 샤드 결정, 0이면 단일 프로세스)
+PAYMENT_SHARDS = int(os.getenv("PAYMENT_SHARDS", "0"))
+# 샤드 워커 Unix 소켓 디렉터리 (shard-{번호}.sock)
+SHARD_SOCKET_DIR = os.getenv("SHARD_SOCKET_DIR", "/tmp/payment-shards")
+# true: 프런트(main.py)가 샤드 워커를 직접 실행 / false: python -m shards.worker로 따로 띄운 워커에 연결만
+SHARD_SPAWN = os.getenv("SHARD_SPAWN", "true").lower() in ("1", "true", "yes")
+# 샤드 워커 시작(소켓 연결) 대기 최대 시간(초)
+SHARD_START_TIMEOUT = float(os.getenv("SHARD_START_TIMEOUT", "15.0"))
+
+# ---- 조회 응답 캐시 설정 ----
+# 결제 목록 조회 응답(인코딩된 바이트) 캐시 항목 수 (0이면 비활성화) / 항목당 최대 크기(bytes)
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "256"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# 캐시 전체 바이트 상한 (압축본 포함, 넘으면 오래된 항목부터 제거)
+RESPONSE_CACHE_TOTAL_BYTES = int(os.getenv("RESPONSE_CACHE_TOTAL_BYTES", str(64 * 1024 * 1024)))
+
+# ---- 응답 압축 설정 ----
+# Accept-Encoding에 따라 결제 목록/내보내기 응답을 zstd 또는 gzip으로 압축 (zstd는 zstandard 패키지가 있을 때)
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes")
+# 이 크기(bytes) 미만 응답은 압축하지 않음
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+# 이 크기(bytes) 이상 응답은 스레드에서 압축 (zlib/zstd는 GIL을 놓으므로 이벤트 루프를 막지 않음)
+RESPONSE_COMPRESSION_THREAD_BYTES = int(os.getenv("RESPONSE_COMPRESSION_THREAD_BYTES", str(256 * 1024)))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_ZSTD_LEVEL = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+
+# ---- 트래픽 캡처 설정 ----
+# 들어온 API 요청(메서드/경로/쿼리/본문/응답 상태/처리 시간)을 JSONL로 기록 (tools/replay_traffic.py로 재생)
+TRAFFIC_CAPTURE = os.getenv("TRAFFIC_CAPTURE", "false").lower() in ("1", "true", "yes")
+TRAFFIC_CAPTURE_FILE = os.getenv("TRAFFIC_CAPTURE_FILE", "captures/traffic.jsonl")
+# 기록할 경로 prefix (쉼표 구분)
+TRAFFIC_CAPTURE_PATHS = [p.strip() for p in os.getenv("TRAFFIC_CAPTURE_PATHS", "/api/").split(",") if p.strip()]
+# 파일에 쓰기 전 메모리 버퍼 최대 건수 (가득 차면 새 기록은 버리고 건수만 셈) / 파일 쓰기 주기(초)
+TRAFFIC_CAPTURE_BUFFER = int(os.getenv("TRAFFIC_CAPTURE_BUFFER", "10000"))
+TRAFFIC_CAPTURE_FLUSH_INTERVAL = float(os.getenv("TRAFFIC_CAPTURE_FLUSH_INTERVAL", "1.0"))
+# 요청 본문 기록 최대 크기(bytes), 넘으면 본문 없이 크기만 기록
+TRAFFIC_CAPTURE_MAX_BODY = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY", "65536"))
+
 # ---- 서버 설정 ----
 SERVER_TITLE = "Payment Server v3 (webhook_auto_complete)"
-LOG_LEVEL = "INFO"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# ---- 로깅 설정 ----
+# json: 한 줄 JSON 구조화 로그 / text: 기존 텍스트 로그
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# 메시지 유형별 INFO 로그 샘플링 비율 (예: "payment.created=0.1,webhook.sent=0.1"), WARNING 이상은 항상 기록
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# 로그 큐 최대 크기 (가득 차면 INFO 이하는 버림)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# WARNING 이상 전용 예비 자리 (LOG_QUEUE_SIZE를 넘어도 이만큼은 더 받고, 예비 자리도 차면 WARNING은 버리고 ERROR 이상은 바로 출력)
+LOG_QUEUE_RESERVE = int(os.getenv("LOG_QUEUE_RESERVE", "1000"))
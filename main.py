@@ -3,17 +3,59 @@ Payment Server 메인 애플리케이션
 FastAPI 앱을 생성하고 설정합니다.
 """
 import logging
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 
-from config.settings import SERVER_TITLE, LOG_LEVEL
+from config.settings import SERVER_TITLE, PAYMENT_SHARDS, SHUTDOWN_DRAIN_TIMEOUT
+from config.logging_config import setup_logging
 from routes.payment_routes import router
+from services.payment_runtime import payment_services
+from services.traffic_capture import traffic_capture
+from shards.router import shard_router
 
-# 로깅 설정
-logging.basicConfig(level=getattr(logging, LOG_LEVEL))
+# 로깅 설정 (큐 기반 - 포맷/출력은 리스너 스레드에서 처리)
+setup_logging()
 log = logging.getLogger("main")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    백그라운드 작업 시작/종료
+
+    SIGTERM을 받으면 uvicorn이 먼저 리스너를 닫고 진행 중 요청을 --timeout-graceful-shutdown까지 기다린 뒤
+    이 종료 구간을 실행합니다. 여기서는 요청과 분리된 결제 작업(자동 완료/웹훅)을 SHUTDOWN_DRAIN_TIMEOUT까지 기다리고
+    남은 작업을 저장합니다.
+    """
+    traffic_capture.start()
+    if PAYMENT_SHARDS > 0:
+        # 샤드 프런트: 결제 처리는 샤드 워커 프로세스가 맡고 여기서는 요청만 전달
+        await shard_router.start()
+        yield
+        # 워커별로 진행 중 작업 대기/저장 후 종료
+        await shard_router.stop(SHUTDOWN_DRAIN_TIMEOUT)
+    else:
+        async with payment_services(SHUTDOWN_DRAIN_TIMEOUT):
+            yield
+    await traffic_capture.stop()
+
+
 # FastAPI 앱 생성
-app = FastAPI(title=SERVER_TITLE)
+app = FastAPI(title=SERVER_TITLE, lifespan=lifespan)
+
+@app.middleware("http")
+async def capture_traffic(request: Request, call_next):
+    """TRAFFIC_CAPTURE=true면 API 요청을 JSONL로 기록 (처리 시간은 응답 시작까지)"""
+    if not traffic_capture.wants(request.url.path):
+        return await call_next(request)
+    ts, started = time.time(), time.perf_counter()
+    body = await request.body()
+    response = await call_next(request)
+    traffic_capture.record(ts, request.method, request.url.path, request.url.query, body,
+                           response.status_code, time.perf_counter() - started, request.headers)
+    return response
+
 
 # 라우터 등록
 app.include_router(router)
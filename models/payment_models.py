@@ -2,8 +2,28 @@
 Payment Server Pydantic 모델들
 API 요청/응답 스키마를 정의합니다.
 """
-from pydantic import BaseModel, Field, AnyHttpUrl
-from typing import Literal
+from functools import lru_cache
+from pydantic import BaseModel, Field, AnyHttpUrl, AfterValidator, TypeAdapter
+from typing import Literal, Annotated
+
+PaymentStatus = Literal["PENDING", "PAYMENT_COMPLETED", "PAYMENT_CANCELLED", "PAYMENT_EXPIRED"]
+
+# URL 검증기 (모듈 로드 시 1회 생성)
+_HTTP_URL = TypeAdapter(AnyHttpUrl)
+
+
+@lru_cache(maxsize=1024)
+def normalize_callback_url(value: str) -> str:
+    """
+    callback_url 검증 + 정규화 (AnyHttpUrl 기준, 결과 문자열 캐시)
+    운영 서버 콜백 URL은 종류가 적으므로 같은 문자열은 한 번만 파싱합니다.
+    잘못된 URL은 ValidationError가 발생하며 캐시되지 않습니다.
+    """
+    return str(_HTTP_URL.validate_python(value))
+
+
+# 요청 모델에서 str로 받은 뒤 캐시된 검증기로 정규화 (기존 AnyHttpUrl 필드와 같은 결과 문자열)
+CallbackUrl = Annotated[str, AfterValidator(normalize_callback_url)]
 
 
 class PaymentInitV2(BaseModel):
@@ -13,16 +33,18 @@ class PaymentInitV2(BaseModel):
     order_id: int
     user_id: int
     amount: int
-    callback_url: AnyHttpUrl = Field(
-        ..., description="운영서버 웹훅 수신 URL (예: https://ops/api/orders/payment/webhook/v2/{tx_id})"
+    callback_url: CallbackUrl = Field(
+        ...,
+        description="운영서버 웹훅 수신 URL (예: https://ops/api/orders/payment/webhook/v2/{tx_id})",
+        json_schema_extra={"format": "uri"},
     )
 
 
 class PaymentCreateResponse(BaseModel):
-    """결제 생성 응답 모델"""
+    """결제 생성 응답 모델 (서버가 만든 값이므로 라우트에서는 model_construct로 검증 없이 생성)"""
     ok: bool = True
     tx_id: str
-    status: Literal["PENDING", "PAYMENT_COMPLETED", "PAYMENT_CANCELLED"] = "PENDING"
+    status: PaymentStatus = "PENDING"
     payment_id: str
 
 
@@ -32,10 +54,10 @@ class PaymentConfirmRequest(BaseModel):
 
 
 class PaymentConfirmResponse(BaseModel):
-    """결제 확인 응답 모델"""
+    """결제 확인 응답 모델 (서버가 만든 값이므로 라우트에서는 model_construct로 검증 없이 생성)"""
     ok: bool = True
     payment_id: str
-    status: Literal["PENDING", "PAYMENT_COMPLETED", "PAYMENT_CANCELLED"]
+    status: PaymentStatus
     confirmed_at: str
 
 
@@ -46,7 +68,7 @@ class PaymentData(BaseModel):
     tx_id: str
     user_id: int
     amount: int
-    status: Literal["PENDING", "PAYMENT_COMPLETED", "PAYMENT_CANCELLED"]
+    status: PaymentStatus
     created_at: str
     confirmed_at: str | None
     callback_url: str
@@ -2,29 +2,54 @@
 Payment Server API 라우트들
 FastAPI 엔드포인트를 정의합니다.
 """
-import asyncio
+import json
 import logging
-from fastapi import APIRouter, HTTPException
+import time
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
 
 from models.payment_models import (
     PaymentInitV2, PaymentCreateResponse, 
     PaymentConfirmRequest, PaymentConfirmResponse
 )
-from utils.payment_utils import (
-    now_iso, post_webhook, create_payment_id, create_webhook_payload
-)
+from utils.payment_utils import now_iso, iso_to_epoch_ns, create_payment_id
+from storage.payment_backend import iter_payments_by_time_range
 from storage.payment_storage import payment_storage
+from services.payment_engine import (
+    payment_engine, PaymentNotFound, PaymentAlreadyProcessed, AnalyticsWindowTooLarge, WorkflowShuttingDown,
+)
+from services.response_cache import response_cache, etag_matches, CachedResponse
+from utils.compression import negotiate_encoding, should_compress, compress_async, compress_async_stream
 
 log = logging.getLogger("payment_routes")
 
 # 라우터 생성
 router = APIRouter()
 
+# 내보내기 시 저장소에서 한 번에 읽는 결제 수
+EXPORT_PAGE_SIZE = 1000
+
+
+def _trusted_response(model: BaseModel) -> Response:
+    """
+    서버가 만든 응답 모델을 바로 JSON으로 직렬화해 반환
+    Response를 반환하면 FastAPI가 response_model 재검증/jsonable_encoder 변환을 건너뜁니다
+    (response_model은 OpenAPI 문서화용으로만 사용).
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
 
 @router.get("/health")
 async def health():
-    """헬스 체크 엔드포인트"""
-    return {"ok": True, "service": "payment-v2-webhook", "docs": "/docs"}
+    """헬스 체크 엔드포인트 (샤드 모드에서 워커가 종료됐거나 연결할 수 없으면 503)"""
+    shards = await payment_engine.shard_health()
+    content = {"ok": all(shards), "service": "payment-v2-webhook", "docs": "/docs"}
+    if shards:
+        content["shards"] = shards
+    if not content["ok"]:
+        return JSONResponse(status_code=503, content=content)
+    return content
 
 
 @router.get("/api/v2/payments")
@@ -39,19 +64,198 @@ async def payments_hint():
     }
 
 
-@router.get("/api/v2/pending-payments")
-async def list_payments():
-    """결제 목록 조회 (개발용)"""
-    counts = payment_storage.get_payment_count_by_status()
-    all_payments = payment_storage.get_all_payments()
+def _parse_time_range(
+    since: str | None, until: str | None, last_seconds: float | None
+) -> tuple[int | None, int | None]:
+    """조회 구간 파라미터(ISO8601 / 최근 N초)를 epoch ns 구간으로 변환"""
+    try:
+        start_ns = iso_to_epoch_ns(since) if since else None
+        end_ns = iso_to_epoch_ns(until) if until else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until은 ISO8601 형식이어야 합니다")
+    if last_seconds is not None:
+        recent_ns = time.time_ns() - int(last_seconds * 1_000_000_000)
+        start_ns = recent_ns if start_ns is None else max(start_ns, recent_ns)
+    return start_ns, end_ns
+
+
+def _encode_json(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _response_encoding(request: Request, size: int | None) -> str | None:
+    """Accept-Encoding과 본문 크기(size, 스트리밍이면 None)로 압축 방식 결정"""
+    if size is not None and not should_compress(size):
+        return None
+    return negotiate_encoding(request.headers.get("accept-encoding"))
+
+
+async def _json_response(request: Request, body: bytes) -> Response:
+    """인코딩된 JSON 응답 (크기가 기준 이상이고 클라이언트가 받으면 압축, 큰 본문은 스레드에서)"""
+    encoding = _response_encoding(request, len(body))
+    if encoding is None:
+        return Response(content=body, media_type="application/json", headers={"Vary": "Accept-Encoding"})
+    return Response(
+        content=await compress_async(body, encoding), media_type="application/json",
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+    )
+
+
+async def _etag_response(request: Request, entry: CachedResponse) -> Response:
+    """
+    ETag 응답 (If-None-Match가 일치하면 본문 없이 304)
+    압축본은 캐시 항목에 함께 보관하므로 같은 세대 동안 압축은 방식별로 한 번만 합니다.
+    """
+    encoding = _response_encoding(request, len(entry.body))
+    headers = {"ETag": entry.etag_for(encoding), "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=await entry.encoded(encoding), media_type="application/json", headers=headers)
+
+
+async def _list_payments_content(
+    since: str | None, until: str | None, last_seconds: float | None, status: str | None, limit: int | None,
+    order: str,
+) -> dict:
+    counts = await payment_storage.get_payment_count_by_status()
+    
+    if since is None and until is None and last_seconds is None and status is None and limit is None:
+        payments = await payment_storage.get_all_payments()
+    else:
+        start_ns, end_ns = _parse_time_range(since, until, last_seconds)
+        selected = await payment_storage.get_payments_by_time_range(
+            start_ns, end_ns, status=status, limit=limit, descending=order == "desc"
+        )
+        payments = {payment["payment_id"]: payment for payment in selected}
     
     return {
         "pending_count": counts["PENDING"],
         "completed_count": counts["PAYMENT_COMPLETED"],
-        "payments": all_payments,
+        "cancelled_count": counts["PAYMENT_CANCELLED"],
+        "expired_count": counts["PAYMENT_EXPIRED"],
+        "payments": payments,
     }
 
 
+@router.get("/api/v2/pending-payments")
+async def list_payments(
+    request: Request,
+    since: str | None = None,
+    until: str | None = None,
+    last_seconds: float | None = None,
+    status: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    order: str = Query(default="asc", pattern="^(asc|desc)$"),
+):
+    """
+    결제 목록 조회 (개발용)
+    since/until(ISO8601) 또는 last_seconds로 created_at 구간을 지정하면 시간순 인덱스로 조회합니다.
+    order=desc면 최신순으로 조회하므로 limit과 함께 쓰면 구간의 가장 최근 결제 limit건을 받습니다.
+    
+    응답 바이트는 (쿼리, 저장소 변경 세대)별로 캐시되어 쓰기가 없는 동안 재사용되고,
+    ETag/If-None-Match로 변경이 없으면 304를 반환합니다.
+    last_seconds는 현재 시각 기준이라 같은 세대에서도 결과가 달라지므로 캐시하지 않습니다.
+    """
+    if last_seconds is not None:
+        content = await _list_payments_content(since, until, last_seconds, status, limit, order)
+        return await _json_response(request, _encode_json(content))
+    
+    # 세대를 먼저 읽어서 조회 중 쓰기가 끼어들면 이전 세대로 저장 -> 다음 조회에서 다시 만듦
+    generation = await payment_storage.generation()
+    key = ("pending-payments", since, until, status, limit, order)
+    entry = response_cache.get(key, generation)
+    if entry is None:
+        content = await _list_payments_content(since, until, None, status, limit, order)
+        entry = response_cache.put(key, generation, _encode_json(content))
+    return await _etag_response(request, entry)
+
+
+@router.get("/api/v2/payments/export")
+async def export_payments(
+    request: Request,
+    since: str | None = None,
+    until: str | None = None,
+    last_seconds: float | None = None,
+    status: str | None = None,
+):
+    """
+    결제 내보내기 (created_at 오름차순 NDJSON 스트림)
+    저장소에서 EXPORT_PAGE_SIZE건씩 읽으며 보내므로 구간 전체를 메모리에 만들지 않습니다.
+    전체 크기를 미리 알 수 없으므로 클라이언트가 받으면 항상 스트리밍으로 압축합니다.
+    """
+    start_ns, end_ns = _parse_time_range(since, until, last_seconds)
+    
+    async def iter_lines():
+        async for payment in iter_payments_by_time_range(
+            payment_storage, start_ns, end_ns, status=status, page_size=EXPORT_PAGE_SIZE
+        ):
+            yield json.dumps(payment, ensure_ascii=False).encode("utf-8") + b"\n"
+    
+    encoding = _response_encoding(request, None)
+    if encoding is None:
+        return StreamingResponse(iter_lines(), media_type="application/x-ndjson", headers={"Vary": "Accept-Encoding"})
+    return StreamingResponse(
+        compress_async_stream(iter_lines(), encoding), media_type="application/x-ndjson",
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+    )
+
+
+@router.get("/api/v2/analytics")
+async def payment_analytics(
+    since: str | None = None,
+    until: str | None = None,
+    last_seconds: float | None = None,
+    bucket_sec: int = 60,
+    top: int = 10,
+):
+    """
+    결제 집계 (created_at 구간)
+    상태별 건수/금액, 버킷별 생성/완료 처리량, 완료 지연 백분위수, 사용자별 완료 금액 상위를 반환합니다.
+    """
+    if bucket_sec <= 0:
+        raise HTTPException(status_code=400, detail="bucket_sec는 1 이상이어야 합니다")
+    start_ns, end_ns = _parse_time_range(since, until, last_seconds)
+    try:
+        return await payment_engine.analytics(start_ns, end_ns, bucket_sec, top)
+    except AnalyticsWindowTooLarge as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/api/v2/webhooks/metrics")
+async def webhook_metrics():
+    """웹훅 전송 큐 지표 (호스트별 대기 건수/동시 전송 수/큐 대기 시간)"""
+    return await payment_engine.webhook_metrics()
+
+
+@router.get("/api/v2/webhooks/hosts")
+async def webhook_host_summary():
+    """콜백 호스트별 웹훅 전송 시도 요약 (최근 시도 기준 성공률/지연 백분위수/상태 코드 분포)"""
+    return await payment_engine.webhook_hosts()
+
+
+@router.get("/api/v2/cache/metrics")
+async def response_cache_metrics():
+    """결제 목록 응답 캐시 지표 (적중/미스/세대 불일치/제거 횟수, 항목 수, 압축본 포함 바이트)"""
+    return response_cache.stats()
+
+
+@router.get("/api/v2/payments/{payment_id}/webhook-attempts")
+async def payment_webhook_attempts(payment_id: str):
+    """결제의 웹훅 전송 시도 이력 (오래된 순, 시도별 상태 코드/지연/에러)"""
+    attempts = await payment_engine.webhook_attempts(payment_id)
+    if attempts is None:
+        raise HTTPException(status_code=404, detail="결제 ID를 찾을 수 없습니다")
+    return {"ok": True, "payment_id": payment_id, "attempts": attempts}
+
+
+def _shutting_down() -> HTTPException:
+    """종료 중 거부 (클라이언트는 잠시 후 다른 인스턴스/재시작된 서버로 재시도)"""
+    return HTTPException(status_code=503, detail="서버 종료 중입니다", headers={"Retry-After": "1"})
+
+
 @router.post("/api/v2/payments", response_model=PaymentCreateResponse)
 async def start_payment_v2(req: PaymentInitV2):
     """
@@ -72,49 +276,17 @@ async def start_payment_v2(req: PaymentInitV2):
         "status": "PENDING",
         "created_at": created_at,
         "confirmed_at": None,
-        "callback_url": str(req.callback_url),
+        "callback_url": req.callback_url,  # 요청 모델에서 정규화된 문자열
     }
     
-    payment_storage.create_payment(payment_data)
-    log.info(f"결제 요청 생성: {payment_id}, 주문ID: {req.order_id}, 상태: PENDING")
-    
-    # 자동결제 처리 전 2초 대기
-    await asyncio.sleep(2)
-    log.info("자동결제 처리 시작 - 2초 대기 완료")
-    
-    # 자동으로 결제 완료 처리
+    # 결제 저장 + 자동 완료 예약 (샤드 모드면 payment_id 담당 샤드에서 처리)
     try:
-        # 결제 완료로 상태 변경
-        confirmed_at = now_iso()
-        payment_storage.update_payment(payment_id, {
-            "status": "PAYMENT_COMPLETED",
-            "confirmed_at": confirmed_at
-        })
-        
-        log.info(f"자동 결제 완료 처리: {payment_id}, 주문ID: {req.order_id}, 상태: PAYMENT_COMPLETED")
-        
-        # 웹훅 전송용 페이로드 생성
-        updated_payment = payment_storage.get_payment(payment_id)
-        webhook_payload = create_webhook_payload(updated_payment)
-        
-        # 웹훅 전송
-        callback_url = str(req.callback_url)
-        log.info(f"웹훅 전송 시도: {callback_url}")
-        
-        await post_webhook(callback_url, webhook_payload, event="payment.completed")
-        log.info(f"웹훅 전송 완료: {callback_url}")
-        
-        # 웹훅 전송 성공 시에만 PAYMENT_COMPLETED 반환
-        return {"ok": True, "tx_id": req.tx_id, "status": "PAYMENT_COMPLETED", "payment_id": payment_id}
-        
-    except Exception as e:
-        log.error(f"자동 결제 완료 처리 실패: {e}")
-        # 웹훅 전송 실패 시 결제 취소로 상태 변경
-        payment_storage.update_payment(payment_id, {
-            "status": "PAYMENT_CANCELLED"
-        })
-        log.info(f"웹훅 실패로 결제 취소 처리: {payment_id}, 주문ID: {req.order_id}, 상태: PAYMENT_CANCELLED")
-        return {"ok": True, "tx_id": req.tx_id, "status": "PAYMENT_CANCELLED", "payment_id": payment_id}
+        status = await payment_engine.start(payment_data)
+    except WorkflowShuttingDown:
+        raise _shutting_down()
+    return _trusted_response(
+        PaymentCreateResponse.model_construct(ok=True, tx_id=req.tx_id, status=status, payment_id=payment_id)
+    )
 
 
 @router.post("/api/v2/confirm-payment", response_model=PaymentConfirmResponse)
@@ -124,44 +296,18 @@ async def confirm_payment_v2(req: PaymentConfirmRequest):
     """
     payment_id = req.payment_id
     
-    payment = payment_storage.get_payment(payment_id)
-    if not payment:
+    # PENDING -> 완료 전환 + 웹훅 전송 (실패 시 결제 취소)
+    try:
+        result = await payment_engine.confirm(payment_id)
+    except PaymentNotFound:
         raise HTTPException(status_code=404, detail="결제 ID를 찾을 수 없습니다")
-    
-    if payment["status"] != "PENDING":
+    except PaymentAlreadyProcessed:
         raise HTTPException(status_code=400, detail="이미 처리된 결제입니다")
+    except WorkflowShuttingDown:
+        raise _shutting_down()
     
-    # 결제 완료로 상태 변경
-    confirmed_at = now_iso()
-    payment_storage.update_payment(payment_id, {
-        "status": "PAYMENT_COMPLETED",
-        "confirmed_at": confirmed_at
-    })
-    
-    log.info(f"결제 완료 처리: {payment_id}, 주문ID: {payment['order_id']}, 상태: PAYMENT_COMPLETED")
-    
-    # 웹훅 전송
-    try:
-        updated_payment = payment_storage.get_payment(payment_id)
-        webhook_payload = create_webhook_payload(updated_payment)
-        
-        callback_url = payment["callback_url"]
-        log.info(f"웹훅 전송 시도: {callback_url}")
-        
-        await post_webhook(callback_url, webhook_payload, event="payment.completed")
-        log.info(f"웹훅 전송 완료: {callback_url}")
-        
-    except Exception as e:
-        log.error(f"웹훅 전송 실패: {e}")
-        # 웹훅 실패 시 결제 취소 처리
-        payment_storage.update_payment(payment_id, {
-            "status": "PAYMENT_CANCELLED"
-        })
-        log.info(f"웹훅 실패로 결제 취소 처리: {payment_id}, 주문ID: {payment['order_id']}, 상태: PAYMENT_CANCELLED")
-    
-    return {
-        "ok": True,
-        "payment_id": payment_id,
-        "status": "PAYMENT_COMPLETED",
-        "confirmed_at": confirmed_at
-    }
+    return _trusted_response(
+        PaymentConfirmResponse.model_construct(
+            ok=True, payment_id=payment_id, status=result["status"], confirmed_at=result["confirmed_at"]
+        )
+    )
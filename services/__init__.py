@@ -0,0 +1 @@
+# services 패키지
@@ -0,0 +1,157 @@
+"""
+Payment Server 결제 엔진
+결제 생성/완료와 웹훅·분석 조회를 처리합니다.
+단일 프로세스면 이 프로세스의 저장소/작업으로 처리하고, PAYMENT_SHARDS > 0이면 담당 샤드 워커로 보냅니다.
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List
+
+from config.settings import PAYMENT_SHARDS
+from analytics.payment_analytics import AnalyticsWindowTooLarge, merge_summaries, payment_columns
+from services.payment_workflow import WorkflowShuttingDown, payment_workflow
+from services.webhook_attempts import merge_host_summaries, webhook_attempts
+from services.webhook_delivery import merge_metrics, webhook_dispatcher
+from shards.ipc import ShardCallError
+from shards.router import ShardRouter, shard_router
+from storage.payment_storage import payment_storage
+from utils.payment_utils import now_iso
+
+log = logging.getLogger("payment_engine")
+
+
+class PaymentNotFound(Exception):
+    """결제 ID 없음"""
+
+
+class PaymentAlreadyProcessed(Exception):
+    """PENDING이 아니어서 완료 처리할 수 없는 결제"""
+
+
+class PaymentEngine:
+    """단일 프로세스 결제 엔진 (샤드 워커 안에서도 이 엔진으로 처리)"""
+
+    async def start(self, payment_data: Dict[str, Any]) -> str:
+        """결제 생성 + 자동 완료 예약, 자동 완료/웹훅 처리 후 최종 상태 반환"""
+        payment_id = payment_data["payment_id"]
+        # 종료 중이면 저장소를 바꾸기 전에 거부 (결제만 남고 자동 완료가 예약되지 않는 것 방지)
+        payment_workflow.ensure_accepting()
+        await payment_storage.create_payment(payment_data)
+        log.info("결제 요청 생성: %s, 주문ID: %s, 상태: PENDING", payment_id, payment_data["order_id"],
+                 extra={"msg_type": "payment.created", "payment_id": payment_id, "tx_id": payment_data["tx_id"]})
+
+        # 자동결제 처리 예약 (AUTO_COMPLETE_DELAY초 대기 후 완료 + 웹훅 전송)
+        # 요청이 끊겨도 작업은 계속 진행되고, 서버 종료 시 남은 작업은 저장 후 재시작 시 재개됨
+        return await asyncio.shield(payment_workflow.schedule_completion(payment_data))
+
+    async def confirm(self, payment_id: str) -> Dict[str, Any]:
+        """수동 결제 완료 + 웹훅 전송, {"status", "confirmed_at"} 반환"""
+        if not await payment_storage.get_payment(payment_id):
+            raise PaymentNotFound(payment_id)
+
+        # 종료 중이면 완료 전환 전에 거부 (완료됐는데 웹훅이 예약되지 않는 것 방지)
+        payment_workflow.ensure_accepting()
+        # 결제 완료로 상태 변경 (PENDING일 때만 - 동시 완료 요청 중 하나만 성공)
+        confirmed_at = now_iso()
+        payment = await payment_storage.transition(
+            payment_id, "PENDING", "PAYMENT_COMPLETED", {"confirmed_at": confirmed_at}
+        )
+        if payment is None:
+            raise PaymentAlreadyProcessed(payment_id)
+
+        log.info("결제 완료 처리: %s, 주문ID: %s, 상태: PAYMENT_COMPLETED", payment_id, payment["order_id"],
+                 extra={"msg_type": "payment.completed", "payment_id": payment_id, "tx_id": payment["tx_id"]})
+
+        # 웹훅 전송 (실패 시 결제 취소)
+        status = await asyncio.shield(payment_workflow.deliver(payment, event="payment.completed"))
+        return {"status": status, "confirmed_at": confirmed_at}
+
+    async def webhook_attempts(self, payment_id: str) -> list | None:
+        """결제의 웹훅 전송 시도 이력, 시도도 결제도 없으면 None"""
+        attempts = webhook_attempts.payment_history(payment_id)
+        if not attempts and not await payment_storage.get_payment(payment_id):
+            return None
+        return attempts
+
+    async def webhook_hosts(self) -> Dict[str, Any]:
+        return webhook_attempts.host_summary()
+
+    async def webhook_metrics(self) -> Dict[str, Any]:
+        return webhook_dispatcher.metrics()
+
+    async def analytics(
+        self, start_ns: int | None, end_ns: int | None, bucket_sec: int, top_n: int
+    ) -> Dict[str, Any]:
+        return payment_columns.summarize(start_ns, end_ns, bucket_sec=bucket_sec, top_n=top_n)
+
+    async def shard_health(self) -> List[bool]:
+        """샤드별 상태 (단일 프로세스는 샤드 없음)"""
+        return []
+
+
+class ShardedPaymentEngine:
+    """
+    샤드 프런트 결제 엔진
+
+    결제 생성/완료와 결제별 조회는 payment_id 담당 샤드에서 PaymentEngine으로 처리합니다.
+    웹훅 지표/호스트 요약/분석은 샤드마다 따로 집계한 뒤 단일 프로세스와 같은 형식으로 합칩니다
+    (건수/금액은 정확히 합산, 백분위수는 샤드별 최댓값 - 각 merge 함수 참고).
+    """
+
+    _ERRORS = {
+        cls.__name__: cls
+        for cls in (PaymentNotFound, PaymentAlreadyProcessed, AnalyticsWindowTooLarge, WorkflowShuttingDown)
+    }
+
+    def __init__(self, router: ShardRouter = shard_router):
+        self._router = router
+
+    async def _call(self, payment_id: str, op: str, *args: Any) -> Any:
+        try:
+            return await self._router.call(payment_id, op, *args)
+        except ShardCallError as e:
+            if e.kind in self._ERRORS:
+                raise self._ERRORS[e.kind](e.detail) from None
+            raise
+
+    async def _broadcast(self, op: str, *args: Any) -> List[Any]:
+        try:
+            return await self._router.broadcast(op, *args)
+        except ShardCallError as e:
+            if e.kind in self._ERRORS:
+                raise self._ERRORS[e.kind](e.detail) from None
+            raise
+
+    async def start(self, payment_data: Dict[str, Any]) -> str:
+        return await self._call(payment_data["payment_id"], "start", payment_data)
+
+    async def confirm(self, payment_id: str) -> Dict[str, Any]:
+        return await self._call(payment_id, "confirm", payment_id)
+
+    async def webhook_attempts(self, payment_id: str) -> list | None:
+        return await self._call(payment_id, "webhook_attempts", payment_id)
+
+    async def webhook_hosts(self) -> Dict[str, Any]:
+        return merge_host_summaries(await self._broadcast("webhook_hosts"))
+
+    async def webhook_metrics(self) -> Dict[str, Any]:
+        return merge_metrics(await self._broadcast("webhook_metrics"))
+
+    async def analytics(
+        self, start_ns: int | None, end_ns: int | None, bucket_sec: int, top_n: int
+    ) -> Dict[str, Any]:
+        return merge_summaries(await self._broadcast("analytics", start_ns, end_ns, bucket_sec, top_n), top_n)
+
+    async def shard_health(self) -> List[bool]:
+        return await self._router.health()
+
+
+def create_payment_engine() -> PaymentEngine | ShardedPaymentEngine:
+    """설정(PAYMENT_SHARDS)에 맞는 결제 엔진 생성"""
+    if PAYMENT_SHARDS > 0:
+        return ShardedPaymentEngine()
+    return PaymentEngine()
+
+
+# 전역 결제 엔진 인스턴스
+payment_engine = create_payment_engine()
@@ -0,0 +1,125 @@
+"""
+Payment Server 결제 만료 처리
+PENDING 상태로 TTL을 넘긴 결제를 PAYMENT_EXPIRED로 전환합니다.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Dict, Any, List, Set
+
+from config.settings import PAYMENT_PENDING_TTL, PAYMENT_EXPIRY_INTERVAL, PAYMENT_EXPIRY_WEBHOOK
+from storage.payment_storage import payment_storage
+from services.payment_workflow import payment_workflow
+from utils.payment_utils import now_iso, iso_to_epoch_ns
+
+log = logging.getLogger("payment_expiry")
+
+
+class PaymentExpiry:
+    """
+    결제 만료 엔진 (deadline 최소 힙)
+
+    PENDING 결제가 생성되면 (created_at + TTL, payment_id)를 힙에 넣고,
+    매 tick마다 기한이 지난 항목만 꺼내므로 tick 비용은 O(만료 건수 · log n) 입니다.
+    이미 완료/취소된 결제는 꺼낼 때 버립니다 (lazy deletion).
+    """
+
+    def __init__(self, ttl: float, interval: float, emit_webhook: bool):
+        self.ttl_ns = int(ttl * 1_000_000_000)
+        self.interval = interval
+        self.emit_webhook = emit_webhook
+        self._heap: List[tuple[int, str]] = []
+        self._scheduled: Set[str] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_ns > 0
+
+    def _deadline(self, payment: Dict[str, Any]) -> int:
+        return iso_to_epoch_ns(payment["created_at"]) + self.ttl_ns
+
+    def observe(self, payment: Dict[str, Any]) -> None:
+        """저장소 변경 반영 (PaymentStorage 구독자) - PENDING 결제의 만료 기한 등록"""
+        if not self.enabled or payment["status"] != "PENDING":
+            return
+        payment_id = payment["payment_id"]
+        if payment_id in self._scheduled:
+            return
+        self._scheduled.add(payment_id)
+        heapq.heappush(self._heap, (self._deadline(payment), payment_id))
+
+    async def seed(self) -> None:
+        """저장소에 이미 있는 PENDING 결제 등록 (시작 시)"""
+        for payment in await payment_storage.get_payments_by_status("PENDING"):
+            self.observe(payment)
+
+    async def expire_due(self, now_ns: int) -> List[Dict[str, Any]]:
+        """기한이 지난 PENDING 결제를 PAYMENT_EXPIRED로 전환하고 전환된 결제 목록 반환"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now_ns:
+            _, payment_id = heapq.heappop(self._heap)
+            self._scheduled.discard(payment_id)
+
+            payment = await payment_storage.get_payment(payment_id)
+            if payment is None or payment["status"] != "PENDING":
+                continue
+            # 같은 payment_id로 재생성된 경우 기한이 늘어났을 수 있음
+            deadline = self._deadline(payment)
+            if deadline > now_ns:
+                self._scheduled.add(payment_id)
+                heapq.heappush(self._heap, (deadline, payment_id))
+                continue
+
+            # 완료 처리와 경합하면 먼저 전환된 쪽만 반영
+            payment = await payment_storage.transition(
+                payment_id, "PENDING", "PAYMENT_EXPIRED", {"expired_at": now_iso()}
+            )
+            if payment is None:
+                continue
+            log.info("결제 만료 처리: %s, 주문ID: %s, 상태: PAYMENT_EXPIRED", payment_id, payment["order_id"],
+                     extra={"msg_type": "payment.expired", "payment_id": payment_id, "tx_id": payment["tx_id"]})
+            expired.append(payment)
+        return expired
+
+    async def tick(self, now_ns: int) -> List[Dict[str, Any]]:
+        """한 주기 처리: 기한이 지난 결제 만료 + (설정 시) 만료 웹훅 예약, 전환된 결제 목록 반환"""
+        expired = await self.expire_due(now_ns)
+        if self.emit_webhook and payment_workflow.accepting:
+            # 만료 웹훅은 결제 처리 흐름에 맡겨 종료 시 남은 전송이 저장/재개되도록 함
+            for payment in expired:
+                payment_workflow.deliver(payment, event="payment.expired", cancel_on_failure=False)
+        return expired
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick(time.time_ns())
+            except Exception:
+                log.exception("결제 만료 처리 중 오류")
+
+    async def start(self) -> None:
+        """만료 루프 시작 (TTL이 0 이하면 비활성화)"""
+        if not self.enabled or self._task is not None:
+            return
+        await self.seed()
+        self._task = asyncio.create_task(self._run())
+        log.info("결제 만료 엔진 시작: TTL %ss, 주기 %ss", self.ttl_ns / 1_000_000_000, self.interval)
+
+    async def stop(self) -> None:
+        """만료 루프 중지"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# 전역 만료 엔진 인스턴스 (저장소 변경 구독)
+payment_expiry = PaymentExpiry(PAYMENT_PENDING_TTL, PAYMENT_EXPIRY_INTERVAL, PAYMENT_EXPIRY_WEBHOOK)
+payment_storage.subscribe(payment_expiry.observe)
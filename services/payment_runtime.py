@@ -0,0 +1,39 @@
+"""
+Payment Server 결제 처리 실행 환경
+저장소/웹훅 전송/만료 처리/자동 완료 작업의 시작과 종료 순서를 정의합니다.
+단일 프로세스 서버(main.py)와 샤드 워커(shards/worker.py)가 같은 순서로 사용합니다.
+"""
+from contextlib import asynccontextmanager
+
+from config.settings import WEBHOOK_WARM_HOSTS, SHUTDOWN_DRAIN_TIMEOUT
+from analytics.payment_analytics import payment_columns
+from services.payment_expiry import payment_expiry
+from services.payment_workflow import payment_workflow
+from services.webhook_client import webhook_client
+from services.webhook_delivery import webhook_dispatcher
+from storage.payment_storage import payment_storage
+
+
+@asynccontextmanager
+async def payment_services(drain_timeout: float = SHUTDOWN_DRAIN_TIMEOUT):
+    """결제 처리 백그라운드 작업 시작/종료"""
+    # 저장된 결제의 콜백 호스트 + 설정된 호스트로 웹훅 연결 예열
+    stored = await payment_storage.get_all_payments()
+    callback_urls = {p["callback_url"] for p in stored.values()}
+    await webhook_client.start([*WEBHOOK_WARM_HOSTS, *callback_urls])
+    webhook_dispatcher.start()
+    # 공유 저장소(Redis)에 이미 있는 결제를 분석 컬럼에 적재
+    for payment in stored.values():
+        payment_columns.observe(payment)
+    await payment_expiry.start()
+    # 이전 종료 시 저장된 자동 완료 예약/웹훅 전송 재개
+    await payment_workflow.resume()
+    try:
+        yield
+    finally:
+        # 새 작업 접수 중단 -> 진행 중 작업 대기 -> 남은 작업 저장 순으로 종료
+        await payment_workflow.shutdown(drain_timeout)
+        await payment_expiry.stop()
+        await webhook_dispatcher.stop()
+        await payment_storage.close()
+        await webhook_client.stop()
@@ -0,0 +1,210 @@
+"""
+Payment Server 결제 처리 흐름
+자동 완료 예약과 웹훅 후속 처리를 요청과 분리된 작업으로 실행하고,
+종료 시 남은 작업을 파일로 저장했다가 다음 시작 시 이어서 처리합니다.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Dict, Any, List
+
+from config.settings import AUTO_COMPLETE_DELAY, WORK_STATE_FILE
+from services.webhook_delivery import WebhookDispatcher, webhook_dispatcher
+from storage.payment_storage import payment_storage
+from utils.payment_utils import now_iso, create_webhook_payload
+
+log = logging.getLogger("payment_workflow")
+
+
+class WorkflowShuttingDown(Exception):
+    """종료 중이라 새 결제 작업(생성/완료)을 받지 않음 (API는 503)"""
+
+
+class PaymentWorkflow:
+    """
+    결제 후속 작업 관리
+
+    작업 항목(dict)은 JSON으로 저장 가능한 형태로 유지됩니다.
+        {"kind": "complete", "payment": {...}, "due_at": epoch초}
+        {"kind": "deliver", "payment": {...}, "event": "...", "cancel_on_failure": bool, "delivery_id": "..."}
+    자동 완료 작업은 완료 전환 후 같은 항목이 deliver 단계로 바뀝니다.
+    delivery_id는 항목과 함께 저장되어 X-Payment-Delivery-Id로 전송되므로, 종료 직전 이미 보낸 웹훅을
+    재시작 후 다시 보내도 수신 측이 같은 전송으로 알아보고 버릴 수 있습니다.
+    요청 핸들러는 작업을 asyncio.shield로 기다리므로 요청이 끊겨도 작업은 계속 진행됩니다.
+    저장소를 바꾸기 전에 ensure_accepting()으로 종료 중인지 확인하고, 확인 뒤 종료가 시작돼 늦게 예약된 작업도
+    shutdown()이 함께 기다리거나 저장합니다.
+    """
+
+    def __init__(self, state_file: str = WORK_STATE_FILE, dispatcher: WebhookDispatcher = webhook_dispatcher):
+        self.state_file = state_file
+        self.dispatcher = dispatcher
+        self.accepting = True
+        self._inflight: Dict[asyncio.Task, Dict[str, Any]] = {}
+
+    def ensure_accepting(self) -> None:
+        """종료 중이면 WorkflowShuttingDown (결제 생성/완료 전환 전에 호출)"""
+        if not self.accepting:
+            raise WorkflowShuttingDown("서버 종료 중에는 결제 작업을 받지 않습니다")
+
+    def _spawn(self, item: Dict[str, Any]) -> asyncio.Task:
+        # 저장소 변경이 끝난 뒤 예약되는 작업이므로 종료 중이어도 거부하지 않음 (shutdown이 기다리거나 저장)
+        task = asyncio.create_task(self._run(item))
+        self._inflight[task] = item
+        task.add_done_callback(self._forget)
+        return task
+
+    def _forget(self, task: asyncio.Task) -> None:
+        self._inflight.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("결제 후속 작업 실패: %s", task.exception())
+
+    def schedule_completion(self, payment: Dict[str, Any], delay: float = AUTO_COMPLETE_DELAY) -> asyncio.Task:
+        """delay초 후 자동 완료 + 웹훅 전송 예약, 최종 상태를 반환하는 작업"""
+        return self._spawn({"kind": "complete", "payment": dict(payment), "due_at": time.time() + delay})
+
+    def deliver(
+        self, payment: Dict[str, Any], event: str = "payment.completed", cancel_on_failure: bool = True
+    ) -> asyncio.Task:
+        """웹훅 전송 (실패 시 cancel_on_failure면 결제 취소), 최종 상태를 반환하는 작업"""
+        return self._spawn({
+            "kind": "deliver", "payment": dict(payment), "event": event, "cancel_on_failure": cancel_on_failure,
+            "delivery_id": uuid.uuid4().hex,
+        })
+
+    async def _run(self, item: Dict[str, Any]) -> str:
+        if item["kind"] == "complete":
+            return await self._complete(item)
+        return await self._deliver(item)
+
+    async def _complete(self, item: Dict[str, Any]) -> str:
+        payment = item["payment"]
+        payment_id = payment["payment_id"]
+        fields = {"payment_id": payment_id, "tx_id": payment["tx_id"]}
+
+        await asyncio.sleep(max(0.0, item["due_at"] - time.time()))
+        log.info("자동결제 처리 시작 - 대기 완료", extra={**fields, "msg_type": "payment.auto_complete"})
+
+        # 결제 완료로 상태 변경 (그 사이 수동 완료/만료된 경우 전환되지 않음)
+        completed = await payment_storage.transition(
+            payment_id, "PENDING", "PAYMENT_COMPLETED", {"confirmed_at": now_iso()}
+        )
+        if completed is None:
+            current = await payment_storage.get_payment(payment_id)
+            status = current["status"] if current else "PAYMENT_CANCELLED"
+            log.info("자동 결제 완료 생략 (이미 처리됨): %s, 상태: %s", payment_id, status,
+                     extra={**fields, "msg_type": "payment.auto_complete"})
+            return status
+
+        log.info("자동 결제 완료 처리: %s, 주문ID: %s, 상태: PAYMENT_COMPLETED", payment_id, payment["order_id"],
+                 extra={**fields, "msg_type": "payment.completed"})
+        item.update({
+            "kind": "deliver", "payment": completed, "event": "payment.completed", "cancel_on_failure": True,
+            "delivery_id": uuid.uuid4().hex,
+        })
+        del item["due_at"]
+        return await self._deliver(item)
+
+    async def _deliver(self, item: Dict[str, Any]) -> str:
+        payment = item["payment"]
+        payment_id = payment["payment_id"]
+        fields = {"payment_id": payment_id, "tx_id": payment["tx_id"]}
+        callback_url = payment["callback_url"]
+        try:
+            log.info("웹훅 전송 시도: %s", callback_url, extra={**fields, "msg_type": "webhook.sending"})
+            await self.dispatcher.deliver(
+                callback_url, create_webhook_payload(payment), event=item["event"], delivery_id=item.get("delivery_id")
+            )
+            log.info("웹훅 전송 완료: %s", callback_url, extra={**fields, "msg_type": "webhook.sent"})
+            return payment["status"]
+        except Exception as e:
+            log.error("웹훅 전송 실패: %s", e, extra={**fields, "msg_type": "webhook.failed"})
+            if not item["cancel_on_failure"]:
+                return payment["status"]
+            # 웹훅 전송 실패 시 결제 취소로 상태 변경
+            await payment_storage.transition(payment_id, "PAYMENT_COMPLETED", "PAYMENT_CANCELLED")
+            log.warning("웹훅 실패로 결제 취소 처리: %s, 주문ID: %s, 상태: PAYMENT_CANCELLED",
+                        payment_id, payment["order_id"], extra={**fields, "msg_type": "payment.cancelled"})
+            return "PAYMENT_CANCELLED"
+
+    def pending_items(self) -> List[Dict[str, Any]]:
+        """진행 중인 작업 항목 목록"""
+        return list(self._inflight.values())
+
+    async def shutdown(self, timeout: float) -> None:
+        """
+        종료 처리: 새 작업 접수를 멈추고 진행 중 작업을 timeout초까지 기다린 뒤,
+        남은 작업은 취소하고 파일로 저장합니다.
+        """
+        self.accepting = False
+        tasks = list(self._inflight)
+        if tasks:
+            log.info("진행 중 결제 작업 %d건 종료 대기 (최대 %ss)", len(tasks), timeout)
+            await asyncio.wait(tasks, timeout=timeout)
+        # 대기 중에 늦게 예약된 작업(종료 전 접수된 요청)도 포함
+        pending = [task for task in self._inflight if not task.done()]
+
+        items = [self._inflight[task] for task in pending]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if items:
+            self._save(items)
+            log.warning("미완료 결제 작업 %d건 저장: %s", len(items), self.state_file)
+
+    def _save(self, items: List[Dict[str, Any]]) -> None:
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.state_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": now_iso(), "items": items}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_file)
+
+    def _load(self) -> List[Dict[str, Any]]:
+        """저장 파일의 작업 항목 목록 (형식이 맞지 않으면 ValueError)"""
+        with open(self.state_file, encoding="utf-8") as f:
+            items = json.load(f)["items"]
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict) and item.get("kind") in ("complete", "deliver")
+            and isinstance(item.get("payment"), dict) for item in items
+        ):
+            raise ValueError("작업 항목 형식이 올바르지 않습니다")
+        return items
+
+    async def resume(self) -> int:
+        """
+        저장된 작업을 불러와 다시 예약, 재개한 작업 수 반환
+        파일을 읽을 수 없거나 손상됐으면 시작을 막지 않도록 오류를 남기고 파일을 .corrupt-{시각}으로 옮겨 둡니다.
+        """
+        if not os.path.exists(self.state_file):
+            return 0
+        try:
+            items = self._load()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            quarantine = f"{self.state_file}.corrupt-{int(time.time())}"
+            log.error("저장된 결제 작업 파일을 읽을 수 없어 격리합니다: %s -> %s (%s)", self.state_file, quarantine, e)
+            try:
+                os.replace(self.state_file, quarantine)
+            except OSError as move_error:
+                log.error("저장된 결제 작업 파일 격리 실패: %s", move_error)
+            return 0
+        os.remove(self.state_file)
+
+        for item in items:
+            if item["kind"] == "deliver":
+                # 이전 형식 파일에는 없을 수 있음
+                item.setdefault("delivery_id", uuid.uuid4().hex)
+            payment = item["payment"]
+            # 인메모리 저장소는 재시작 시 비어 있으므로 저장해 둔 결제 데이터로 복원
+            if await payment_storage.get_payment(payment["payment_id"]) is None:
+                await payment_storage.create_payment(dict(payment))
+            self._spawn(item)
+        log.info("저장된 결제 작업 %d건 재개", len(items))
+        return len(items)
+
+
+# 전역 결제 처리 흐름 인스턴스
+payment_workflow = PaymentWorkflow()
@@ -0,0 +1,143 @@
+"""
+Payment Server 조회 응답 캐시
+저장소 변경 세대(generation)별로 인코딩이 끝난 응답 바이트와 ETag, 압축본(gzip/zstd)을 보관합니다.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable
+
+from config.settings import RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TOTAL_BYTES
+from storage.payment_backend import Generation
+from utils.compression import compress_async, SUPPORTED_ENCODINGS
+
+
+def _generation_tag(generation: Generation) -> str:
+    """ETag용 세대 표기 (정수는 그대로, 샤드별 (부팅 id, 세대) 튜플은 짧은 해시)"""
+    if isinstance(generation, int):
+        return str(generation)
+    return hashlib.blake2b(repr(generation).encode("utf-8"), digest_size=6).hexdigest()
+
+
+class CachedResponse:
+    """인코딩된 응답 1건 (body와 ETag는 만들어진 세대에서만 유효)"""
+
+    __slots__ = ("generation", "body", "etag", "variants", "_owner")
+
+    def __init__(self, generation: Generation, body: bytes):
+        self.generation = generation
+        # 이 항목을 보관 중인 캐시 (압축본이 늘어난 만큼 전체 바이트에 반영, 제거되면 None)
+        self._owner: "ResponseCache | None" = None
+        self.body = body
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        self.etag = f'"{_generation_tag(generation)}-{digest}"'
+        # 압축 방식별 압축본 (처음 요청될 때 만들어 같은 세대 동안 재사용)
+        self.variants: Dict[str, bytes] = {}
+
+    async def encoded(self, encoding: str) -> bytes:
+        body = self.variants.get(encoding)
+        if body is None:
+            compressed = await compress_async(self.body, encoding)
+            # 압축을 기다리는 동안 같은 방식이 먼저 저장됐으면 그것을 사용
+            body = self.variants.setdefault(encoding, compressed)
+            if body is compressed and self._owner is not None:
+                self._owner._grow(len(body))
+        return body
+
+    def etag_for(self, encoding: str | None) -> str:
+        """압축 방식별 ETag (바이트가 다르므로 "세대-해시-방식"으로 구분)"""
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.variants.values())
+
+
+class ResponseCache:
+    """
+    조회 응답 LRU 캐시
+
+    키는 (엔드포인트, 쿼리 파라미터) 튜플이고, 항목은 만들어진 변경 세대와 함께 저장됩니다.
+    조회 시 세대가 현재 세대와 다르면 미스로 처리하므로 (query, generation) 키와 같고,
+    쓰기가 일어나 세대가 올라가면 이전 항목은 다음 조회 때 새 응답으로 교체됩니다.
+    항목 수(max_entries), 항목당 크기(max_bytes), 압축본을 포함한 전체 바이트(max_total_bytes)로 메모리를 제한합니다.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_ENTRIES,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        max_total_bytes: int = RESPONSE_CACHE_TOTAL_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "skipped": 0}
+
+    def get(self, key: Hashable, generation: Generation) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if entry.generation != generation:
+            self._stats["stale"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry
+
+    def put(self, key: Hashable, generation: Generation, body: bytes) -> CachedResponse:
+        """응답 저장 (캐시를 끄거나 max_bytes를 넘는 응답은 저장하지 않고 항목만 만들어 반환)"""
+        entry = CachedResponse(generation, body)
+        if self.max_entries <= 0 or len(body) > min(self.max_bytes, self.max_total_bytes):
+            self._stats["skipped"] += 1
+            return entry
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._release(previous)
+        self._entries[key] = entry
+        entry._owner = self
+        self._grow(len(body))
+        return entry
+
+    def _grow(self, size: int) -> None:
+        """보관 중인 항목이 size만큼 늘어남 -> 상한을 넘으면 오래된 항목부터 제거 (늘어난 항목 자신도 대상)"""
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_total_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._release(evicted)
+            self._stats["evictions"] += 1
+
+    def _release(self, entry: CachedResponse) -> None:
+        self._bytes -= entry.size
+        entry._owner = None
+
+    def stats(self) -> Dict[str, int]:
+        """적중/미스/세대 불일치/제거/저장 생략 횟수와 현재 항목 수/바이트 (GET /api/v2/cache/metrics)"""
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-Match 헤더(쉼표 구분 목록, W/ 약한 비교, *)에 etag가 포함되는지
+    압축본 ETag("...-gzip")도 같은 응답으로 봅니다 (약한 비교).
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate == "*" or candidate == etag:
+            return True
+        for encoding in SUPPORTED_ENCODINGS:
+            if candidate == f'{etag[:-1]}-{encoding}"':
+                return True
+    return False
+
+
+# 전역 조회 응답 캐시 인스턴스
+response_cache = ResponseCache()
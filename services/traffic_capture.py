@@ -0,0 +1,128 @@
+"""
+Payment Server 트래픽 캡처
+들어온 API 요청을 메모리 버퍼에 모았다가 주기적으로 JSONL 파일에 이어 씁니다 (TRAFFIC_CAPTURE=true일 때).
+파일 쓰기는 스레드에서 처리하므로 이벤트 루프를 막지 않고, 버퍼가 가득 차면 기록을 버립니다.
+
+한 줄 형식:
+    {"ts": epoch초, "method": "POST", "path": "/api/v2/payments", "query": "",
+     "headers": {"content-type": "application/json"}, "body": JSON 값 | null, "status": 200, "latency_ms": 2003.1}
+JSON이 아닌 본문은 "body" 대신 "body_text"(문자열)로 기록하고, 헤더는 CAPTURED_HEADERS에 있는 것만 기록합니다.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Any, List, Mapping
+
+from config.settings import (
+    TRAFFIC_CAPTURE, TRAFFIC_CAPTURE_FILE, TRAFFIC_CAPTURE_PATHS, TRAFFIC_CAPTURE_BUFFER,
+    TRAFFIC_CAPTURE_FLUSH_INTERVAL, TRAFFIC_CAPTURE_MAX_BODY,
+)
+
+log = logging.getLogger("traffic_capture")
+
+# 재생 시 응답이 달라지는 요청 헤더 (압축 방식, 조건부 요청, 본문 형식)
+CAPTURED_HEADERS = ("accept-encoding", "if-none-match", "content-type")
+
+
+def _body_fields(body: bytes, max_body: int) -> Dict[str, Any]:
+    """JSON 본문은 {"body": 값}, 아니면 {"body_text": 문자열} (없거나 너무 크면 {"body": None})"""
+    if not body or len(body) > max_body:
+        return {"body": None}
+    try:
+        return {"body": json.loads(body)}
+    except ValueError:
+        return {"body_text": body.decode("utf-8", errors="replace")}
+
+
+class TrafficCapture:
+    """요청 캡처 버퍼 + 주기적 파일 기록"""
+
+    def __init__(
+        self,
+        enabled: bool = TRAFFIC_CAPTURE,
+        path: str = TRAFFIC_CAPTURE_FILE,
+        prefixes: List[str] = TRAFFIC_CAPTURE_PATHS,
+        max_buffer: int = TRAFFIC_CAPTURE_BUFFER,
+        flush_interval: float = TRAFFIC_CAPTURE_FLUSH_INTERVAL,
+        max_body: int = TRAFFIC_CAPTURE_MAX_BODY,
+    ):
+        self.enabled = enabled
+        self.path = path
+        self.prefixes = tuple(prefixes)
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+        self.max_body = max_body
+        self._buffer: List[str] = []
+        self._task: asyncio.Task | None = None
+        self.stats: Dict[str, int] = {"recorded": 0, "written": 0, "dropped": 0}
+
+    def wants(self, path: str) -> bool:
+        return self.enabled and path.startswith(self.prefixes)
+
+    def record(
+        self, ts: float, method: str, path: str, query: str, body: bytes, status: int, latency: float,
+        headers: Mapping[str, str] | None = None,
+    ) -> None:
+        """요청 1건 기록 (버퍼에만 추가, 가득 차면 버림)"""
+        if len(self._buffer) >= self.max_buffer:
+            self.stats["dropped"] += 1
+            return
+        entry = {
+            "ts": round(ts, 6),
+            "method": method,
+            "path": path,
+            "query": query,
+            "headers": {name: headers[name] for name in CAPTURED_HEADERS if headers and name in headers},
+            **_body_fields(body, self.max_body),
+            "status": status,
+            "latency_ms": round(latency * 1000, 3),
+        }
+        if len(body) > self.max_body:
+            entry["body_bytes"] = len(body)
+        self._buffer.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        self.stats["recorded"] += 1
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._task = asyncio.create_task(self._flush_loop())
+        log.info("트래픽 캡처 시작: %s", self.path)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except OSError as e:
+                log.error("트래픽 캡처 파일 쓰기 실패: %s - %s", self.path, e)
+
+    async def flush(self) -> int:
+        """버퍼 내용을 파일에 이어 쓰기, 쓴 건수 반환"""
+        if not self._buffer:
+            return 0
+        lines, self._buffer = self._buffer, []
+        await asyncio.to_thread(self._append, lines)
+        self.stats["written"] += len(lines)
+        return len(lines)
+
+    def _append(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def stop(self) -> None:
+        """주기 기록 중단 후 남은 버퍼 기록"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+        log.info("트래픽 캡처 종료: 기록 %d건, 버림 %d건", self.stats["written"], self.stats["dropped"])
+
+
+# 전역 트래픽 캡처 인스턴스
+traffic_capture = TrafficCapture()
@@ -0,0 +1,199 @@
+"""
+Payment Server 웹훅 전송 시도 기록
+콜백 호스트별 링 버퍼와 결제별 최근 시도 목록으로 웹훅 전송 이력을 메모리에 보관합니다.
+"""
+import time
+from collections import deque, OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Deque, List
+
+import httpx
+
+from config.settings import (
+    WEBHOOK_ATTEMPTS_PER_HOST, WEBHOOK_ATTEMPTS_PER_PAYMENT, WEBHOOK_ATTEMPTS_MAX_PAYMENTS,
+)
+
+
+class _Attempt:
+    __slots__ = ("payment_id", "host", "event", "attempt", "at", "latency", "status_code", "error")
+
+    def __init__(
+        self, payment_id: str | None, host: str, event: str, attempt: int,
+        at: float, latency: float, status_code: int | None, error: str | None,
+    ):
+        self.payment_id = payment_id
+        self.host = host
+        self.event = event
+        self.attempt = attempt
+        self.at = at
+        self.latency = latency
+        self.status_code = status_code
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code is not None and self.status_code < 400
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "at": datetime.fromtimestamp(self.at, timezone.utc).isoformat().replace("+00:00", "Z"),
+            "payment_id": self.payment_id,
+            "host": self.host,
+            "event": self.event,
+            "attempt": self.attempt,
+            "ok": self.ok,
+            "status_code": self.status_code,
+            "latency_ms": round(self.latency * 1000, 3),
+            "error": self.error,
+        }
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class WebhookAttemptLog:
+    """
+    웹훅 전송 시도 저장소 (크기 제한)
+
+    - 호스트별: 최근 per_host건의 링 버퍼 (deque maxlen) + 누적 시도/성공 수
+    - 결제별: 최근 per_payment건, 결제 수는 max_payments까지 유지하고 오래된 결제부터 제거 (LRU)
+    두 인덱스는 같은 레코드 객체를 공유하므로 시도 1건당 레코드는 하나만 만들어집니다.
+    """
+
+    def __init__(
+        self,
+        per_host: int = WEBHOOK_ATTEMPTS_PER_HOST,
+        per_payment: int = WEBHOOK_ATTEMPTS_PER_PAYMENT,
+        max_payments: int = WEBHOOK_ATTEMPTS_MAX_PAYMENTS,
+    ):
+        self.per_host = max(1, per_host)
+        self.per_payment = max(1, per_payment)
+        self.max_payments = max(1, max_payments)
+        self._hosts: Dict[str, Deque[_Attempt]] = {}
+        # 호스트 -> [누적 시도 수, 누적 성공 수]
+        self._totals: Dict[str, List[int]] = {}
+        self._payments: "OrderedDict[str, Deque[_Attempt]]" = OrderedDict()
+
+    def record(
+        self,
+        url: str,
+        payment_id: str | None,
+        event: str,
+        attempt: int,
+        latency: float,
+        status_code: int | None = None,
+        error: str | None = None,
+    ) -> None:
+        """전송 시도 1건 기록 (응답을 받았으면 status_code, 요청 자체가 실패했으면 error)"""
+        try:
+            host = httpx.URL(url).netloc.decode("ascii")
+        except httpx.InvalidURL:
+            host = url
+        record = _Attempt(payment_id, host, event, attempt, time.time(), latency, status_code, error)
+
+        ring = self._hosts.get(host)
+        if ring is None:
+            ring = self._hosts[host] = deque(maxlen=self.per_host)
+            self._totals[host] = [0, 0]
+        ring.append(record)
+        totals = self._totals[host]
+        totals[0] += 1
+        if record.ok:
+            totals[1] += 1
+
+        if payment_id is None:
+            return
+        history = self._payments.get(payment_id)
+        if history is None:
+            history = self._payments[payment_id] = deque(maxlen=self.per_payment)
+            if len(self._payments) > self.max_payments:
+                self._payments.popitem(last=False)
+        else:
+            self._payments.move_to_end(payment_id)
+        history.append(record)
+
+    def payment_history(self, payment_id: str) -> List[Dict[str, Any]]:
+        """결제의 최근 전송 시도 (오래된 순)"""
+        return [record.to_dict() for record in self._payments.get(payment_id, ())]
+
+    def host_summary(self) -> Dict[str, Any]:
+        """호스트별 성공률/지연 요약 (링 버퍼 구간 + 누적 건수)"""
+        hosts = {}
+        for host, ring in self._hosts.items():
+            records = list(ring)
+            latencies = sorted(record.latency for record in records)
+            succeeded = sum(1 for record in records if record.ok)
+            status_codes: Dict[str, int] = {}
+            errors = 0
+            for record in records:
+                if record.status_code is None:
+                    errors += 1
+                else:
+                    key = str(record.status_code)
+                    status_codes[key] = status_codes.get(key, 0) + 1
+            last_failure = next((record for record in reversed(records) if not record.ok), None)
+            total, total_ok = self._totals[host]
+            hosts[host] = {
+                "window": len(records),
+                "success_rate": round(succeeded / len(records), 4) if records else None,
+                "latency_ms": {
+                    "avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                    "p50": round(_percentile(latencies, 0.50) * 1000, 3),
+                    "p95": round(_percentile(latencies, 0.95) * 1000, 3),
+                    "p99": round(_percentile(latencies, 0.99) * 1000, 3),
+                    "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+                },
+                "status_codes": status_codes,
+                "errors": errors,
+                "last_failure": last_failure.to_dict() if last_failure else None,
+                "total_attempts": total,
+                "total_succeeded": total_ok,
+            }
+        return {"per_host": self.per_host, "hosts": hosts}
+
+
+def merge_host_summaries(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    샤드별 host_summary 합치기 (샤드 모드 프런트용)
+
+    건수/상태 코드/누적 시도는 합산하고 성공률·평균 지연은 구간 건수(window)로 가중 평균합니다.
+    지연 백분위수는 샤드별 값만 있으므로 그중 최댓값(상한)을 사용합니다.
+    """
+    hosts: Dict[str, Dict[str, Any]] = {}
+    for part in parts:
+        for host, summary in part["hosts"].items():
+            merged = hosts.get(host)
+            if merged is None:
+                hosts[host] = {
+                    **summary,
+                    "latency_ms": dict(summary["latency_ms"]),
+                    "status_codes": dict(summary["status_codes"]),
+                }
+                continue
+            window = merged["window"] + summary["window"]
+            if window:
+                succeeded = (merged["success_rate"] or 0) * merged["window"] + (summary["success_rate"] or 0) * summary["window"]
+                merged["success_rate"] = round(succeeded / window, 4)
+                latency = merged["latency_ms"]
+                latency["avg"] = round(
+                    (latency["avg"] * merged["window"] + summary["latency_ms"]["avg"] * summary["window"]) / window, 3
+                )
+            for key in ("p50", "p95", "p99", "max"):
+                merged["latency_ms"][key] = max(merged["latency_ms"][key], summary["latency_ms"][key])
+            for code, count in summary["status_codes"].items():
+                merged["status_codes"][code] = merged["status_codes"].get(code, 0) + count
+            other_failure = summary["last_failure"]
+            if other_failure and (merged["last_failure"] is None or other_failure["at"] > merged["last_failure"]["at"]):
+                merged["last_failure"] = other_failure
+            merged["window"] = window
+            for key in ("errors", "total_attempts", "total_succeeded"):
+                merged[key] += summary[key]
+    per_host = max((part["per_host"] for part in parts), default=0)
+    return {"per_host": per_host, "hosts": hosts}
+
+
+# 전역 웹훅 전송 시도 기록 인스턴스
+webhook_attempts = WebhookAttemptLog()
@@ -0,0 +1,245 @@
+"""
+Payment Server 웹훅 HTTP 클라이언트
+커넥션 풀 공유, 콜백 호스트 DNS 캐시, 시작 시 연결 예열과 유휴 연결 keep-alive를 담당합니다.
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from typing import Dict, Iterable, List, Set
+
+import httpx
+
+from config.settings import (
+    WEBHOOK_TIMEOUT, WEBHOOK_DNS_CACHE_TTL, WEBHOOK_KEEPALIVE_INTERVAL, WEBHOOK_POOL_MAX_CONNECTIONS,
+)
+
+log = logging.getLogger("webhook_client")
+
+# 이 시간(초) 동안 사용되지 않은 호스트는 keep-alive 대상에서 제외
+_HOST_IDLE_LIMIT = 3600.0
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class WebhookClient:
+    """
+    웹훅 전송용 공유 HTTP 클라이언트
+
+    - 호스트별 DNS 조회 결과(주소 전체)를 TTL 동안 캐시하고, 요청 URL의 호스트를 캐시된 첫 주소로 바꿔 전송합니다
+      (Host 헤더와 TLS SNI는 원래 호스트명 유지). 연결에 실패한 주소는 목록 뒤로 보내고 다음 주소로 다시 시도하므로
+      httpx가 직접 조회할 때처럼 죽은 주소 하나에 막히지 않습니다.
+    - 시작 시 알려진 콜백 호스트를 미리 DNS 조회합니다. keepalive_interval > 0이면 시작 시 HEAD 요청으로 연결을 열고
+      유휴 호스트에도 주기적으로 HEAD 요청을 보내 풀의 연결을 살려 둡니다 (수신 서버에 요청이 가므로 기본 비활성화).
+    """
+
+    def __init__(
+        self,
+        timeout: float = WEBHOOK_TIMEOUT,
+        dns_ttl: float = WEBHOOK_DNS_CACHE_TTL,
+        keepalive_interval: float = WEBHOOK_KEEPALIVE_INTERVAL,
+        max_connections: int = WEBHOOK_POOL_MAX_CONNECTIONS,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.timeout = timeout
+        self.dns_ttl = dns_ttl
+        self.keepalive_interval = keepalive_interval
+        self.max_connections = max_connections
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        # (host, port) -> (주소 목록 - 앞쪽부터 사용, 만료 시각)
+        self._dns: Dict[tuple[str, int], tuple[List[str], float]] = {}
+        # (ip, port) -> 해당 주소로 해석된 호스트명들 (https 연결 공유 방지용)
+        self._ip_hosts: Dict[tuple[str, int], Set[str]] = {}
+        # origin(scheme://host:port) -> 마지막 사용 시각
+        self._origins: Dict[str, float] = {}
+        self._keepalive_task: asyncio.Task | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """공유 AsyncClient (최초 사용 시 생성)"""
+        if self._client is None:
+            keepalive_expiry = max(30.0, self.keepalive_interval * 2)
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            )
+        return self._client
+
+    async def resolve(self, host: str, port: int) -> str | None:
+        """호스트 DNS 조회 (TTL 캐시), 현재 사용할 주소 반환, 실패 시 None"""
+        addresses = await self._addresses(host, port)
+        return addresses[0] if addresses else None
+
+    async def _addresses(self, host: str, port: int) -> List[str]:
+        if _is_ip(host):
+            return [host]
+        key = (host, port)
+        cached = self._dns.get(key)
+        now = time.monotonic()
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            log.warning("DNS 조회 실패: %s - %s", host, e, extra={"url": host})
+            return []
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            return []
+        self._dns[key] = (addresses, now + self.dns_ttl)
+        for ip in addresses:
+            self._ip_hosts.setdefault((ip, port), set()).add(host)
+        return addresses
+
+    def _demote(self, host: str, port: int, ip: str) -> None:
+        """연결에 실패한 주소를 목록 맨 뒤로 (주소가 하나뿐이면 캐시를 지워 다음 요청에서 다시 조회)"""
+        cached = self._dns.get((host, port))
+        if cached is None or ip not in cached[0]:
+            return
+        addresses, expires = cached
+        if len(addresses) == 1:
+            del self._dns[(host, port)]
+            return
+        self._dns[(host, port)] = ([address for address in addresses if address != ip] + [ip], expires)
+        log.warning("웹훅 호스트 주소 연결 실패, 다음 주소 사용: %s (%s -> %s)", host, ip, self._dns[(host, port)][0][0],
+                    extra={"url": host})
+
+    def _pinning(self, url: httpx.URL) -> bool:
+        return self.dns_ttl > 0 and self._transport is None and bool(url.host) and not _is_ip(url.host)
+
+    def _pinned_request(
+        self, url: httpx.URL, ip: str, port: int
+    ) -> tuple[httpx.URL, Dict[str, str], Dict[str, str]] | None:
+        """ip로 바꾼 요청 URL과 추가 헤더/확장 (고정할 수 없으면 None)"""
+        extensions = {}
+        if url.scheme == "https":
+            # 같은 IP를 쓰는 다른 호스트와 TLS 연결이 공유되지 않도록 단독 호스트만 고정
+            if len(self._ip_hosts.get((ip, port), ())) > 1:
+                return None
+            extensions["sni_hostname"] = url.host
+        return url.copy_with(host=ip), {"Host": url.netloc.decode("ascii")}, extensions
+
+    async def _send(self, method: str, url: httpx.URL, **kwargs) -> httpx.Response:
+        """
+        요청 전송 (DNS 캐시 사용 시 캐시된 주소로 고정)
+        연결 실패(ConnectError/ConnectTimeout)면 그 주소를 뒤로 보내고 남은 주소로 차례로 다시 시도하며, 모두 실패하면 마지막 오류를 올립니다.
+        """
+        headers = kwargs.pop("headers", {})
+        if not self._pinning(url):
+            return await self.client.request(method, url, headers=headers, **kwargs)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        addresses = list(await self._addresses(url.host, port))
+        if not addresses:
+            return await self.client.request(method, url, headers=headers, **kwargs)
+        for i, ip in enumerate(addresses):
+            pinned = self._pinned_request(url, ip, port)
+            if pinned is None:
+                return await self.client.request(method, url, headers=headers, **kwargs)
+            request_url, extra_headers, extensions = pinned
+            try:
+                return await self.client.request(
+                    method, request_url, headers={**headers, **extra_headers}, extensions=extensions, **kwargs
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                self._demote(url.host, port, ip)
+                if i == len(addresses) - 1:
+                    raise
+
+    @staticmethod
+    def _origin(url: httpx.URL) -> str:
+        port = url.port or (443 if url.scheme == "https" else 80)
+        return f"{url.scheme}://{url.host}:{port}"
+
+    async def post(self, url: str, content: bytes, headers: Dict[str, str]) -> httpx.Response:
+        """웹훅 POST (공유 풀 + DNS 캐시)"""
+        target = httpx.URL(url)
+        self._origins[self._origin(target)] = time.monotonic()
+        return await self._send("POST", target, content=content, headers=headers)
+
+    async def _ping(self, origin: str) -> None:
+        """origin에 HEAD 요청을 보내 풀에 연결을 열어 두거나 유지"""
+        try:
+            await self._send("HEAD", httpx.URL(origin + "/"))
+        except httpx.HTTPError as e:
+            log.warning("웹훅 호스트 연결 예열 실패: %s - %s", origin, e, extra={"url": origin})
+
+    async def warmup(self, urls: Iterable[str]) -> None:
+        """콜백 URL들의 호스트를 미리 DNS 조회하고, keep-alive가 켜져 있으면 연결도 열어 둠 (시작 시 1회)"""
+        now = time.monotonic()
+        origins = set()
+        for url in urls:
+            try:
+                target = httpx.URL(url)
+            except httpx.InvalidURL:
+                continue
+            if target.scheme in ("http", "https") and target.host:
+                origins.add(self._origin(target))
+        for origin in origins:
+            self._origins.setdefault(origin, now)
+        if not origins:
+            return
+        started = time.perf_counter()
+        if self.keepalive_interval > 0:
+            warm = (self._ping(origin) for origin in origins)
+        else:
+            warm = (self._prefetch(origin) for origin in origins)
+        try:
+            await asyncio.wait_for(asyncio.gather(*warm), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            log.warning("웹훅 호스트 예열 시간 초과 (%ss)", self.timeout)
+        log.info("웹훅 호스트 예열 완료: %d개 호스트, %.1fms", len(origins), (time.perf_counter() - started) * 1000)
+
+    async def _prefetch(self, origin: str) -> None:
+        """origin 호스트 DNS 조회만 미리 해 둠 (요청은 보내지 않음)"""
+        target = httpx.URL(origin)
+        if self._pinning(target):
+            await self._addresses(target.host, target.port)
+
+    async def _keepalive(self) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            now = time.monotonic()
+            idle = []
+            for origin, last_used in list(self._origins.items()):
+                if now - last_used > _HOST_IDLE_LIMIT:
+                    del self._origins[origin]
+                elif now - last_used >= self.keepalive_interval:
+                    idle.append(origin)
+            if idle:
+                await asyncio.gather(*(self._ping(origin) for origin in idle))
+
+    async def start(self, urls: Iterable[str]) -> None:
+        """연결 예열 후 keep-alive 루프 시작"""
+        await self.warmup(urls)
+        if self.keepalive_interval > 0 and self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def stop(self) -> None:
+        """keep-alive 루프 중지 및 풀 종료"""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# 전역 웹훅 클라이언트 인스턴스
+webhook_client = WebhookClient()
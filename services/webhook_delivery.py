@@ -0,0 +1,303 @@
+"""
+Payment Server 웹훅 전송 스케줄러
+콜백 호스트별 큐와 Deficit Round Robin 스케줄링으로 느린 수신 서버가 다른 호스트의 전송을 막지 않도록 합니다.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Deque, List, Set
+
+import httpx
+
+from config.settings import (
+    WEBHOOK_GLOBAL_CONCURRENCY, WEBHOOK_HOST_CONCURRENCY, WEBHOOK_HOST_WEIGHTS,
+)
+from services.webhook_client import WebhookClient
+from utils.payment_utils import post_webhook
+
+log = logging.getLogger("webhook_delivery")
+
+# 호스트별 대기 시간 백분위수 계산에 쓰는 최근 샘플 수
+_WAIT_SAMPLES = 256
+
+
+class _DeliveryJob:
+    __slots__ = ("url", "payload", "event", "delivery_id", "future", "enqueued_at")
+
+    def __init__(
+        self, url: str, payload: Dict[str, Any], event: str, delivery_id: str | None, future: asyncio.Future
+    ):
+        self.url = url
+        self.payload = payload
+        self.event = event
+        self.delivery_id = delivery_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class _HostQueue:
+    __slots__ = (
+        "host", "weight", "jobs", "active", "deficit", "in_ring",
+        "delivered", "failed", "wait_count", "wait_total", "wait_max", "wait_samples",
+    )
+
+    def __init__(self, host: str, weight: float):
+        self.host = host
+        self.weight = weight
+        self.jobs: Deque[_DeliveryJob] = deque()
+        self.active = 0
+        self.deficit = 0.0
+        self.in_ring = False
+        self.delivered = 0
+        self.failed = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_samples: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def record_wait(self, wait: float) -> None:
+        self.wait_count += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.wait_samples.append(wait)
+
+
+def _percentile(samples: list, p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class WebhookDispatcher:
+    """
+    호스트별 공정 웹훅 전송 스케줄러
+
+    웹훅은 콜백 호스트(host:port)별 큐에 쌓이고, 스케줄러가 호스트들을 순환하며
+    가중치(quantum)만큼 deficit을 적립해 그만큼 전송을 시작합니다 (Deficit Round Robin).
+    동시 전송 수는 전역 상한과 호스트별 상한을 모두 넘지 않으므로,
+    응답이 느린 호스트는 자기 상한만큼만 점유하고 나머지 호스트는 계속 전송됩니다.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = WEBHOOK_GLOBAL_CONCURRENCY,
+        host_limit: int = WEBHOOK_HOST_CONCURRENCY,
+        weights: Dict[str, float] | None = None,
+        client: WebhookClient | None = None,
+    ):
+        self.global_limit = max(1, global_limit)
+        self.host_limit = max(1, host_limit)
+        self.weights = weights or {}
+        # 웹훅 HTTP 클라이언트 (None이면 전역 webhook_client)
+        self.client = client
+        self._hosts: Dict[str, _HostQueue] = {}
+        self._ring: Deque[_HostQueue] = deque()
+        # 링 맨 앞 호스트가 전역 상한으로 끊겨 남은 deficit으로 이어서 전송할 차례인지
+        self._carry = False
+        self._active = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: Set[asyncio.Task] = set()
+
+    def _host_queue(self, url: str) -> _HostQueue:
+        target = httpx.URL(url)
+        host = target.netloc.decode("ascii")
+        queue = self._hosts.get(host)
+        if queue is None:
+            weight = self.weights.get(host, self.weights.get(target.host, 1.0))
+            queue = self._hosts[host] = _HostQueue(host, weight)
+        return queue
+
+    async def deliver(
+        self, url: str, payload: Dict[str, Any], event: str = "payment.completed", delivery_id: str | None = None
+    ) -> None:
+        """
+        웹훅 전송 요청을 호스트 큐에 넣고 전송(재시도 포함)이 끝날 때까지 대기
+
+        Raises:
+            Exception: post_webhook이 모든 재시도에 실패한 경우 그 예외
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        queue = self._host_queue(url)
+        queue.jobs.append(_DeliveryJob(url, payload, event, delivery_id, future))
+        if not queue.in_ring:
+            queue.in_ring = True
+            self._ring.append(queue)
+        self._wakeup.set()
+        await future
+
+    def _dispatch_round(self) -> int:
+        """링을 한 바퀴 돌며 전송 가능한 작업 시작, 시작한 작업 수 반환"""
+        started = 0
+        for _ in range(len(self._ring)):
+            if self._active >= self.global_limit:
+                break
+            queue = self._ring[0]
+            if queue.active >= self.host_limit:
+                self._carry = False
+                self._ring.rotate(-1)
+                continue
+            if self._carry:
+                self._carry = False
+            else:
+                queue.deficit += queue.weight
+            while (
+                queue.jobs and queue.deficit >= 1
+                and queue.active < self.host_limit and self._active < self.global_limit
+            ):
+                queue.deficit -= 1
+                self._start(queue, queue.jobs.popleft())
+                started += 1
+            if queue.jobs and queue.deficit >= 1 and queue.active < self.host_limit:
+                # 전역 상한으로 끊김 - 순서를 넘기지 않고 다음 라운드에 quantum 추가 없이 남은 deficit으로 이어서 전송
+                # (넘기면 전역 상한이 빠듯할 때 가중치와 무관하게 호스트마다 한 건씩 번갈아 전송됨)
+                self._carry = True
+                break
+            if queue.jobs:
+                self._ring.rotate(-1)
+            else:
+                # 큐가 비면 링에서 빠지고 deficit 초기화 (DRR 규칙)
+                self._ring.popleft()
+                queue.in_ring = False
+                queue.deficit = 0.0
+        return started
+
+    def _start(self, queue: _HostQueue, job: _DeliveryJob) -> None:
+        queue.active += 1
+        self._active += 1
+        queue.record_wait(time.monotonic() - job.enqueued_at)
+        task = asyncio.create_task(self._run(queue, job))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, queue: _HostQueue, job: _DeliveryJob) -> None:
+        try:
+            await post_webhook(job.url, job.payload, event=job.event, client=self.client, delivery_id=job.delivery_id)
+            queue.delivered += 1
+            if not job.future.done():
+                job.future.set_result(None)
+        except asyncio.CancelledError:
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("웹훅 전송이 중단되었습니다"))
+            raise
+        except Exception as e:
+            queue.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            queue.active -= 1
+            self._active -= 1
+            self._wakeup.set()
+
+    async def _schedule(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self._dispatch_round()
+            # 링에 남은 작업이 있고 슬롯도 남아 있으면 다음 라운드 진행
+            if self._ring and self._active < self.global_limit and any(
+                queue.active < self.host_limit for queue in self._ring
+            ):
+                self._wakeup.set()
+                await asyncio.sleep(0)
+
+    def start(self) -> None:
+        """스케줄러 루프 시작 (이미 실행 중이면 무시)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._schedule())
+
+    async def stop(self) -> None:
+        """스케줄러 중지 - 진행 중 전송은 취소하고 대기 중 요청은 실패 처리"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        for queue in self._hosts.values():
+            while queue.jobs:
+                job = queue.jobs.popleft()
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("웹훅 전송 스케줄러가 중지되었습니다"))
+        self._ring.clear()
+        self._carry = False
+
+    def metrics(self) -> Dict[str, Any]:
+        """호스트별 큐 길이/동시 전송 수/대기 시간 지표"""
+        hosts = {}
+        for host, queue in self._hosts.items():
+            samples = list(queue.wait_samples)
+            hosts[host] = {
+                "weight": queue.weight,
+                "queued": len(queue.jobs),
+                "active": queue.active,
+                "delivered": queue.delivered,
+                "failed": queue.failed,
+                "wait_ms": {
+                    "avg": round(queue.wait_total / queue.wait_count * 1000, 3) if queue.wait_count else 0.0,
+                    "p50": round(_percentile(samples, 0.50) * 1000, 3),
+                    "p95": round(_percentile(samples, 0.95) * 1000, 3),
+                    "max": round(queue.wait_max * 1000, 3),
+                    "count": queue.wait_count,
+                },
+            }
+        return {
+            "global_limit": self.global_limit,
+            "host_limit": self.host_limit,
+            "active": self._active,
+            "queued": sum(len(queue.jobs) for queue in self._hosts.values()),
+            "hosts": hosts,
+        }
+
+
+def merge_metrics(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    샤드별 metrics 합치기 (샤드 모드 프런트용)
+
+    샤드마다 자기 동시 전송 상한을 가지므로 상한/건수는 합산하고, 평균 대기 시간은 대기 건수(count)로 가중 평균합니다.
+    대기 시간 백분위수는 샤드별 값 중 최댓값(상한)을 사용합니다.
+    """
+    hosts: Dict[str, Dict[str, Any]] = {}
+    for part in parts:
+        for host, metrics in part["hosts"].items():
+            merged = hosts.get(host)
+            if merged is None:
+                hosts[host] = {**metrics, "wait_ms": dict(metrics["wait_ms"])}
+                continue
+            for key in ("queued", "active", "delivered", "failed"):
+                merged[key] += metrics[key]
+            wait, other = merged["wait_ms"], metrics["wait_ms"]
+            count = wait["count"] + other["count"]
+            if count:
+                wait["avg"] = round((wait["avg"] * wait["count"] + other["avg"] * other["count"]) / count, 3)
+            for key in ("p50", "p95", "max"):
+                wait[key] = max(wait[key], other[key])
+            wait["count"] = count
+    return {
+        "global_limit": sum(part["global_limit"] for part in parts),
+        "host_limit": sum(part["host_limit"] for part in parts),
+        "active": sum(part["active"] for part in parts),
+        "queued": sum(part["queued"] for part in parts),
+        "hosts": hosts,
+    }
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    """'ops-a.example.com=2,ops-b.example.com:8443=0.5' 형식의 호스트 가중치 파싱"""
+    weights = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        host, weight = item.rsplit("=", 1)
+        weights[host.strip()] = max(0.01, float(weight))
+    return weights
+
+
+# 전역 웹훅 전송 스케줄러 인스턴스
+webhook_dispatcher = WebhookDispatcher(weights=_parse_weights(WEBHOOK_HOST_WEIGHTS))
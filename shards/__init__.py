@@ -0,0 +1 @@
+# shards 패키지
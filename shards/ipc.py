@@ -0,0 +1,143 @@
+"""
+샤드 IPC 프로토콜
+프런트와 샤드 워커가 Unix 소켓으로 주고받는 길이 접두 JSON 프레임과 샤드 클라이언트를 정의합니다.
+
+프레임: 4바이트 big-endian 길이 + UTF-8 JSON
+    요청: {"id": n, "op": "start", "args": [...]}
+    응답: {"id": n, "result": ...} 또는 {"id": n, "error": "예외 클래스명", "detail": "메시지"}
+
+이 모듈은 설정(config)을 읽지 않습니다 - 샤드 워커가 환경변수를 정한 뒤 설정을 불러오기 때문입니다.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+import zlib
+from typing import Any, Dict
+
+log = logging.getLogger("shard_ipc")
+
+_HEADER = struct.Struct(">I")
+# 프레임 최대 크기 (전체 목록 조회 응답까지 고려한 안전 상한)
+MAX_FRAME_BYTES = 512 * 1024 * 1024
+
+
+def shard_for(payment_id: str, shard_count: int) -> int:
+    """payment_id(= pay_{tx_id})의 담당 샤드 번호 (프로세스와 무관하게 같은 값이 나오도록 crc32 사용)"""
+    return zlib.crc32(payment_id.encode("utf-8")) % shard_count
+
+
+def socket_path(socket_dir: str, index: int) -> str:
+    return os.path.join(socket_dir, f"shard-{index}.sock")
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any] | None:
+    """프레임 1개 읽기, 연결이 닫혔으면 None"""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"샤드 프레임이 너무 큽니다: {length} bytes")
+    return json.loads(await reader.readexactly(length))
+
+
+class ShardCallError(Exception):
+    """샤드 워커에서 처리 중 발생한 예외 (kind: 워커 쪽 예외 클래스명)"""
+
+    def __init__(self, kind: str, detail: str):
+        super().__init__(f"{kind}: {detail}")
+        self.kind = kind
+        self.detail = detail
+
+
+class ShardClient:
+    """
+    샤드 워커 1개와의 연결
+
+    연결 하나에 요청 id로 여러 요청을 동시에 보내고, 읽기 작업이 응답을 id별 Future에 전달합니다.
+    요청한 쪽이 취소돼도 워커의 작업은 계속되며, 늦게 온 응답은 버립니다.
+    연결이 끊기면 대기 중 요청은 ConnectionError로 실패하고, 다음 call()에서 다시 연결을 시도합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        self._closed = False
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> None:
+        reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._read_task = asyncio.create_task(self._read_loop(reader, self._writer))
+
+    async def ensure_connected(self) -> bool:
+        """끊긴 연결이면 다시 연결 시도 (close() 이후에는 하지 않음), 연결되어 있으면 True"""
+        if self.connected:
+            return True
+        async with self._connect_lock:
+            if self.connected or self._closed:
+                return self.connected
+            try:
+                await self.connect()
+            except OSError as e:
+                log.debug("샤드 재연결 실패: %s - %s", self.path, e)
+                return False
+            log.warning("샤드 재연결: %s", self.path)
+            return True
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        error: Exception = ConnectionError(f"샤드 연결이 끊겼습니다: {self.path}")
+        try:
+            while (message := await read_frame(reader)) is not None:
+                future = self._pending.pop(message["id"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(ShardCallError(message["error"], message.get("detail", "")))
+                else:
+                    future.set_result(message.get("result"))
+        except (OSError, ValueError) as e:
+            error = ConnectionError(f"샤드 연결 오류: {self.path} - {e}")
+        finally:
+            if self._pending:
+                log.error("%s (응답 대기 %d건 실패)", error, len(self._pending))
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            writer.close()
+
+    async def call(self, op: str, *args: Any) -> Any:
+        if not await self.ensure_connected():
+            raise ConnectionError(f"샤드에 연결되어 있지 않습니다: {self.path}")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.write(encode_frame({"id": request_id, "op": op, "args": args}))
+            await self._writer.drain()
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None:
+            await asyncio.gather(self._read_task, return_exceptions=True)
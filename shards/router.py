@@ -0,0 +1,125 @@
+"""
+Payment Server 샤드 라우터 (프런트)
+샤드 워커 프로세스를 실행/연결하고, 결제 요청을 담당 샤드로 보내거나 전체 샤드에 나눠 보냅니다.
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Any, List
+
+from config.settings import (
+    PAYMENT_SHARDS, SHARD_SOCKET_DIR, SHARD_SPAWN, SHARD_START_TIMEOUT, SHUTDOWN_DRAIN_TIMEOUT,
+)
+from shards.ipc import ShardClient, shard_for, socket_path
+
+log = logging.getLogger("shard_router")
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ShardRouter:
+    """
+    샤드 라우터
+
+    spawn이면 start()에서 python -m shards.worker 프로세스 shard_count개를 띄우고,
+    아니면 socket_dir에 이미 떠 있는 워커 소켓에 연결만 합니다.
+    워커를 다시 띄우지는 않습니다 (샤드 데이터가 워커 메모리에 있으므로) - 워커가 종료되면 로그를 남기고
+    health()가 실패하며, 같은 소켓으로 워커가 다시 뜨면 다음 요청에서 다시 연결합니다.
+    """
+
+    def __init__(
+        self,
+        shard_count: int = PAYMENT_SHARDS,
+        socket_dir: str = SHARD_SOCKET_DIR,
+        spawn: bool = SHARD_SPAWN,
+        start_timeout: float = SHARD_START_TIMEOUT,
+    ):
+        self.shard_count = shard_count
+        self.socket_dir = socket_dir
+        self.spawn = spawn
+        self.start_timeout = start_timeout
+        self._clients = [ShardClient(socket_path(socket_dir, i)) for i in range(shard_count)]
+        self._processes: List[asyncio.subprocess.Process] = []
+        self._watchers: List[asyncio.Task] = []
+        self._stopping = False
+
+    def owner(self, payment_id: str) -> int:
+        """payment_id의 담당 샤드 번호"""
+        return shard_for(payment_id, self.shard_count)
+
+    async def start(self) -> None:
+        """샤드 워커 실행(spawn일 때) 후 모든 샤드에 연결"""
+        if self.spawn:
+            os.makedirs(self.socket_dir, exist_ok=True)
+            for index in range(self.shard_count):
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable, "-m", "shards.worker",
+                    "--index", str(index), "--count", str(self.shard_count), "--socket-dir", self.socket_dir,
+                    cwd=_PROJECT_ROOT,
+                )
+                self._processes.append(process)
+                self._watchers.append(asyncio.create_task(self._watch(index, process)))
+        await asyncio.gather(*(self._connect(index) for index in range(self.shard_count)))
+        log.info("샤드 %d개 연결 완료 (%s)", self.shard_count, self.socket_dir)
+
+    async def _connect(self, index: int) -> None:
+        # 워커가 소켓을 열 때까지 재시도 (워커 프로세스가 먼저 종료되면 즉시 실패)
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            if self._processes and self._processes[index].returncode is not None:
+                raise RuntimeError(f"샤드 워커 {index}가 시작 중 종료되었습니다 (code {self._processes[index].returncode})")
+            try:
+                await self._clients[index].connect()
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"샤드 {index}에 연결할 수 없습니다: {self._clients[index].path}")
+                await asyncio.sleep(0.05)
+
+    async def _watch(self, index: int, process: asyncio.subprocess.Process) -> None:
+        code = await process.wait()
+        if not self._stopping:
+            log.error("샤드 워커 %d가 종료되었습니다 (pid %s, code %s) - 이 샤드의 요청은 실패합니다", index, process.pid, code)
+
+    async def health(self) -> List[bool]:
+        """샤드별 상태 (직접 띄운 워커가 살아 있고 연결되어 있으면 True, 끊긴 연결은 다시 연결 시도)"""
+        async def check(index: int) -> bool:
+            if self._processes and self._processes[index].returncode is not None:
+                return False
+            return await self._clients[index].ensure_connected()
+
+        return list(await asyncio.gather(*(check(index) for index in range(self.shard_count))))
+
+    async def call(self, payment_id: str, op: str, *args: Any) -> Any:
+        """담당 샤드에서 op 실행"""
+        return await self._clients[self.owner(payment_id)].call(op, *args)
+
+    async def broadcast(self, op: str, *args: Any) -> List[Any]:
+        """모든 샤드에서 op 실행, 샤드 번호 순 결과 목록"""
+        return await asyncio.gather(*(client.call(op, *args) for client in self._clients))
+
+    async def stop(self, timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> None:
+        """
+        종료: 직접 띄운 워커에 SIGTERM -> 각 워커가 진행 중 작업을 마무리(또는 저장)하고 종료할 때까지
+        timeout초(+여유 5초) 대기 -> 남은 워커는 강제 종료 -> 연결 정리
+        """
+        self._stopping = True
+        for process in self._processes:
+            if process.returncode is None:
+                process.terminate()
+        if self._processes:
+            _, pending = await asyncio.wait(
+                [asyncio.create_task(process.wait()) for process in self._processes], timeout=timeout + 5
+            )
+            for process in self._processes:
+                if process.returncode is None:
+                    log.error("샤드 워커 강제 종료: pid %s", process.pid)
+                    process.kill()
+            await asyncio.gather(*pending, *self._watchers, return_exceptions=True)
+        await asyncio.gather(*(client.close() for client in self._clients))
+
+
+# 전역 샤드 라우터 인스턴스 (PAYMENT_SHARDS > 0일 때 사용)
+shard_router = ShardRouter()
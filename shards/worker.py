@@ -0,0 +1,198 @@
+"""
+Payment Server 샤드 워커
+payment_id 해시로 나뉜 결제 일부를 맡아 자체 이벤트 루프에서 저장소/자동 완료/웹훅 전송/만료 처리를 실행하고,
+Unix 소켓으로 프런트의 요청(shards/ipc.py 프레임)을 처리합니다.
+
+보통 프런트(main.py, PAYMENT_SHARDS > 0)가 실행하지만, 따로 띄우고 프런트는 연결만 할 수도 있습니다 (SHARD_SPAWN=false):
+    python -m shards.worker --index 0 --count 4 --socket-dir /tmp/payment-shards
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+from shards.ipc import encode_frame, read_frame, socket_path
+
+log = logging.getLogger("shard_worker")
+
+
+def _shard_state_file(state_file: str, index: int) -> str:
+    """샤드별 미완료 작업 저장 파일 (data/pending_work.json -> data/pending_work.shard0.json)"""
+    root, ext = os.path.splitext(state_file)
+    return f"{root}.shard{index}{ext}"
+
+
+_STORAGE_OPERATIONS = (
+    "create_payment", "get_payment", "update_payment", "transition", "get_payments_by_status",
+    "get_payments_by_time_range", "get_all_payments", "get_payment_count_by_status",
+)
+
+
+def _storage_operations(storage: Any, boot_id: str) -> Dict[str, Callable[..., Awaitable[Any]]]:
+    """저장소 작업 (ShardedPaymentStorage가 호출)"""
+    operations: Dict[str, Callable[..., Awaitable[Any]]] = {
+        name: getattr(storage, name) for name in _STORAGE_OPERATIONS
+    }
+
+    async def generation() -> List[Any]:
+        # 재시작하면 세대가 0부터 다시 시작하므로 부팅 id와 함께 반환 (프런트 응답 캐시 무효화)
+        return [boot_id, await storage.generation()]
+
+    operations["generation"] = generation
+    return operations
+
+
+def _operations(boot_id: str) -> Dict[str, Callable[..., Awaitable[Any]]]:
+    """프런트가 호출할 수 있는 작업 (설정을 정한 뒤 불러와야 하므로 함수 안에서 import)"""
+    from services.payment_engine import payment_engine
+    from storage.payment_storage import payment_storage
+
+    return {
+        "start": payment_engine.start,
+        "confirm": payment_engine.confirm,
+        "webhook_attempts": payment_engine.webhook_attempts,
+        "webhook_hosts": payment_engine.webhook_hosts,
+        "webhook_metrics": payment_engine.webhook_metrics,
+        "analytics": payment_engine.analytics,
+        **_storage_operations(payment_storage, boot_id),
+    }
+
+
+class ShardServer:
+    """샤드 워커 소켓 서버 (연결마다 요청을 동시에 처리하고 끝나는 순서대로 응답)"""
+
+    def __init__(
+        self,
+        index: int,
+        path: str,
+        operations: Dict[str, Callable[..., Awaitable[Any]]],
+        expected_errors: Tuple[type, ...] = (),
+        stopping_error: type = RuntimeError,
+    ):
+        self.index = index
+        self.path = path
+        self.operations = operations
+        # 프런트로 그대로 전달하는 예외 (로그 없이 응답)
+        self.expected_errors = expected_errors
+        # 종료가 시작된 뒤 들어온 요청에 응답하는 예외 (프런트는 이름으로 구분)
+        self.stopping_error = stopping_error
+        self.stopping = False
+        self._server: asyncio.AbstractServer | None = None
+        self._requests: Set[asyncio.Task] = set()
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def start(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, self.path)
+
+    def close(self) -> None:
+        """새 연결과 기존 연결의 새 요청 접수 중단 (처리 중인 요청은 계속)"""
+        self.stopping = True
+        if self._server is not None:
+            self._server.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+        try:
+            while (message := await read_frame(reader)) is not None:
+                task = asyncio.create_task(self._dispatch(message, writer))
+                self._requests.add(task)
+                task.add_done_callback(self._requests.discard)
+        except (OSError, ValueError) as e:
+            log.warning("샤드 %d 연결 오류: %s", self.index, e)
+        finally:
+            self._connections.pop(connection, None)
+
+    async def _dispatch(self, message: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        reply: Dict[str, Any] = {"id": message["id"]}
+        operation = self.operations.get(message["op"])
+        if self.stopping:
+            reply.update(error=self.stopping_error.__name__, detail=f"샤드 {self.index} 종료 중")
+        elif operation is None:
+            reply.update(error="UnknownOperation", detail=message["op"])
+        else:
+            try:
+                reply["result"] = await operation(*message["args"])
+            except asyncio.CancelledError:
+                if not self.stopping:
+                    raise
+                # 종료 대기 시간을 넘겨 취소된 작업 (저장되어 재시작 후 이어서 처리됨)
+                reply.update(error=self.stopping_error.__name__, detail=f"샤드 {self.index} 종료 중 - 작업 저장됨")
+            except self.expected_errors as e:
+                reply.update(error=type(e).__name__, detail=str(e))
+            except Exception as e:
+                log.exception("샤드 %d 작업 실패: %s", self.index, message["op"])
+                reply.update(error=type(e).__name__, detail=str(e))
+        if writer.is_closing():
+            return
+        writer.write(encode_frame(reply))
+        try:
+            await writer.drain()
+        except OSError:
+            pass
+
+    async def stop(self) -> None:
+        """처리 중인 요청의 응답까지 마무리 후 연결/소켓 정리"""
+        self.close()
+        if self._requests:
+            await asyncio.gather(*self._requests, return_exceptions=True)
+        connections = list(self._connections)
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*connections, return_exceptions=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def serve(index: int, count: int, path: str) -> None:
+    from services.payment_engine import PaymentNotFound, PaymentAlreadyProcessed, AnalyticsWindowTooLarge
+    from services.payment_runtime import payment_services
+    from services.payment_workflow import WorkflowShuttingDown, payment_workflow
+
+    payment_workflow.state_file = _shard_state_file(payment_workflow.state_file, index)
+    server = ShardServer(
+        index, path, _operations(uuid.uuid4().hex[:12]),
+        expected_errors=(PaymentNotFound, PaymentAlreadyProcessed, AnalyticsWindowTooLarge, WorkflowShuttingDown),
+        stopping_error=WorkflowShuttingDown,
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with payment_services():
+        await server.start()
+        log.info("샤드 워커 %d/%d 시작 (pid %d, %s)", index, count, os.getpid(), path)
+        await stop.wait()
+        log.info("샤드 워커 %d 종료 중", index)
+        server.close()
+    # 진행 중 작업 대기/저장이 끝난 뒤 남은 요청 응답 전송
+    await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="결제 샤드 워커")
+    parser.add_argument("--index", type=int, required=True, help="샤드 번호 (0부터)")
+    parser.add_argument("--count", type=int, required=True, help="전체 샤드 수")
+    parser.add_argument("--socket-dir", default=None, help="Unix 소켓 디렉터리 (기본: SHARD_SOCKET_DIR)")
+    args = parser.parse_args()
+
+    # 워커는 자기 몫의 결제를 인메모리 저장소로 직접 처리 (설정 모듈을 불러오기 전에 지정)
+    os.environ["PAYMENT_SHARDS"] = "0"
+    os.environ["STORAGE_BACKEND"] = "memory"
+
+    from config.logging_config import setup_logging
+    from config.settings import SHARD_SOCKET_DIR
+
+    setup_logging()
+    asyncio.run(serve(args.index, args.count, socket_path(args.socket_dir or SHARD_SOCKET_DIR, args.index)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Payment Server 저장소 백엔드 인터페이스
+모든 저장소 구현(인메모리, Redis)이 따르는 비동기 프로토콜과 공통 구독 처리를 정의합니다.
+"""
+from typing import Dict, Any, List, AsyncIterator, Callable, Iterable, Protocol, Set, Tuple
+import logging
+
+from utils.payment_utils import iso_to_epoch_ns
+
+log = logging.getLogger("payment_backend")
+
+# 결제 상태 목록 (상태별 집계 순서)
+PAYMENT_STATUSES = ("PENDING", "PAYMENT_COMPLETED", "PAYMENT_CANCELLED", "PAYMENT_EXPIRED")
+
+# 변경 세대: 단일 저장소는 정수, 샤드 저장소는 샤드별 (워커 부팅 id, 세대) 튜플 (같은지만 비교)
+Generation = int | Tuple[Tuple[str, int], ...]
+
+# 저장소 변경 구독자 (생성/업데이트 직후 변경된 결제 데이터로 호출)
+PaymentListener = Callable[[Dict[str, Any]], None]
+
+
+class PaymentBackend(Protocol):
+    """결제 저장소 백엔드 프로토콜 (STORAGE_BACKEND 설정으로 구현 선택)"""
+
+    def subscribe(self, listener: PaymentListener) -> None:
+        """변경 구독자 등록 (이 프로세스에서 일어난 변경만 전달)"""
+        ...
+
+    async def create_payment(self, payment_data: Dict[str, Any]) -> None:
+        """결제 데이터 생성 (같은 payment_id가 있으면 덮어쓰고 version 증가)"""
+        ...
+
+    async def get_payment(self, payment_id: str) -> Dict[str, Any] | None:
+        """결제 데이터 조회"""
+        ...
+
+    async def update_payment(self, payment_id: str, updates: Dict[str, Any]) -> None:
+        """결제 데이터 업데이트 (상태 전환은 transition 사용)"""
+        ...
+
+    async def transition(
+        self,
+        payment_id: str,
+        from_status: str | Iterable[str],
+        to_status: str,
+        updates: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any] | None:
+        """상태 전환 (compare-and-set), 성공 시 전환된 결제 데이터, 실패 시 None"""
+        ...
+
+    async def get_payments_by_status(self, status: str) -> List[Dict[str, Any]]:
+        """상태별 결제 목록 조회"""
+        ...
+
+    async def get_payments_by_time_range(
+        self,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+        status: str | None = None,
+        limit: int | None = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """created_at 구간 조회 [start_ns, end_ns) - 생성 시간 오름차순 (descending이면 최신순, limit은 앞에서부터)"""
+        ...
+
+    async def generation(self) -> Generation:
+        """변경 세대 (생성/업데이트/상태 전환마다 바뀜, 값이 같으면 그 사이 변경 없음)"""
+        ...
+
+    async def get_all_payments(self) -> Dict[str, Dict[str, Any]]:
+        """전체 결제 목록 조회"""
+        ...
+
+    async def get_payment_count_by_status(self) -> Dict[str, int]:
+        """상태별 결제 개수 조회"""
+        ...
+
+    async def close(self) -> None:
+        """연결 정리"""
+        ...
+
+
+class PaymentSubscribers:
+    """저장소 변경 구독자 관리 (백엔드 공통)"""
+
+    def __init__(self):
+        self._listeners: List[PaymentListener] = []
+
+    def subscribe(self, listener: PaymentListener) -> None:
+        """변경 구독자 등록 (분석 컬럼 등 파생 인덱스 갱신용)"""
+        self._listeners.append(listener)
+
+    def _notify(self, payment: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(payment)
+            except Exception:
+                log.exception("저장소 구독자 처리 실패: %s", payment["payment_id"],
+                              extra={"payment_id": payment["payment_id"]})
+
+
+async def iter_payments_by_time_range(
+    backend: PaymentBackend,
+    start_ns: int | None = None,
+    end_ns: int | None = None,
+    status: str | None = None,
+    page_size: int = 1000,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    created_at 구간을 page_size건씩 나눠 조회 (생성 시간 오름차순, 전체 목록을 한 번에 만들지 않음)
+
+    다음 페이지는 마지막 결제의 created_at부터 다시 조회하고, 그 시각에 이미 내보낸 결제는 건너뜁니다.
+    건너뛸 결제 수만큼 더 요청하므로 같은 시각의 결제가 page_size보다 많아도 매 페이지 진행합니다.
+    """
+    cursor = start_ns
+    seen: Set[str] = set()
+    while True:
+        limit = page_size + len(seen)
+        page = await backend.get_payments_by_time_range(cursor, end_ns, status=status, limit=limit)
+        for payment in page:
+            if payment["payment_id"] not in seen:
+                yield payment
+        if len(page) < limit:
+            return
+        last_ns = iso_to_epoch_ns(page[-1]["created_at"])
+        if last_ns != cursor:
+            cursor, seen = last_ns, set()
+        seen.update(
+            payment["payment_id"] for payment in page if iso_to_epoch_ns(payment["created_at"]) == last_ns
+        )
@@ -1,54 +1,178 @@
 """
 Payment Server 데이터 저장소
 결제 데이터를 메모리에 저장하고 관리합니다.
+STORAGE_BACKEND 설정에 따라 인메모리 또는 Redis 백엔드를 전역 저장소로 사용합니다.
+PAYMENT_SHARDS > 0이면 샤드 워커들의 저장소를 묶은 백엔드를 사용합니다.
 """
-from typing import Dict, Any, List
+import asyncio
+from bisect import bisect_left, insort
+from typing import Dict, Any, List, Iterable
 import logging
 
+from config.settings import STORAGE_LOCK_STRIPES, STORAGE_BACKEND, REDIS_URL, REDIS_KEY_PREFIX, PAYMENT_SHARDS
+from storage.payment_backend import PAYMENT_STATUSES, PaymentBackend, PaymentSubscribers
+from utils.payment_utils import iso_to_epoch_ns
+
 log = logging.getLogger("payment_storage")
 
 
-class PaymentStorage:
+class PaymentStorage(PaymentSubscribers):
     """결제 데이터 저장소 (인메모리)"""
     
-    def __init__(self):
+    def __init__(self, lock_stripes: int = STORAGE_LOCK_STRIPES):
+        super().__init__()
         self._payments: Dict[str, Dict[str, Any]] = {}
+        # 상태 전환용 스트라이프 락 (전역 락 없이 payment_id 단위 직렬화)
+        self._locks = [asyncio.Lock() for _ in range(max(1, lock_stripes))]
+        # created_at 시간순 인덱스 (epoch ns, payment_id) - 생성 순서대로 append
+        self._time_index: List[tuple[int, str]] = []
+        # 변경 세대 - 생성/업데이트/상태 전환마다 1 증가 (조회 응답 캐시 무효화용)
+        self._generation = 0
     
-    def create_payment(self, payment_data: Dict[str, Any]) -> None:
+    async def create_payment(self, payment_data: Dict[str, Any]) -> None:
         """결제 데이터 생성"""
         payment_id = payment_data["payment_id"]
+        previous = self._payments.get(payment_id)
+        if previous is not None:
+            self._unindex_created_at(payment_id, previous["created_at"])
+        payment_data["version"] = previous["version"] + 1 if previous is not None else 1
         self._payments[payment_id] = payment_data
-        log.info(f"결제 데이터 생성: {payment_id}")
+        self._index_created_at(payment_id, payment_data["created_at"])
+        self._generation += 1
+        self._notify(payment_data)
+        log.info("결제 데이터 생성: %s", payment_id,
+                 extra={"msg_type": "storage.created", "payment_id": payment_id})
+    
+    def _index_created_at(self, payment_id: str, created_at: str) -> None:
+        """시간순 인덱스에 추가 (시계가 뒤로 간 경우에만 정렬 삽입)"""
+        entry = (iso_to_epoch_ns(created_at), payment_id)
+        if not self._time_index or self._time_index[-1] <= entry:
+            self._time_index.append(entry)
+        else:
+            insort(self._time_index, entry)
     
-    def get_payment(self, payment_id: str) -> Dict[str, Any] | None:
+    def _unindex_created_at(self, payment_id: str, created_at: str) -> None:
+        """동일 payment_id 재생성 시 기존 인덱스 항목 제거"""
+        entry = (iso_to_epoch_ns(created_at), payment_id)
+        i = bisect_left(self._time_index, entry)
+        if i < len(self._time_index) and self._time_index[i] == entry:
+            del self._time_index[i]
+    
+    async def get_payment(self, payment_id: str) -> Dict[str, Any] | None:
         """결제 데이터 조회"""
         return self._payments.get(payment_id)
     
-    def update_payment(self, payment_id: str, updates: Dict[str, Any]) -> None:
+    async def update_payment(self, payment_id: str, updates: Dict[str, Any]) -> None:
         """결제 데이터 업데이트"""
         if payment_id in self._payments:
             self._payments[payment_id].update(updates)
-            log.info(f"결제 데이터 업데이트: {payment_id}")
+            self._payments[payment_id]["version"] += 1
+            self._generation += 1
+            self._notify(self._payments[payment_id])
+            log.info("결제 데이터 업데이트: %s", payment_id,
+                     extra={"msg_type": "storage.updated", "payment_id": payment_id})
         else:
-            log.warning(f"존재하지 않는 결제 ID: {payment_id}")
+            log.warning("존재하지 않는 결제 ID: %s", payment_id, extra={"payment_id": payment_id})
+    
+    def _lock_for(self, payment_id: str) -> asyncio.Lock:
+        return self._locks[hash(payment_id) % len(self._locks)]
+    
+    async def transition(
+        self,
+        payment_id: str,
+        from_status: str | Iterable[str],
+        to_status: str,
+        updates: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any] | None:
+        """
+        상태 전환 (compare-and-set)
+        
+        현재 상태가 from_status일 때만 to_status로 바꾸고 updates를 함께 반영합니다.
+        성공 시 전환된 결제 데이터의 스냅샷을, 결제가 없거나 상태가 다르면 None을 반환합니다.
+        """
+        allowed = (from_status,) if isinstance(from_status, str) else tuple(from_status)
+        async with self._lock_for(payment_id):
+            payment = self._payments.get(payment_id)
+            if payment is None or payment["status"] not in allowed:
+                return None
+            if updates:
+                payment.update(updates)
+            payment["status"] = to_status
+            payment["version"] += 1
+            self._generation += 1
+            self._notify(payment)
+            log.info("결제 상태 전환: %s, %s -> %s (v%d)", payment_id, "|".join(allowed), to_status, payment["version"],
+                     extra={"msg_type": "storage.transition", "payment_id": payment_id})
+            return dict(payment)
     
-    def get_payments_by_status(self, status: str) -> List[Dict[str, Any]]:
+    async def get_payments_by_status(self, status: str) -> List[Dict[str, Any]]:
         """상태별 결제 목록 조회"""
         return [payment for payment in self._payments.values() if payment["status"] == status]
     
-    def get_all_payments(self) -> Dict[str, Dict[str, Any]]:
+    async def get_payments_by_time_range(
+        self,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+        status: str | None = None,
+        limit: int | None = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        created_at 구간 조회 [start_ns, end_ns) - 생성 시간 오름차순 (descending이면 최신순)
+        
+        구간 경계는 시간순 인덱스를 이분 탐색하므로 status가 없으면 O(log n + k) 입니다.
+        status가 주어지면 구간 안의 결제를 차례로 걸러내므로 최악의 경우 O(log n + 구간 크기) 입니다.
+        """
+        if limit is not None and limit <= 0:
+            return []
+        lo = 0 if start_ns is None else bisect_left(self._time_index, (start_ns, ""))
+        hi = len(self._time_index) if end_ns is None else bisect_left(self._time_index, (end_ns, ""))
+        
+        result = []
+        for i in (range(hi - 1, lo - 1, -1) if descending else range(lo, hi)):
+            payment = self._payments[self._time_index[i][1]]
+            if status is not None and payment["status"] != status:
+                continue
+            result.append(payment)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+    
+    async def generation(self) -> int:
+        """변경 세대 조회"""
+        return self._generation
+    
+    async def get_all_payments(self) -> Dict[str, Dict[str, Any]]:
         """전체 결제 목록 조회"""
         return self._payments.copy()
     
-    def get_payment_count_by_status(self) -> Dict[str, int]:
+    async def get_payment_count_by_status(self) -> Dict[str, int]:
         """상태별 결제 개수 조회"""
-        counts = {"PENDING": 0, "PAYMENT_COMPLETED": 0, "PAYMENT_CANCELLED": 0}
+        counts = {status: 0 for status in PAYMENT_STATUSES}
         for payment in self._payments.values():
             status = payment["status"]
             if status in counts:
                 counts[status] += 1
         return counts
+    
+    async def close(self) -> None:
+        """연결 정리 (인메모리는 없음)"""
+
+
+def create_payment_storage() -> PaymentBackend:
+    """설정(STORAGE_BACKEND, PAYMENT_SHARDS)에 맞는 저장소 백엔드 생성"""
+    if PAYMENT_SHARDS > 0:
+        # 결제는 샤드 워커가 각자 인메모리로 보관 (워커는 PAYMENT_SHARDS=0으로 실행됨)
+        from storage.sharded_payment_storage import ShardedPaymentStorage
+        from shards.router import shard_router
+        return ShardedPaymentStorage(shard_router)
+    if STORAGE_BACKEND == "redis":
+        from storage.redis_payment_storage import RedisPaymentStorage
+        return RedisPaymentStorage.from_url(REDIS_URL, key_prefix=REDIS_KEY_PREFIX)
+    if STORAGE_BACKEND != "memory":
+        raise RuntimeError(f"지원하지 않는 STORAGE_BACKEND입니다: {STORAGE_BACKEND}")
+    return PaymentStorage()
 
 
 # 전역 저장소 인스턴스
-payment_storage = PaymentStorage()
+payment_storage: PaymentBackend = create_payment_storage()
@@ -0,0 +1,307 @@
+"""
+Payment Server Redis 저장소
+결제 1건을 Redis 해시 1개로 저장하고, created_at/상태별 인덱스를 정렬 집합(sorted set)으로 유지합니다.
+여러 payment-server 인스턴스가 같은 Redis를 바라보면 결제 상태를 공유합니다.
+
+키 구성 (prefix 기본값 "payment"):
+    {prefix}:p:{payment_id}      해시 - 필드 값은 JSON 인코딩 (None/int 타입 보존)
+    {prefix}:created             정렬 집합 - member=payment_id, score=created_at(epoch µs)
+    {prefix}:status:{STATUS}     정렬 집합 - 상태별 결제, score=created_at(epoch µs)
+    {prefix}:generation          정수 - 변경 세대 (생성/업데이트/상태 전환 스크립트에서 INCR)
+
+Lua 스크립트는 사용하는 키를 모두 KEYS로 받습니다. Redis Cluster에서는 한 스크립트의 키가 같은 슬롯에 있어야 하므로
+REDIS_KEY_PREFIX를 해시 태그로 지정하세요 (예: "{payment}").
+"""
+import json
+from typing import Dict, Any, List, Iterable
+import logging
+
+from storage.payment_backend import PAYMENT_STATUSES, PaymentSubscribers
+from utils.payment_utils import iso_to_epoch_ns
+
+log = logging.getLogger("redis_payment_storage")
+
+# 모든 스크립트는 접근하는 키를 KEYS로 받습니다 (Redis Cluster/프록시 호환).
+# 상태 인덱스 키는 PAYMENT_STATUSES 순서대로 KEYS[4..3+n]에 넣고, 같은 순서의 상태 값(JSON 인코딩)을
+# ARGV로 받아 상태 -> 인덱스 키 표를 만듭니다.
+_STATUS_KEYS_LUA = """
+local n = tonumber(ARGV[{n_arg}])
+local status_keys = {{}}
+for i = 1, n do
+    status_keys[ARGV[{n_arg} + i]] = KEYS[3 + i]
+end
+"""
+
+# 생성: 이전 상태 인덱스 제거 후 해시 교체, version = 이전 version + 1
+# KEYS: 해시, created 인덱스, 변경 세대, 상태 인덱스 n개
+# ARGV: payment_id, score, 상태 수 n, 상태 값 n개, field1, value1, ...
+_CREATE_SCRIPT = _STATUS_KEYS_LUA.format(n_arg=3) + """
+local prev_status = redis.call('HGET', KEYS[1], 'status')
+local prev_version = redis.call('HGET', KEYS[1], 'version')
+local status = nil
+for i = 4 + n, #ARGV, 2 do
+    if ARGV[i] == 'status' then status = ARGV[i + 1] end
+end
+if not status or not status_keys[status] then
+    return redis.error_reply('unknown payment status')
+end
+if prev_status and status_keys[prev_status] then
+    redis.call('ZREM', status_keys[prev_status], ARGV[1])
+end
+redis.call('DEL', KEYS[1])
+for i = 4 + n, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+local version = 1
+if prev_version then version = tonumber(prev_version) + 1 end
+redis.call('HSET', KEYS[1], 'version', version)
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+redis.call('ZADD', status_keys[status], ARGV[2], ARGV[1])
+redis.call('INCR', KEYS[3])
+return version
+"""
+
+# 상태 전환 (compare-and-set): 현재 상태가 허용 목록에 있을 때만 반영하고 전체 해시 반환
+# KEYS: 해시, created 인덱스, 변경 세대, 상태 인덱스 n개
+# ARGV: payment_id, to_status, 상태 수 n, 상태 값 n개, 허용 상태 수 m, 허용 상태 m개, field1, value1, ...
+# created 인덱스 score가 없으면(인덱스 유실) 이전 상태 인덱스의 score를 사용하고, 둘 다 없으면 상태 인덱스에 넣지 않음
+_TRANSITION_SCRIPT = _STATUS_KEYS_LUA.format(n_arg=3) + """
+if not status_keys[ARGV[2]] then
+    return redis.error_reply('unknown payment status')
+end
+local current = redis.call('HGET', KEYS[1], 'status')
+if not current then return nil end
+local m = tonumber(ARGV[4 + n])
+local allowed = false
+for i = 5 + n, 4 + n + m do
+    if ARGV[i] == current then allowed = true end
+end
+if not allowed then return nil end
+for i = 5 + n + m, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+local current_key = status_keys[current]
+local score = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if not score and current_key then
+    score = redis.call('ZSCORE', current_key, ARGV[1])
+end
+if current_key then
+    redis.call('ZREM', current_key, ARGV[1])
+end
+if score then
+    redis.call('ZADD', status_keys[ARGV[2]], score, ARGV[1])
+end
+redis.call('INCR', KEYS[3])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# 상태 외 필드 업데이트: 결제가 있을 때만 반영하고 전체 해시 반환
+# KEYS: 해시, 변경 세대 / ARGV: field1, value1, ...
+_UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+for i = 1, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+redis.call('INCR', KEYS[2])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+# 스크립트에 넘기는 상태 목록 (상태 수 + 해시에 저장되는 형식의 상태 값, KEYS의 상태 인덱스와 같은 순서)
+_STATUS_ARGS = (len(PAYMENT_STATUSES), *(_encode(status) for status in PAYMENT_STATUSES))
+
+
+def _decode_hash(raw: Dict[Any, Any] | List[Any]) -> Dict[str, Any]:
+    """HGETALL 결과(dict 또는 Lua의 평탄 리스트) 디코딩"""
+    if isinstance(raw, list):
+        raw = dict(zip(raw[::2], raw[1::2]))
+    return {
+        (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+        for k, v in raw.items()
+    }
+
+
+def _score_us(epoch_ns: int) -> int:
+    """정렬 집합 score (epoch µs, 올림) - float 정밀도 안에 들어오도록 µs 단위 사용"""
+    return -(-epoch_ns // 1_000)
+
+
+class RedisPaymentStorage(PaymentSubscribers):
+    """
+    결제 데이터 저장소 (Redis)
+
+    조회 여러 건은 파이프라인으로 묶어 왕복 1회로 처리하고,
+    생성/상태 전환은 Lua 스크립트로 원자적으로 처리하므로 인스턴스 간에도 compare-and-set이 보장됩니다.
+    redis.asyncio 호환 클라이언트(실제 Redis 또는 fakeredis의 in-process FakeRedis)를 받습니다.
+    """
+
+    def __init__(self, client: Any, key_prefix: str = "payment"):
+        super().__init__()
+        self._redis = client
+        self._prefix = key_prefix
+        self._created_key = f"{key_prefix}:created"
+        self._status_prefix = f"{key_prefix}:status:"
+        self._generation_key = f"{key_prefix}:generation"
+        self._create = client.register_script(_CREATE_SCRIPT)
+        self._transition = client.register_script(_TRANSITION_SCRIPT)
+        self._update = client.register_script(_UPDATE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, key_prefix: str = "payment") -> "RedisPaymentStorage":
+        """Redis URL로 생성 (redis 패키지 필요)"""
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=redis를 사용하려면 redis 패키지가 설치되어야 합니다.")
+        return cls(Redis.from_url(url), key_prefix=key_prefix)
+
+    def _payment_key(self, payment_id: str) -> str:
+        return f"{self._prefix}:p:{payment_id}"
+
+    def _status_key(self, status: str) -> str:
+        return self._status_prefix + status
+
+    def _index_keys(self, payment_id: str) -> List[str]:
+        """생성/상태 전환 스크립트의 KEYS (해시, created 인덱스, 변경 세대, 상태 인덱스들)"""
+        return [
+            self._payment_key(payment_id), self._created_key, self._generation_key,
+            *(self._status_key(status) for status in PAYMENT_STATUSES),
+        ]
+
+    @staticmethod
+    def _check_status(status: Any) -> None:
+        if status not in PAYMENT_STATUSES:
+            raise ValueError(f"알 수 없는 결제 상태입니다: {status}")
+
+    async def create_payment(self, payment_data: Dict[str, Any]) -> None:
+        """결제 데이터 생성"""
+        payment_id = payment_data["payment_id"]
+        score = _score_us(iso_to_epoch_ns(payment_data["created_at"]))
+        fields = []
+        for key, value in payment_data.items():
+            if key != "version":
+                fields += [key, _encode(value)]
+        self._check_status(payment_data.get("status"))
+        version = await self._create(
+            keys=self._index_keys(payment_id),
+            args=[payment_id, score, *_STATUS_ARGS, *fields],
+        )
+        payment_data["version"] = int(version)
+        self._notify(payment_data)
+        log.info("결제 데이터 생성: %s", payment_id,
+                 extra={"msg_type": "storage.created", "payment_id": payment_id})
+
+    async def get_payment(self, payment_id: str) -> Dict[str, Any] | None:
+        """결제 데이터 조회"""
+        raw = await self._redis.hgetall(self._payment_key(payment_id))
+        return _decode_hash(raw) if raw else None
+
+    async def update_payment(self, payment_id: str, updates: Dict[str, Any]) -> None:
+        """결제 데이터 업데이트 (status가 포함되면 상태 인덱스도 함께 갱신)"""
+        updates = dict(updates)
+        if "status" in updates:
+            status = updates.pop("status")
+            if await self.transition(payment_id, PAYMENT_STATUSES, status, updates) is None:
+                log.warning("존재하지 않는 결제 ID: %s", payment_id, extra={"payment_id": payment_id})
+            return
+        fields = []
+        for key, value in updates.items():
+            fields += [key, _encode(value)]
+        raw = await self._update(keys=[self._payment_key(payment_id), self._generation_key], args=fields)
+        if raw is None:
+            log.warning("존재하지 않는 결제 ID: %s", payment_id, extra={"payment_id": payment_id})
+            return
+        self._notify(_decode_hash(raw))
+        log.info("결제 데이터 업데이트: %s", payment_id,
+                 extra={"msg_type": "storage.updated", "payment_id": payment_id})
+
+    async def transition(
+        self,
+        payment_id: str,
+        from_status: str | Iterable[str],
+        to_status: str,
+        updates: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any] | None:
+        """상태 전환 (compare-and-set, Lua 스크립트로 원자 처리)"""
+        allowed = (from_status,) if isinstance(from_status, str) else tuple(from_status)
+        self._check_status(to_status)
+        fields = []
+        for key, value in (updates or {}).items():
+            fields += [key, _encode(value)]
+        raw = await self._transition(
+            keys=self._index_keys(payment_id),
+            args=[payment_id, _encode(to_status), *_STATUS_ARGS, len(allowed),
+                  *(_encode(status) for status in allowed), *fields],
+        )
+        if raw is None:
+            return None
+        payment = _decode_hash(raw)
+        self._notify(payment)
+        log.info("결제 상태 전환: %s, %s -> %s (v%d)", payment_id, "|".join(allowed), to_status, payment["version"],
+                 extra={"msg_type": "storage.transition", "payment_id": payment_id})
+        return payment
+
+    async def _load_many(self, payment_ids: List[Any]) -> List[Dict[str, Any]]:
+        """여러 결제를 파이프라인 1회로 조회 (인덱스 순서 유지, 사라진 결제 제외)"""
+        if not payment_ids:
+            return []
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for payment_id in payment_ids:
+                if isinstance(payment_id, bytes):
+                    payment_id = payment_id.decode()
+                pipe.hgetall(self._payment_key(payment_id))
+            rows = await pipe.execute()
+        return [_decode_hash(raw) for raw in rows if raw]
+
+    async def get_payments_by_status(self, status: str) -> List[Dict[str, Any]]:
+        """상태별 결제 목록 조회 (생성 시간 오름차순)"""
+        return await self._load_many(await self._redis.zrange(self._status_key(status), 0, -1))
+
+    async def get_payments_by_time_range(
+        self,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+        status: str | None = None,
+        limit: int | None = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """created_at 구간 조회 [start_ns, end_ns) - 상태가 주어지면 상태별 인덱스를 직접 사용"""
+        if limit is not None and limit <= 0:
+            return []
+        key = self._created_key if status is None else self._status_key(status)
+        low = "-inf" if start_ns is None else _score_us(start_ns)
+        high = "+inf" if end_ns is None else f"({_score_us(end_ns)}"
+        page = {} if limit is None else {"start": 0, "num": limit}
+        if descending:
+            payment_ids = await self._redis.zrevrangebyscore(key, high, low, **page)
+        else:
+            payment_ids = await self._redis.zrangebyscore(key, low, high, **page)
+        return await self._load_many(payment_ids)
+
+    async def generation(self) -> int:
+        """변경 세대 조회 (모든 인스턴스의 변경이 반영됨)"""
+        return int(await self._redis.get(self._generation_key) or 0)
+
+    async def get_all_payments(self) -> Dict[str, Dict[str, Any]]:
+        """전체 결제 목록 조회"""
+        payments = await self._load_many(await self._redis.zrange(self._created_key, 0, -1))
+        return {payment["payment_id"]: payment for payment in payments}
+
+    async def get_payment_count_by_status(self) -> Dict[str, int]:
+        """상태별 결제 개수 조회 (ZCARD 파이프라인)"""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for status in PAYMENT_STATUSES:
+                pipe.zcard(self._status_key(status))
+            counts = await pipe.execute()
+        return dict(zip(PAYMENT_STATUSES, (int(count) for count in counts)))
+
+    async def close(self) -> None:
+        """Redis 연결 종료"""
+        await self._redis.aclose()
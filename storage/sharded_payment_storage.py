@@ -0,0 +1,95 @@
+"""
+Payment Server 샤드 저장소 (프런트용)
+결제를 payment_id 해시로 나눠 가진 샤드 워커들의 인메모리 저장소를 하나의 PaymentBackend처럼 사용합니다.
+
+단건 조회/변경은 담당 샤드로 보내고, 목록/집계 조회는 모든 샤드에 나눠 보낸 뒤 결과를 합칩니다.
+변경은 샤드 워커 안에서 일어나므로 프런트의 구독자(subscribe)에는 전달되지 않습니다.
+"""
+import heapq
+import itertools
+from typing import Dict, Any, List, Iterable, Tuple
+
+from shards.router import ShardRouter
+from storage.payment_backend import PAYMENT_STATUSES, PaymentSubscribers
+from utils.payment_utils import iso_to_epoch_ns
+
+
+def _created_ns(payment: Dict[str, Any]) -> int:
+    return iso_to_epoch_ns(payment["created_at"])
+
+
+class ShardedPaymentStorage(PaymentSubscribers):
+    """샤드 워커 저장소 묶음 (PAYMENT_SHARDS > 0)"""
+
+    def __init__(self, router: ShardRouter):
+        super().__init__()
+        self._router = router
+
+    async def create_payment(self, payment_data: Dict[str, Any]) -> None:
+        await self._router.call(payment_data["payment_id"], "create_payment", payment_data)
+
+    async def get_payment(self, payment_id: str) -> Dict[str, Any] | None:
+        return await self._router.call(payment_id, "get_payment", payment_id)
+
+    async def update_payment(self, payment_id: str, updates: Dict[str, Any]) -> None:
+        await self._router.call(payment_id, "update_payment", payment_id, updates)
+
+    async def transition(
+        self,
+        payment_id: str,
+        from_status: str | Iterable[str],
+        to_status: str,
+        updates: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any] | None:
+        allowed = from_status if isinstance(from_status, str) else list(from_status)
+        return await self._router.call(payment_id, "transition", payment_id, allowed, to_status, updates)
+
+    async def get_payments_by_status(self, status: str) -> List[Dict[str, Any]]:
+        """상태별 결제 목록 조회 (샤드 순서대로 이어 붙임)"""
+        parts = await self._router.broadcast("get_payments_by_status", status)
+        return list(itertools.chain.from_iterable(parts))
+
+    async def get_payments_by_time_range(
+        self,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+        status: str | None = None,
+        limit: int | None = None,
+        descending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        created_at 구간 조회 [start_ns, end_ns) - 생성 시간 오름차순 (descending이면 최신순)
+
+        샤드마다 limit건까지 받아 created_at 기준으로 병합(k-way merge)한 뒤 앞에서 limit건을 자릅니다.
+        """
+        if limit is not None and limit <= 0:
+            return []
+        parts = await self._router.broadcast("get_payments_by_time_range", start_ns, end_ns, status, limit, descending)
+        merged = heapq.merge(*parts, key=_created_ns, reverse=descending)
+        return list(itertools.islice(merged, limit))
+
+    async def generation(self) -> Tuple[Tuple[str, int], ...]:
+        """
+        변경 세대 (샤드별 (워커 부팅 id, 세대) 튜플 - 어느 샤드든 변경되면 달라짐)
+
+        합계를 쓰면 재시작한 샤드의 세대가 0부터 다시 올라가 이전 합계가 되풀이될 수 있으므로,
+        부팅 id로 재시작 전후 세대를 구분합니다.
+        """
+        return tuple((boot_id, generation) for boot_id, generation in await self._router.broadcast("generation"))
+
+    async def get_all_payments(self) -> Dict[str, Dict[str, Any]]:
+        payments: Dict[str, Dict[str, Any]] = {}
+        for part in await self._router.broadcast("get_all_payments"):
+            payments.update(part)
+        return payments
+
+    async def get_payment_count_by_status(self) -> Dict[str, int]:
+        """상태별 결제 개수 조회 (샤드별 개수 합산)"""
+        counts = {status: 0 for status in PAYMENT_STATUSES}
+        for part in await self._router.broadcast("get_payment_count_by_status"):
+            for status, count in part.items():
+                counts[status] = counts.get(status, 0) + count
+        return counts
+
+    async def close(self) -> None:
+        """샤드 연결은 샤드 라우터가 정리"""
@@ -200,7 +200,7 @@ try:
                 pending.append(obj)
             elif status in ("PAYMENT_COMPLETED", "COMPLETED", "DONE", "SUCCESS"):
                 completed.append(obj)
-            elif status in ("TIMEOUT", "FAILED", "CANCELLED", "CANCELLED", "ERROR", "EXPIRED"):
+            elif status in ("TIMEOUT", "FAILED", "CANCELLED", "CANCELLED", "ERROR", "EXPIRED", "PAYMENT_EXPIRED"):
                 failed.append(obj)
             else:
                 others.append(obj)
@@ -0,0 +1,111 @@
+"""
+로깅 설정 테스트 (오프라인)
+
+메시지 유형별 샘플링 필터, JSON 로그 필드, 로그 큐 포화 시 레벨별 처리(INFO 이하 버림, WARNING은 예비 자리까지,
+ERROR 이상은 버리지 않고 직접 출력)를 확인합니다.
+
+실행:
+    python -m pytest test_logging_config.py
+"""
+import json
+import logging
+import os
+import queue
+import random
+import sys
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from config.logging_config import JsonFormatter, SamplingFilter, _DeferredQueueHandler, parse_sample_rates
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+def _record(level: int, msg: str = "message", **extra) -> logging.LogRecord:
+    record = logging.LogRecord("payment", level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_parse_sample_rates_clamps_and_skips_invalid_items():
+    rates = parse_sample_rates("storage.created=0.1, webhook.sent=2,broken,storage.updated=-1")
+    assert rates == {"storage.created": 0.1, "webhook.sent": 1.0, "storage.updated": 0.0}
+
+
+def test_sampling_filter_drops_only_sampled_info():
+    sampling = SamplingFilter({"storage.created": 0.0, "webhook.response": 0.25})
+    assert not sampling.filter(_record(logging.INFO, msg_type="storage.created"))
+    # 비율이 없는 유형과 WARNING 이상은 항상 통과
+    assert sampling.filter(_record(logging.INFO, msg_type="payment.completed"))
+    assert sampling.filter(_record(logging.INFO))
+    assert sampling.filter(_record(logging.WARNING, msg_type="storage.created"))
+    assert sampling.filter(_record(logging.ERROR, msg_type="storage.created"))
+
+    random.seed(7)
+    kept = sum(sampling.filter(_record(logging.INFO, msg_type="webhook.response")) for _ in range(4000))
+    assert 800 < kept < 1200
+
+    assert SamplingFilter({}).filter(_record(logging.DEBUG, msg_type="storage.created"))
+
+
+def test_json_formatter_includes_structured_fields():
+    record = _record(
+        logging.INFO, "결제 %s", msg_type="payment.completed", payment_id="pay_1", tx_id="1", status_code=200, url=None,
+    )
+    record.args = ("완료",)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "payment"
+    assert entry["msg"] == "결제 완료"
+    assert entry["ts"].endswith("Z")
+    assert {key: entry[key] for key in ("msg_type", "payment_id", "tx_id", "status_code")} == {
+        "msg_type": "payment.completed", "payment_id": "pay_1", "tx_id": "1", "status_code": 200,
+    }
+    # 값이 없는 필드는 넣지 않음
+    assert "url" not in entry and "order_id" not in entry and "exc" not in entry
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = _record(logging.ERROR)
+        record.exc_info = sys.exc_info()
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(record))["exc"]
+
+
+def test_full_queue_drops_info_and_warning_but_never_error():
+    log_queue: queue.Queue = queue.Queue(3)
+    fallback = _ListHandler()
+    handler = _DeferredQueueHandler(log_queue, 2, fallback)
+
+    handler.handle(_record(logging.INFO, "info-1"))
+    handler.handle(_record(logging.INFO, "info-2"))
+    # limit에 도달하면 INFO 이하는 예비 자리가 남아 있어도 버림
+    handler.handle(_record(logging.DEBUG, "debug-dropped"))
+    handler.handle(_record(logging.INFO, "info-dropped"))
+    assert handler.dropped == 2
+
+    # WARNING 이상은 예비 자리까지 받음
+    handler.handle(_record(logging.WARNING, "warning-1"))
+    assert log_queue.qsize() == 3
+
+    # 예비 자리까지 차면 WARNING은 버리고, ERROR 이상은 호출 스레드에서 바로 출력
+    handler.handle(_record(logging.WARNING, "warning-dropped"))
+    handler.handle(_record(logging.ERROR, "error-1"))
+    handler.handle(_record(logging.CRITICAL, "critical-1"))
+    assert handler.dropped_warnings == 1
+    assert [record.getMessage() for record in fallback.records] == ["error-1", "critical-1"]
+
+    queued = [log_queue.get_nowait().getMessage() for _ in range(3)]
+    assert queued == ["info-1", "info-2", "warning-1"]
+    assert handler.dropped == 2
@@ -0,0 +1,174 @@
+"""
+결제 분석(PaymentColumns.summarize) 테스트 (오프라인)
+
+손으로 계산한 값이 있는 작은 결제 집합으로 상태별 건수/금액, 처리량 버킷, 완료 지연 백분위수, 상위 사용자,
+구간 조회를 확인하고, 버킷 수 상한을 넘는 조회가 분석 API에서 400이 되는지 확인합니다.
+
+실행:
+    python -m pytest test_payment_analytics.py
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from fastapi import FastAPI
+
+from analytics.payment_analytics import AnalyticsWindowTooLarge, MAX_THROUGHPUT_BUCKETS, PaymentColumns
+from routes.payment_routes import router
+from storage.payment_storage import payment_storage
+from utils.payment_utils import iso_to_epoch_ns
+
+DAY = "2023-07-07"
+
+
+def _at(minute: int, second: int, day: str = DAY) -> str:
+    return f"{day}T00:{minute:02d}:{second:02d}.000000Z"
+
+
+def _out(minute: int, second: int) -> str:
+    """epoch_ns_to_iso 출력 형식 (소수 초가 0이면 생략)"""
+    return f"{DAY}T00:{minute:02d}:{second:02d}Z"
+
+
+def _payment(i: int, user_id: int, amount: int, status: str, created_at: str, confirmed_at: str | None) -> dict:
+    return {
+        "payment_id": f"pay_an{i}",
+        "order_id": i,
+        "tx_id": f"an{i}",
+        "user_id": user_id,
+        "amount": amount,
+        "status": status,
+        "created_at": created_at,
+        "confirmed_at": confirmed_at,
+    }
+
+
+# 완료 4건(지연 1s/3s/40s/2s), 대기·취소·만료 각 1건, 60초 버킷 2개에 걸침
+FIXTURE = [
+    _payment(1, 1, 1000, "PAYMENT_COMPLETED", _at(0, 0), _at(0, 1)),
+    _payment(2, 2, 2500, "PAYMENT_COMPLETED", _at(0, 10), _at(0, 13)),
+    _payment(3, 1, 4000, "PAYMENT_COMPLETED", _at(0, 30), _at(1, 10)),
+    _payment(4, 3, 700, "PENDING", _at(0, 50), None),
+    _payment(5, 2, 300, "PAYMENT_CANCELLED", _at(1, 5), _at(1, 6)),
+    _payment(6, 4, 9000, "PAYMENT_EXPIRED", _at(1, 20), None),
+    _payment(7, 3, 2000, "PAYMENT_COMPLETED", _at(1, 30), _at(1, 32)),
+]
+
+
+def _columns(payments: list, capacity: int = 2) -> PaymentColumns:
+    # 용량을 작게 시작해 확장(_grow) 경로도 함께 거침
+    columns = PaymentColumns(capacity=capacity)
+    for payment in payments:
+        columns.observe(payment)
+    return columns
+
+
+def test_summarize_matches_hand_computed_values():
+    summary = _columns(FIXTURE).summarize(bucket_sec=60, top_n=2)
+
+    assert summary["window"] == {"since": None, "until": None, "count": 7}
+    assert summary["by_status"] == {
+        "PENDING": {"count": 1, "amount": 700},
+        "PAYMENT_COMPLETED": {"count": 4, "amount": 9500},
+        "PAYMENT_CANCELLED": {"count": 1, "amount": 300},
+        "PAYMENT_EXPIRED": {"count": 1, "amount": 9000},
+    }
+    # 완료 건수는 confirmed_at이 속한 버킷에 셈 (취소된 결제의 confirmed_at은 제외)
+    assert summary["throughput"] == [
+        {"bucket": _out(0, 0), "created": 4, "completed": 2},
+        {"bucket": _out(1, 0), "created": 3, "completed": 2},
+    ]
+    # 지연 [1000, 2000, 3000, 40000]ms의 선형 보간 백분위수
+    assert summary["completion_latency_ms"] == {
+        "p50": 2500.0, "p90": 28900.0, "p95": 34450.0, "p99": 38890.0, "mean": 11500.0, "max": 40000.0, "count": 4,
+    }
+    assert summary["top_users"] == [
+        {"user_id": 1, "amount": 5000, "count": 2},
+        {"user_id": 2, "amount": 2500, "count": 1},
+    ]
+
+
+def test_window_is_half_open_and_unsorted_rows_give_same_result():
+    start_ns, end_ns = iso_to_epoch_ns(_at(0, 10)), iso_to_epoch_ns(_at(1, 20))
+    summary = _columns(FIXTURE).summarize(start_ns, end_ns, bucket_sec=60, top_n=10)
+
+    assert summary["window"] == {"since": _out(0, 10), "until": _out(1, 20), "count": 4}
+    assert summary["by_status"]["PAYMENT_COMPLETED"] == {"count": 2, "amount": 6500}
+    assert summary["by_status"]["PAYMENT_EXPIRED"] == {"count": 0, "amount": 0}
+    assert summary["throughput"] == [
+        {"bucket": _out(0, 0), "created": 3, "completed": 1},
+        {"bucket": _out(1, 0), "created": 1, "completed": 1},
+    ]
+    assert summary["completion_latency_ms"]["count"] == 2
+    assert summary["completion_latency_ms"]["max"] == 40000.0
+    assert summary["top_users"] == [
+        {"user_id": 1, "amount": 4000, "count": 1},
+        {"user_id": 2, "amount": 2500, "count": 1},
+    ]
+
+    # 생성 순서가 뒤섞여 정렬 검색 대신 마스크로 고르는 경우에도 같은 결과
+    shuffled = _columns(FIXTURE[::-1])
+    assert not shuffled._created_sorted
+    assert shuffled.summarize(start_ns, end_ns, bucket_sec=60, top_n=10) == summary
+
+
+def test_top_users_with_large_user_ids_and_status_updates():
+    payments = [
+        _payment(10 + i, user_id, amount, "PAYMENT_COMPLETED", _at(0, i), _at(0, i + 1))
+        for i, (user_id, amount) in enumerate([(10**9, 100), (7, 300), (10**9, 250), (2**40, 300), (7, 1)])
+    ]
+    columns = _columns(payments)
+    # 정렬 기반 합산 경로 (user_id가 배열 인덱스 상한 이상)
+    assert columns.summarize(top_n=3)["top_users"] == [
+        {"user_id": 10**9, "amount": 350, "count": 2},
+        {"user_id": 7, "amount": 301, "count": 2},
+        {"user_id": 2**40, "amount": 300, "count": 1},
+    ]
+    # 같은 결제가 다시 관찰되면 행을 덮어씀 (취소되면 완료 집계에서 빠짐)
+    columns.observe({**payments[0], "status": "PAYMENT_CANCELLED"})
+    summary = columns.summarize(top_n=1)
+    assert len(columns) == 5
+    assert summary["top_users"] == [{"user_id": 7, "amount": 301, "count": 2}]
+    assert summary["by_status"]["PAYMENT_CANCELLED"] == {"count": 1, "amount": 100}
+    assert columns.summarize(top_n=0)["top_users"] == []
+
+
+def test_too_many_buckets_raises_and_api_returns_400():
+    day = "2023-07-08"
+    far = f"{day}T05:00:00.000000Z"  # 첫 결제에서 18000초 뒤
+    payments = [
+        _payment(20, 1, 1000, "PENDING", _at(0, 0, day), None),
+        _payment(21, 1, 1000, "PENDING", far, None),
+    ]
+    with pytest.raises(AnalyticsWindowTooLarge):
+        _columns(payments).summarize(bucket_sec=1)
+    assert 18000 > MAX_THROUGHPUT_BUCKETS
+    assert len(_columns(payments).summarize(bucket_sec=2)["throughput"]) == 2
+
+    async def main():
+        for payment in payments:
+            await payment_storage.create_payment(dict(payment))
+        app = FastAPI()
+        app.include_router(router)
+        params = {"since": _at(0, 0, day), "until": f"{day}T06:00:00.000000Z"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/v2/analytics", params={**params, "bucket_sec": 1})
+            assert response.status_code == 400
+            assert "bucket_sec" in response.json()["detail"]
+
+            response = await client.get("/api/v2/analytics", params={**params, "bucket_sec": 60})
+            assert response.status_code == 200
+            assert response.json()["window"]["count"] == 2
+
+            response = await client.get("/api/v2/analytics", params={**params, "bucket_sec": 0})
+            assert response.status_code == 400
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+결제 상태 전환 경합 테스트 (오프라인, 인메모리 저장소)
+
+같은 결제에 수동 완료(confirm) 여러 건, 자동 완료, 만료를 동시에 보내도
+상태 전환은 한 번만 성공하고(버전 +1), 웹훅은 한 번만 전송되는지 확인합니다.
+웹훅은 장애 주입 트랜스포트(FaultTransport)로 같은 프로세스의 수신 앱에 보냅니다.
+
+실행:
+    python -m pytest test_payment_concurrency.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from services.payment_engine import PaymentAlreadyProcessed, PaymentEngine
+from services.payment_expiry import PaymentExpiry
+from services.payment_workflow import payment_workflow
+from services.webhook_client import WebhookClient
+from services.webhook_delivery import WebhookDispatcher
+from storage.payment_storage import payment_storage
+from tools.webhook_fault_receiver import FaultProfile, FaultReceiver, FaultTransport
+from utils.payment_utils import now_iso
+
+CONFIRMS = 8
+ROUNDS = 20
+
+
+def _payment(tx_id: str) -> dict:
+    return {
+        "payment_id": f"pay_{tx_id}",
+        "order_id": 1,
+        "tx_id": tx_id,
+        "user_id": 1,
+        "amount": 1000,
+        "status": "PENDING",
+        "created_at": now_iso(),
+        "confirmed_at": None,
+        "callback_url": "http://fault-receiver.local/webhook",
+    }
+
+
+def test_confirms_auto_complete_and_expiry_race_to_one_transition():
+    async def main():
+        receiver = FaultReceiver(FaultProfile("fast"))
+        transport = FaultTransport(receiver, receiver.profile)
+        # 전역 디스패처는 처음 쓴 이벤트 루프에 묶이므로 이 테스트 전용 디스패처로 교체
+        dispatcher = WebhookDispatcher(client=WebhookClient(timeout=2.0, transport=transport, keepalive_interval=0))
+        previous_dispatcher, payment_workflow.dispatcher = payment_workflow.dispatcher, dispatcher
+        expiry = PaymentExpiry(ttl=0.001, interval=1.0, emit_webhook=True)
+        engine = PaymentEngine()
+        rng = random.Random(3)
+
+        transitions = {}
+
+        def record(payment):
+            if payment["payment_id"].startswith("pay_race_") and payment["status"] != "PENDING":
+                transitions.setdefault(payment["payment_id"], []).append((payment["status"], payment["version"]))
+
+        payment_storage.subscribe(record)
+        try:
+            winners = set()
+            for round_no in range(ROUNDS):
+                payment = _payment(f"race_{round_no}")
+                payment_id = payment["payment_id"]
+                await payment_storage.create_payment(payment)
+                expiry.observe(payment)
+
+                async def jitter(start):
+                    # 매 라운드 경쟁 순서가 달라지도록 시작 시점을 흩뜨림
+                    await asyncio.sleep(rng.random() * 0.002)
+                    return await start()
+
+                async def confirm():
+                    try:
+                        return await engine.confirm(payment_id)
+                    except PaymentAlreadyProcessed:
+                        return None
+
+                results = await asyncio.gather(
+                    *(jitter(confirm) for _ in range(CONFIRMS)),
+                    jitter(lambda: payment_workflow.schedule_completion(payment, delay=0)),
+                    jitter(lambda: expiry.tick(time.time_ns() + 1_000_000_000)),
+                )
+                # 만료 웹훅 등 남은 후속 작업까지 완료
+                await asyncio.gather(*list(payment_workflow._inflight))
+
+                confirmed = [result for result in results[:CONFIRMS] if result is not None]
+                expired = results[-1]
+                assert len(confirmed) <= 1 and len(expired) <= 1
+
+                # 전환은 한 번만 성공하고 버전은 생성(1)에서 정확히 1 증가
+                assert len(transitions[payment_id]) == 1
+                status, version = transitions[payment_id][0]
+                assert version == 2
+                stored = await payment_storage.get_payment(payment_id)
+                assert (stored["status"], stored["version"]) == (status, 2)
+                if confirmed:
+                    assert status == "PAYMENT_COMPLETED"
+                    winners.add("confirm")
+                elif expired:
+                    assert status == "PAYMENT_EXPIRED"
+                    winners.add("expiry")
+                else:
+                    assert status == "PAYMENT_COMPLETED"
+                    winners.add("auto_complete")
+
+                # 이긴 쪽의 웹훅만 한 번 전송
+                assert receiver.deliveries.get(payment["tx_id"]) == 1
+            assert receiver.stats["requests"] == receiver.stats["ok"] == ROUNDS
+            # 라운드마다 이긴 쪽이 달라져 실제로 경합했는지 확인
+            assert len(winners) >= 2
+        finally:
+            payment_storage._listeners.remove(record)
+            payment_workflow.dispatcher = previous_dispatcher
+            await dispatcher.client.stop()
+    asyncio.run(main())
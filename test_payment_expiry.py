@@ -0,0 +1,142 @@
+"""
+결제 만료 엔진 테스트 (오프라인, 인메모리 저장소)
+
+deadline 최소 힙 순서, 완료/재생성된 결제의 지연 삭제(lazy deletion), tick마다 기한이 지난 PENDING 결제만 만료되는지,
+emit_webhook(PAYMENT_EXPIRY_WEBHOOK)이 켜져 있으면 만료 웹훅을 보내는지 확인합니다.
+
+실행:
+    python -m pytest test_payment_expiry.py
+"""
+import asyncio
+import os
+import sys
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from services.payment_expiry import PaymentExpiry
+from services.payment_workflow import payment_workflow
+from services.webhook_client import WebhookClient
+from services.webhook_delivery import WebhookDispatcher
+from storage.payment_storage import payment_storage
+from tools.webhook_fault_receiver import FaultProfile, FaultReceiver, FaultTransport
+from utils.payment_utils import iso_to_epoch_ns
+
+TTL = 10.0
+SECOND_NS = 1_000_000_000
+
+
+def _payment(tx_id: str, second: int) -> dict:
+    return {
+        "payment_id": f"pay_{tx_id}",
+        "order_id": 1,
+        "tx_id": tx_id,
+        "user_id": 1,
+        "amount": 1000,
+        "status": "PENDING",
+        "created_at": f"2024-03-01T00:00:{second:02d}.000000Z",
+        "confirmed_at": None,
+        "callback_url": "http://fault-receiver.local/webhook",
+    }
+
+
+def _deadline(second: int) -> int:
+    """second초에 생성된 결제의 만료 기한 (epoch ns)"""
+    return iso_to_epoch_ns(f"2024-03-01T00:00:{second:02d}.000000Z") + int(TTL * SECOND_NS)
+
+
+async def _create(expiry: PaymentExpiry, tx_id: str, second: int) -> dict:
+    payment = _payment(tx_id, second)
+    await payment_storage.create_payment(payment)
+    expiry.observe(payment)
+    return payment
+
+
+def test_disabled_by_default_ttl():
+    expiry = PaymentExpiry(ttl=0, interval=1.0, emit_webhook=False)
+    assert not expiry.enabled
+    expiry.observe(_payment("exp_disabled", 0))
+    assert expiry._heap == []
+
+
+def test_expires_in_deadline_order_and_only_overdue_pending():
+    async def main():
+        expiry = PaymentExpiry(ttl=TTL, interval=1.0, emit_webhook=False)
+        # 생성 순서와 무관하게 기한이 가장 이른 결제가 힙 맨 앞
+        for tx_id, second in (("exp_order_c", 30), ("exp_order_a", 10), ("exp_order_d", 40), ("exp_order_b", 20)):
+            await _create(expiry, tx_id, second)
+        assert expiry._heap[0] == (_deadline(10), "pay_exp_order_a")
+        # 같은 결제를 다시 관찰해도 중복 등록하지 않음
+        expiry.observe(_payment("exp_order_a", 10))
+        assert len(expiry._heap) == 4
+
+        # 기한이 지난 결제만 기한 순서대로 만료, 나머지는 힙에 남음
+        expired = await expiry.expire_due(_deadline(30))
+        assert [payment["payment_id"] for payment in expired] == [
+            "pay_exp_order_a", "pay_exp_order_b", "pay_exp_order_c",
+        ]
+        assert expiry._heap == [(_deadline(40), "pay_exp_order_d")]
+        stored = await payment_storage.get_payment("pay_exp_order_a")
+        assert stored["status"] == "PAYMENT_EXPIRED" and stored["version"] == 2 and stored["expired_at"]
+        assert (await payment_storage.get_payment("pay_exp_order_d"))["status"] == "PENDING"
+
+        # 기한 직전에는 만료되지 않음
+        assert await expiry.expire_due(_deadline(40) - 1) == []
+        assert [payment["payment_id"] for payment in await expiry.expire_due(_deadline(40))] == ["pay_exp_order_d"]
+        assert expiry._heap == [] and expiry._scheduled == set()
+    asyncio.run(main())
+
+
+def test_completed_and_recreated_payments_are_lazily_skipped():
+    async def main():
+        expiry = PaymentExpiry(ttl=TTL, interval=1.0, emit_webhook=False)
+        await _create(expiry, "exp_lazy_done", 0)
+        await _create(expiry, "exp_lazy_recreated", 0)
+
+        # 기한 전에 완료된 결제는 힙에 남아 있다가 꺼낼 때 버림
+        await payment_storage.transition("pay_exp_lazy_done", "PENDING", "PAYMENT_COMPLETED")
+        # 같은 payment_id로 재생성되면 새 created_at 기준으로 기한이 늦춰짐 (PENDING이라 observe는 무시)
+        await _create(expiry, "exp_lazy_recreated", 50)
+        assert len(expiry._heap) == 2
+
+        assert await expiry.expire_due(_deadline(0)) == []
+        assert (await payment_storage.get_payment("pay_exp_lazy_done"))["status"] == "PAYMENT_COMPLETED"
+        # 재생성된 결제는 늦춰진 기한으로 다시 등록
+        assert expiry._heap == [(_deadline(50), "pay_exp_lazy_recreated")]
+        assert expiry._scheduled == {"pay_exp_lazy_recreated"}
+
+        expired = await expiry.expire_due(_deadline(50))
+        assert [payment["payment_id"] for payment in expired] == ["pay_exp_lazy_recreated"]
+        assert expired[0]["version"] == 3
+    asyncio.run(main())
+
+
+def _run_tick(emit_webhook: bool, tx_id: str) -> FaultReceiver:
+    async def main():
+        receiver = FaultReceiver(FaultProfile("fast"))
+        client = WebhookClient(timeout=2.0, transport=FaultTransport(receiver, receiver.profile), keepalive_interval=0)
+        # 전역 디스패처는 처음 쓴 이벤트 루프에 묶이므로 이 테스트 전용 디스패처로 교체
+        previous, payment_workflow.dispatcher = payment_workflow.dispatcher, WebhookDispatcher(client=client)
+        try:
+            expiry = PaymentExpiry(ttl=TTL, interval=1.0, emit_webhook=emit_webhook)
+            await _create(expiry, tx_id, 0)
+            assert len(await expiry.tick(_deadline(0))) == 1
+            await asyncio.gather(*list(payment_workflow._inflight))
+        finally:
+            payment_workflow.dispatcher = previous
+            await client.stop()
+        return receiver
+    return asyncio.run(main())
+
+
+def test_tick_sends_expired_webhook_only_when_enabled():
+    receiver = _run_tick(True, "exp_webhook_on")
+    assert receiver.deliveries == {"exp_webhook_on": 1}
+    # 만료 웹훅 실패/성공과 무관하게 만료 상태 유지 (cancel_on_failure=False)
+    assert asyncio.run(payment_storage.get_payment("pay_exp_webhook_on"))["status"] == "PAYMENT_EXPIRED"
+
+    receiver = _run_tick(False, "exp_webhook_off")
+    assert receiver.stats["requests"] == 0
@@ -0,0 +1,132 @@
+"""
+결제 처리 흐름 종료 처리 테스트 (오프라인)
+
+종료가 시작되면 결제 생성/완료가 저장소를 바꾸기 전에 WorkflowShuttingDown으로 거부되는지,
+종료 때 저장한 작업을 재시작 후 재개하면 같은 X-Payment-Delivery-Id로 다시 보내는지 확인합니다.
+
+실행:
+    python -m pytest test_payment_workflow.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from services.payment_engine import PaymentEngine
+from services.payment_workflow import PaymentWorkflow, WorkflowShuttingDown, payment_workflow
+from services.webhook_client import WebhookClient
+from services.webhook_delivery import WebhookDispatcher
+from storage.payment_storage import payment_storage
+from tools.webhook_fault_receiver import FaultProfile, FaultReceiver, FaultTransport
+from utils.payment_utils import now_iso
+
+HANG = FaultProfile("hang", latency=("fixed", 0.5))
+FAST = FaultProfile("fast")
+
+
+def _payment(tx_id: str) -> dict:
+    return {
+        "payment_id": f"pay_{tx_id}",
+        "order_id": 1,
+        "tx_id": tx_id,
+        "user_id": 1,
+        "amount": 1000,
+        "status": "PENDING",
+        "created_at": now_iso(),
+        "confirmed_at": None,
+        "callback_url": "http://fault-receiver.local/webhook",
+    }
+
+
+def test_shutdown_rejects_start_and_confirm_before_storage_changes():
+    async def main():
+        engine = PaymentEngine()
+        await payment_storage.create_payment(_payment("wf_pending"))
+        payment_workflow.accepting = False
+        try:
+            with pytest.raises(WorkflowShuttingDown):
+                await engine.start(_payment("wf_new"))
+            assert await payment_storage.get_payment("pay_wf_new") is None
+
+            with pytest.raises(WorkflowShuttingDown):
+                await engine.confirm("pay_wf_pending")
+            payment = await payment_storage.get_payment("pay_wf_pending")
+            assert payment["status"] == "PENDING" and payment["version"] == 1
+        finally:
+            payment_workflow.accepting = True
+    asyncio.run(main())
+
+
+def _dispatcher(receiver: FaultReceiver) -> WebhookDispatcher:
+    # 전역 디스패처는 처음 쓴 이벤트 루프에 묶이므로 asyncio.run마다 새로 생성
+    client = WebhookClient(timeout=2.0, transport=FaultTransport(receiver, receiver.profile), keepalive_interval=0)
+    return WebhookDispatcher(client=client)
+
+
+def _saved_items(state_file: str) -> list:
+    with open(state_file, encoding="utf-8") as f:
+        return json.load(f)["items"]
+
+
+def test_interrupted_delivery_resumes_with_same_delivery_id(tmp_path):
+    async def main():
+        state_file = str(tmp_path / "work.json")
+        receiver = FaultReceiver(HANG)
+        dispatcher = _dispatcher(receiver)
+        payment = _payment("wf_deliver")
+        payment["status"] = "PAYMENT_COMPLETED"
+        await payment_storage.create_payment(payment)
+
+        # 응답이 오기 전에 종료 기한이 지나 작업은 취소·저장되지만 POST는 이미 수신 측에 도착
+        workflow = PaymentWorkflow(state_file, dispatcher=dispatcher)
+        workflow.deliver(payment)
+        await asyncio.sleep(0.1)
+        await workflow.shutdown(0.05)
+        items = _saved_items(state_file)
+        assert [item["kind"] for item in items] == ["deliver"]
+        delivery_id = items[0]["delivery_id"]
+        assert receiver.delivery_ids == {delivery_id: 1}
+
+        receiver.profile = FAST
+        restarted = PaymentWorkflow(state_file, dispatcher=dispatcher)
+        assert await restarted.resume() == 1
+        assert not os.path.exists(state_file)
+        statuses = await asyncio.gather(*restarted._inflight)
+        assert statuses == ["PAYMENT_COMPLETED"]
+        # 재전송도 같은 전송 id로 도착하므로 수신 측이 중복으로 알아볼 수 있음
+        assert receiver.delivery_ids == {delivery_id: 2}
+        await dispatcher.client.stop()
+    asyncio.run(main())
+
+
+def test_scheduled_completion_is_saved_and_completed_after_resume(tmp_path):
+    async def main():
+        state_file = str(tmp_path / "work.json")
+        receiver = FaultReceiver(FAST)
+        dispatcher = _dispatcher(receiver)
+        payment = _payment("wf_complete")
+        await payment_storage.create_payment(payment)
+
+        workflow = PaymentWorkflow(state_file, dispatcher=dispatcher)
+        workflow.schedule_completion(payment, delay=0.2)
+        await workflow.shutdown(0)
+        assert [item["kind"] for item in _saved_items(state_file)] == ["complete"]
+        assert (await payment_storage.get_payment("pay_wf_complete"))["status"] == "PENDING"
+
+        restarted = PaymentWorkflow(state_file, dispatcher=dispatcher)
+        assert await restarted.resume() == 1
+        statuses = await asyncio.gather(*restarted._inflight)
+        assert statuses == ["PAYMENT_COMPLETED"]
+        assert (await payment_storage.get_payment("pay_wf_complete"))["status"] == "PAYMENT_COMPLETED"
+        assert receiver.deliveries == {"wf_complete": 1}
+        assert sum(receiver.delivery_ids.values()) == 1
+        await dispatcher.client.stop()
+    asyncio.run(main())
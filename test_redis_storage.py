@@ -0,0 +1,134 @@
+"""
+Redis 저장소 Lua 스크립트 테스트 (오프라인)
+
+fakeredis(Lua 실행에 lupa 필요)의 in-process Redis로 RedisPaymentStorage의 생성/상태 전환(CAS)/개수 집계와
+스크립트가 KEYS로 받은 키만 사용하는지 확인합니다. 패키지가 없으면 건너뜁니다.
+
+실행:
+    python -m pytest test_redis_storage.py
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from storage.payment_backend import PAYMENT_STATUSES
+from storage.redis_payment_storage import RedisPaymentStorage
+
+
+def _payment(i: int, status: str = "PENDING") -> dict:
+    return {
+        "payment_id": f"pay_{i}",
+        "order_id": i,
+        "tx_id": str(i),
+        "user_id": i % 3,
+        "amount": 1000 + i,
+        "status": status,
+        "created_at": f"2024-01-01T00:00:{i:02d}.000001Z",
+        "confirmed_at": None,
+    }
+
+
+def _run(test) -> None:
+    async def main():
+        redis = fakeredis.FakeAsyncRedis()
+        storage = RedisPaymentStorage(redis, key_prefix="t")
+        try:
+            await test(storage, redis)
+        finally:
+            await storage.close()
+    asyncio.run(main())
+
+
+def test_create_and_recreate():
+    """생성 시 상태 인덱스/세대 갱신, 같은 payment_id 재생성 시 version 증가 + 이전 상태 인덱스 제거"""
+    async def check(storage, redis):
+        await storage.create_payment(_payment(1))
+        await storage.create_payment(_payment(2))
+        assert await storage.generation() == 2
+        assert (await storage.get_payment("pay_1"))["version"] == 1
+
+        await storage.create_payment(_payment(1, status="PAYMENT_CANCELLED"))
+        payment = await storage.get_payment("pay_1")
+        assert payment["version"] == 2 and payment["status"] == "PAYMENT_CANCELLED"
+        counts = await storage.get_payment_count_by_status()
+        assert counts == {"PENDING": 1, "PAYMENT_COMPLETED": 0, "PAYMENT_CANCELLED": 1, "PAYMENT_EXPIRED": 0}
+
+        with pytest.raises(ValueError):
+            await storage.create_payment(_payment(3, status="UNKNOWN"))
+    _run(check)
+
+
+def test_transition_compare_and_set():
+    """현재 상태가 허용 목록에 있을 때만 전환되고, 동시 전환 중 하나만 성공"""
+    async def check(storage, redis):
+        await storage.create_payment(_payment(1))
+        results = await asyncio.gather(*(
+            storage.transition("pay_1", "PENDING", "PAYMENT_COMPLETED", {"confirmed_at": "2024-01-01T00:00:02Z"})
+            for _ in range(5)
+        ))
+        done = [result for result in results if result is not None]
+        assert len(done) == 1
+        assert done[0]["status"] == "PAYMENT_COMPLETED" and done[0]["version"] == 2
+        assert done[0]["confirmed_at"] == "2024-01-01T00:00:02Z"
+
+        assert await storage.transition("pay_1", "PENDING", "PAYMENT_CANCELLED") is None
+        assert await storage.transition("pay_missing", "PENDING", "PAYMENT_COMPLETED") is None
+        assert await storage.transition("pay_1", ["PAYMENT_COMPLETED"], "PAYMENT_CANCELLED") is not None
+
+        by_status = await storage.get_payments_by_time_range(status="PAYMENT_CANCELLED")
+        assert [payment["payment_id"] for payment in by_status] == ["pay_1"]
+        assert await storage.get_payments_by_status("PAYMENT_COMPLETED") == []
+    _run(check)
+
+
+def test_transition_without_created_index():
+    """created 인덱스가 없어도 전환이 실패하지 않고 이전 상태 인덱스의 score로 상태 인덱스를 옮김"""
+    async def check(storage, redis):
+        await storage.create_payment(_payment(1))
+        await redis.zrem("t:created", "pay_1")
+        payment = await storage.transition("pay_1", "PENDING", "PAYMENT_EXPIRED")
+        assert payment is not None and payment["status"] == "PAYMENT_EXPIRED"
+        assert await redis.zscore("t:status:PAYMENT_EXPIRED", "pay_1") is not None
+        assert await redis.zscore("t:status:PENDING", "pay_1") is None
+    _run(check)
+
+
+def test_counts_and_time_range():
+    """상태별 개수와 created_at 구간 조회 (오름차순/최신순, limit)"""
+    async def check(storage, redis):
+        for i in range(10):
+            await storage.create_payment(_payment(i))
+        for i in range(0, 10, 3):
+            await storage.transition(f"pay_{i}", "PENDING", "PAYMENT_COMPLETED")
+        counts = await storage.get_payment_count_by_status()
+        assert counts["PENDING"] == 6 and counts["PAYMENT_COMPLETED"] == 4
+        assert sum(counts.values()) == 10 and set(counts) == set(PAYMENT_STATUSES)
+
+        recent = await storage.get_payments_by_time_range(limit=3, descending=True)
+        assert [payment["payment_id"] for payment in recent] == ["pay_9", "pay_8", "pay_7"]
+        completed = await storage.get_payments_by_time_range(status="PAYMENT_COMPLETED", limit=2)
+        assert [payment["payment_id"] for payment in completed] == ["pay_0", "pay_3"]
+    _run(check)
+
+
+def test_scripts_use_declared_keys_only():
+    """스크립트 실행 후 생긴 키가 모두 스크립트에 KEYS로 넘기는 키 목록 안에 있음 (Cluster/프록시 호환)"""
+    async def check(storage, redis):
+        await storage.create_payment(_payment(1))
+        await storage.transition("pay_1", "PENDING", "PAYMENT_COMPLETED")
+        await storage.update_payment("pay_1", {"amount": 5})
+        declared = set(storage._index_keys("pay_1"))
+        keys = {key.decode() for key in await redis.keys("*")}
+        assert keys <= declared, keys - declared
+    _run(check)
@@ -0,0 +1,60 @@
+"""
+조회 응답 캐시 테스트 (오프라인)
+
+ResponseCache의 세대 비교와, 압축본(variants)까지 포함한 전체 바이트 상한(max_total_bytes)을 확인합니다.
+
+실행:
+    python -m pytest test_response_cache.py
+"""
+import asyncio
+import os
+import sys
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from services.response_cache import ResponseCache
+
+
+def _total(cache: ResponseCache) -> int:
+    return sum(entry.size for entry in cache._entries.values())
+
+
+def test_generation_mismatch_is_a_miss():
+    cache = ResponseCache(max_entries=4, max_bytes=1024, max_total_bytes=4096)
+    cache.put("a", (("boot0", 1),), b"{}")
+    assert cache.get("a", (("boot0", 1),)) is not None
+    assert cache.get("a", (("boot0-restarted", 1),)) is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_total_bytes_include_compressed_variants():
+    async def main():
+        # 무작위 본문은 압축해도 거의 줄지 않음 (압축본 크기 ≈ 본문 크기)
+        cache = ResponseCache(max_entries=10, max_bytes=10_000, max_total_bytes=12_000)
+        first = cache.put("first", 1, os.urandom(4000))
+        second = cache.put("second", 1, os.urandom(4000))
+        assert cache.stats()["bytes"] == _total(cache) == 8000
+
+        # 조회로 second가 최근 항목이 된 뒤 압축본이 추가되면 예산을 넘으므로 first가 제거됨
+        assert cache.get("second", 1) is second
+        await second.encoded("gzip")
+        assert cache.get("first", 1) is None
+        assert cache.stats()["bytes"] == _total(cache) == second.size
+        assert cache.stats()["evictions"] == 1
+
+        # 제거된 항목의 압축본은 캐시 바이트에 더해지지 않음
+        await first.encoded("gzip")
+        assert cache.stats()["bytes"] == _total(cache)
+
+        # 같은 키를 새 세대로 교체하면 이전 항목(압축본 포함) 크기를 뺌
+        cache.put("second", 2, os.urandom(1000))
+        assert cache.stats()["bytes"] == _total(cache) == 1000
+
+        # 전체 상한보다 큰 본문은 저장하지 않음
+        cache.put("huge", 1, os.urandom(13_000))
+        assert cache.stats()["skipped"] == 1 and cache.get("huge", 1) is None
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+"""
+샤드 라우팅 테스트 (오프라인)
+
+임시 디렉터리의 Unix 소켓으로 샤드 서버 2개를 같은 프로세스에서 띄우고, 프런트의 ShardRouter/ShardedPaymentStorage/
+ShardedPaymentEngine이 담당 샤드로 보내고 결과를 합치는지 확인합니다.
+샤드마다 따로 만든 인메모리 저장소를 쓰므로 결제 엔진의 start/confirm은 저장소만 다루는 간단한 작업으로 대신합니다.
+
+실행:
+    python -m pytest test_shard_routing.py
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+import pytest
+
+from services.payment_engine import PaymentNotFound, PaymentAlreadyProcessed, ShardedPaymentEngine
+from services.payment_workflow import WorkflowShuttingDown
+from shards.ipc import socket_path
+from shards.router import ShardRouter
+from shards.worker import ShardServer, _storage_operations
+from storage.payment_backend import PAYMENT_STATUSES
+from storage.payment_storage import PaymentStorage
+from storage.sharded_payment_storage import ShardedPaymentStorage
+from utils.payment_utils import iso_to_epoch_ns
+
+SHARDS = 2
+
+
+def _payment(i: int, status: str = "PENDING") -> dict:
+    return {
+        "payment_id": f"pay_{i}",
+        "order_id": i,
+        "tx_id": str(i),
+        "user_id": i % 3,
+        "amount": 1000 + i,
+        "status": status,
+        "created_at": f"2024-01-01T00:00:{i:02d}.000001Z",
+        "confirmed_at": None,
+    }
+
+
+def _shard_operations(storage: PaymentStorage, boot_id: str) -> dict:
+    async def start(payment_data):
+        await storage.create_payment(payment_data)
+        return payment_data["status"]
+
+    async def confirm(payment_id):
+        if not await storage.get_payment(payment_id):
+            raise PaymentNotFound(payment_id)
+        payment = await storage.transition(
+            payment_id, "PENDING", "PAYMENT_COMPLETED", {"confirmed_at": "2024-01-01T00:01:00.000000Z"}
+        )
+        if payment is None:
+            raise PaymentAlreadyProcessed(payment_id)
+        return {"status": payment["status"], "confirmed_at": payment["confirmed_at"]}
+
+    return {"start": start, "confirm": confirm, **_storage_operations(storage, boot_id)}
+
+
+def _server(socket_dir: str, index: int, storage: PaymentStorage, boot_id: str) -> ShardServer:
+    return ShardServer(
+        index, socket_path(socket_dir, index), _shard_operations(storage, boot_id),
+        expected_errors=(PaymentNotFound, PaymentAlreadyProcessed), stopping_error=WorkflowShuttingDown,
+    )
+
+
+def _run(test) -> None:
+    async def main():
+        socket_dir = tempfile.mkdtemp(prefix="shards-")
+        storages = [PaymentStorage() for _ in range(SHARDS)]
+        servers = [_server(socket_dir, i, storage, f"boot{i}") for i, storage in enumerate(storages)]
+        for server in servers:
+            await server.start()
+        router = ShardRouter(SHARDS, socket_dir, spawn=False, start_timeout=5)
+        await router.start()
+        try:
+            await test(router, storages, servers)
+        finally:
+            await router.stop(timeout=0)
+            for server in servers:
+                await server.stop()
+            shutil.rmtree(socket_dir, ignore_errors=True)
+    asyncio.run(main())
+
+
+def test_create_and_confirm_route_to_owner():
+    async def test(router, storages, servers):
+        engine = ShardedPaymentEngine(router)
+        for i in range(20):
+            assert await engine.start(_payment(i)) == "PENDING"
+
+        owners = set()
+        for i in range(20):
+            payment_id = f"pay_{i}"
+            owner = router.owner(payment_id)
+            owners.add(owner)
+            assert await storages[owner].get_payment(payment_id) is not None
+            assert await storages[1 - owner].get_payment(payment_id) is None
+        assert owners == {0, 1}
+
+        result = await engine.confirm("pay_3")
+        assert result["status"] == "PAYMENT_COMPLETED"
+        assert (await storages[router.owner("pay_3")].get_payment("pay_3"))["status"] == "PAYMENT_COMPLETED"
+    _run(test)
+
+
+def test_engine_errors_are_mapped():
+    async def test(router, storages, servers):
+        engine = ShardedPaymentEngine(router)
+        await engine.start(_payment(1))
+        with pytest.raises(PaymentNotFound):
+            await engine.confirm("pay_missing")
+        await engine.confirm("pay_1")
+        with pytest.raises(PaymentAlreadyProcessed):
+            await engine.confirm("pay_1")
+    _run(test)
+
+
+def test_stopping_shard_rejects_new_ops_on_open_connections():
+    async def test(router, storages, servers):
+        engine = ShardedPaymentEngine(router)
+        owner = router.owner("pay_1")
+        # 종료가 시작되면 이미 열린 프런트 연결로 들어온 요청도 저장소를 바꾸지 않고 거부
+        servers[owner].close()
+        with pytest.raises(WorkflowShuttingDown):
+            await engine.start(_payment(1))
+        assert await storages[owner].get_payment("pay_1") is None
+    _run(test)
+
+
+def test_time_range_merges_shards_in_created_order():
+    async def test(router, storages, servers):
+        storage = ShardedPaymentStorage(router)
+        for i in range(20):
+            await storage.create_payment(_payment(i))
+        expected = [f"pay_{i}" for i in range(20)]
+
+        def ids(payments):
+            return [payment["payment_id"] for payment in payments]
+
+        assert ids(await storage.get_payments_by_time_range()) == expected
+        assert ids(await storage.get_payments_by_time_range(limit=5)) == expected[:5]
+        assert ids(await storage.get_payments_by_time_range(limit=5, descending=True)) == expected[::-1][:5]
+
+        start_ns = iso_to_epoch_ns(_payment(3)["created_at"])
+        window = await storage.get_payments_by_time_range(start_ns=start_ns, limit=3)
+        assert ids(window) == expected[3:6]
+
+        assert await storage.get_payments_by_time_range(limit=0) == []
+        assert await storage.get_payments_by_time_range(limit=-1) == []
+    _run(test)
+
+
+def test_counts_are_summed_across_shards():
+    async def test(router, storages, servers):
+        storage = ShardedPaymentStorage(router)
+        expected = {status: 0 for status in PAYMENT_STATUSES}
+        for i in range(20):
+            status = PAYMENT_STATUSES[i % len(PAYMENT_STATUSES)]
+            await storage.create_payment(_payment(i, status))
+            expected[status] += 1
+
+        assert await storage.get_payment_count_by_status() == expected
+        assert len(await storage.get_all_payments()) == 20
+        assert len(await storage.get_payments_by_status("PENDING")) == expected["PENDING"]
+    _run(test)
+
+
+def test_restarted_shard_changes_generation_and_reconnects():
+    async def test(router, storages, servers):
+        storage = ShardedPaymentStorage(router)
+        owner = router.owner("pay_1")
+        await storage.create_payment(_payment(1))
+        before = await storage.generation()
+
+        # 재시작한 샤드가 같은 세대 수까지 변경되어도 부팅 id가 달라 세대가 겹치지 않아야 함
+        await servers[owner].stop()
+        await asyncio.sleep(0.05)
+        assert (await router.health())[owner] is False
+        with pytest.raises(ConnectionError):
+            await storage.get_payment("pay_1")
+
+        storages[owner] = PaymentStorage()
+        servers[owner] = _server(router.socket_dir, owner, storages[owner], f"boot{owner}-restarted")
+        await servers[owner].start()
+        assert await router.health() == [True, True]
+        await storage.create_payment(_payment(1))
+        after = await storage.generation()
+        assert dict(before)[f"boot{owner}"] == dict(after)[f"boot{owner}-restarted"] == 1
+        assert after != before
+    _run(test)
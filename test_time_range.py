@@ -0,0 +1,146 @@
+"""
+created_at 구간 조회 테스트 (오프라인, 인메모리 저장소)
+
+PaymentStorage 시간순 인덱스의 반개구간 [since, until) 경계, 시계가 뒤로 간 경우의 정렬 삽입(insort),
+같은 시각 결제가 페이지 크기보다 많을 때의 커서 페이지 넘김(iter_payments_by_time_range),
+결제 목록 API의 since/until/order=desc/limit 처리를 확인합니다.
+
+실행:
+    python -m pytest test_time_range.py
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from fastapi import FastAPI
+
+from routes.payment_routes import router
+from storage.payment_backend import iter_payments_by_time_range
+from storage.payment_storage import PaymentStorage, payment_storage
+from utils.payment_utils import iso_to_epoch_ns
+
+
+def _at(second: int, day: str = "2023-05-05") -> str:
+    return f"{day}T00:00:{second:02d}.000000Z"
+
+
+def _payment(tx_id: str, created_at: str, status: str = "PENDING") -> dict:
+    return {
+        "payment_id": f"pay_{tx_id}",
+        "order_id": 1,
+        "tx_id": tx_id,
+        "user_id": 1,
+        "amount": 1000,
+        "status": status,
+        "created_at": created_at,
+        "confirmed_at": None,
+    }
+
+
+def _ids(payments) -> list:
+    return [payment["payment_id"] for payment in payments]
+
+
+def test_bounds_are_half_open():
+    async def main():
+        storage = PaymentStorage()
+        for second in range(5):
+            await storage.create_payment(_payment(f"t{second}", _at(second)))
+        ns = [iso_to_epoch_ns(_at(second)) for second in range(5)]
+
+        # since는 포함, until은 제외
+        assert _ids(await storage.get_payments_by_time_range(ns[1], ns[3])) == ["pay_t1", "pay_t2"]
+        assert _ids(await storage.get_payments_by_time_range(ns[1] + 1, ns[3] + 1)) == ["pay_t2", "pay_t3"]
+        assert await storage.get_payments_by_time_range(ns[2], ns[2]) == []
+        assert _ids(await storage.get_payments_by_time_range(start_ns=ns[3])) == ["pay_t3", "pay_t4"]
+        assert _ids(await storage.get_payments_by_time_range(end_ns=ns[1])) == ["pay_t0"]
+        assert _ids(await storage.get_payments_by_time_range(ns[1], ns[4], limit=2, descending=True)) == [
+            "pay_t3", "pay_t2",
+        ]
+    asyncio.run(main())
+
+
+def test_out_of_order_created_at_is_inserted_in_order():
+    async def main():
+        storage = PaymentStorage()
+        # 시계가 뒤로 간 경우(마지막 항목보다 이른 created_at)만 정렬 삽입
+        for tx_id, second in (("a", 10), ("b", 30), ("late", 20), ("c", 40), ("early", 5)):
+            await storage.create_payment(_payment(tx_id, _at(second)))
+        assert storage._time_index == sorted(storage._time_index)
+        assert _ids(await storage.get_payments_by_time_range()) == [
+            "pay_early", "pay_a", "pay_late", "pay_b", "pay_c",
+        ]
+        assert _ids(await storage.get_payments_by_time_range(iso_to_epoch_ns(_at(15)), iso_to_epoch_ns(_at(35)))) == [
+            "pay_late", "pay_b",
+        ]
+
+        # 같은 payment_id 재생성은 이전 인덱스 항목을 지우고 새 시각으로 다시 넣음
+        await storage.create_payment(_payment("late", _at(1)))
+        assert len(storage._time_index) == 5
+        assert _ids(await storage.get_payments_by_time_range()) == [
+            "pay_late", "pay_early", "pay_a", "pay_b", "pay_c",
+        ]
+    asyncio.run(main())
+
+
+def test_cursor_paging_across_equal_timestamps():
+    async def main():
+        storage = PaymentStorage()
+        # 같은 시각 결제 7건이 페이지 크기(3)보다 많아도 빠짐없이 한 번씩 진행
+        await storage.create_payment(_payment("before", _at(0)))
+        for i in range(7):
+            await storage.create_payment(_payment(f"same{i}", _at(1)))
+        for i in range(4):
+            status = "PAYMENT_COMPLETED" if i % 2 else "PENDING"
+            await storage.create_payment(_payment(f"after{i}", _at(2 + i), status=status))
+
+        expected = _ids(await storage.get_payments_by_time_range())
+        paged = [payment async for payment in iter_payments_by_time_range(storage, page_size=3)]
+        assert _ids(paged) == expected and len(expected) == 12
+
+        for page_size in (1, 2, 7, 8, 100):
+            paged = [payment async for payment in iter_payments_by_time_range(storage, page_size=page_size)]
+            assert _ids(paged) == expected
+
+        # 구간/상태 조건도 그대로 적용
+        start_ns, end_ns = iso_to_epoch_ns(_at(1)), iso_to_epoch_ns(_at(4))
+        paged = [payment async for payment in iter_payments_by_time_range(storage, start_ns, end_ns, page_size=2)]
+        assert _ids(paged) == [f"pay_same{i}" for i in range(7)] + ["pay_after0", "pay_after1"]
+        paged = [
+            payment async for payment in iter_payments_by_time_range(storage, status="PAYMENT_COMPLETED", page_size=1)
+        ]
+        assert _ids(paged) == ["pay_after1", "pay_after3"]
+    asyncio.run(main())
+
+
+def test_list_endpoint_since_until_order_and_limit():
+    async def main():
+        day = "2023-06-06"
+        for second in range(6):
+            await payment_storage.create_payment(_payment(f"list{second}", _at(second, day)))
+        app = FastAPI()
+        app.include_router(router)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def listed(**params) -> list:
+                response = await client.get("/api/v2/pending-payments", params=params)
+                assert response.status_code == 200
+                return list(response.json()["payments"])
+
+            since, until = _at(1, day), _at(4, day)
+            assert await listed(since=since, until=until) == ["pay_list1", "pay_list2", "pay_list3"]
+            assert await listed(since=since, until=until, order="desc") == ["pay_list3", "pay_list2", "pay_list1"]
+            assert await listed(since=since, until=until, order="desc", limit=2) == ["pay_list3", "pay_list2"]
+            assert await listed(since=_at(4, day), until=_at(0, "2023-06-07"), limit=1) == ["pay_list4"]
+
+            assert (await client.get("/api/v2/pending-payments", params={"since": "yesterday"})).status_code == 400
+            assert (await client.get("/api/v2/pending-payments", params={"limit": 0})).status_code == 422
+            assert (await client.get("/api/v2/pending-payments", params={"order": "sideways"})).status_code == 422
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+트래픽 캡처/재생 왕복 테스트 (오프라인)
+
+TrafficCapture로 기록한 JSONL을 재생 도구의 load_capture/_rewrite/_request_args로 다시 읽어
+헤더와 본문(JSON 객체, JSON 문자열, JSON이 아닌 텍스트)이 캡처한 요청과 같게 재생되는지 확인합니다.
+
+실행:
+    python -m pytest test_traffic_capture.py
+"""
+import asyncio
+import json
+import os
+import sys
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from services.traffic_capture import TrafficCapture
+from tools.replay_traffic import load_capture, _rewrite, _request_args
+
+
+def _capture(tmp_path, requests) -> list:
+    capture = TrafficCapture(enabled=True, path=str(tmp_path / "traffic.jsonl"), max_body=1024)
+    for i, (method, path, body, headers) in enumerate(requests):
+        capture.record(1000.0 + i, method, path, "", body, 200, 0.01, headers)
+    asyncio.run(capture.flush())
+    return load_capture(capture.path)
+
+
+def test_capture_round_trip_keeps_headers_and_bodies(tmp_path):
+    payment = {"tx_id": "tx_1", "order_id": 1, "callback_url": "https://shop.example.com/webhook"}
+    entries = _capture(tmp_path, [
+        ("POST", "/api/v2/payments", json.dumps(payment).encode(), {"content-type": "application/json", "x-other": "1"}),
+        ("POST", "/api/v2/confirm-payment", b'"pay_tx_1"', {"content-type": "application/json"}),
+        ("POST", "/api/v2/confirm-payment", b"not json", {"content-type": "text/plain"}),
+        ("GET", "/api/v2/pending-payments", b"", {"accept-encoding": "gzip", "if-none-match": '"3-abc"'}),
+    ])
+    assert [entry["ts"] for entry in entries] == [1000.0, 1001.0, 1002.0, 1003.0]
+
+    # JSON 객체: id_suffix/callback_url 치환 후 JSON으로 전송, 허용 목록 밖의 헤더는 기록하지 않음
+    path, body = _rewrite(entries[0], "_r1", "http://127.0.0.1:9100/webhook")
+    assert path == "/api/v2/payments"
+    assert body == {**payment, "tx_id": "tx_1_r1", "callback_url": "http://127.0.0.1:9100/webhook"}
+    url, kwargs = _request_args(entries[0], "_r1", "http://127.0.0.1:9100/webhook")
+    assert kwargs == {"headers": {"content-type": "application/json"}, "json": body}
+
+    # JSON 문자열 본문은 따옴표까지 JSON으로 다시 인코딩
+    url, kwargs = _request_args(entries[1], "", None)
+    assert kwargs["json"] == "pay_tx_1" and "content" not in kwargs
+
+    # JSON이 아닌 본문은 원문 그대로
+    url, kwargs = _request_args(entries[2], "", None)
+    assert kwargs["content"] == b"not json" and "json" not in kwargs
+    assert kwargs["headers"] == {"content-type": "text/plain"}
+
+    # 본문 없는 조회는 조건부/압축 헤더만 재생
+    url, kwargs = _request_args(entries[3], "", None)
+    assert url == "/api/v2/pending-payments"
+    assert kwargs == {"headers": {"accept-encoding": "gzip", "if-none-match": '"3-abc"'}}
+
+
+def test_oversized_bodies_are_skipped_on_replay(tmp_path):
+    entries = _capture(tmp_path, [
+        ("POST", "/api/v2/payments", b"x" * 2048, {}),
+        ("GET", "/api/v2/pending-payments", b"", {}),
+    ])
+    assert [entry["path"] for entry in entries] == ["/api/v2/pending-payments"]
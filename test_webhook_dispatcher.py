@@ -0,0 +1,122 @@
+"""
+웹훅 전송 스케줄러(WebhookDispatcher) 테스트 (오프라인)
+
+응답이 느린 호스트와 빠른 호스트를 장애 주입 수신 앱(FaultReceiver/FaultTransport)으로 띄우고
+- 느린 호스트가 밀려 있어도 빠른 호스트의 큐 대기 시간이 짧게 유지되는지
+- 동시 전송 수가 호스트별 상한(WEBHOOK_HOST_CONCURRENCY)과 전역 상한(WEBHOOK_GLOBAL_CONCURRENCY)을 넘지 않는지
+- 호스트 가중치만큼 전송 기회가 배분되는지 (Deficit Round Robin)
+를 확인합니다.
+
+실행:
+    python -m pytest test_webhook_dispatcher.py
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from services.webhook_client import WebhookClient
+from services.webhook_delivery import WebhookDispatcher
+from tools.webhook_fault_receiver import FaultProfile, FaultReceiver, FaultTransport
+
+
+class _HostTransport(httpx.AsyncBaseTransport):
+    """호스트별 FaultTransport로 나눠 보내며 호스트별/전체 동시 전송 수와 시작 순서를 기록"""
+
+    def __init__(self, profiles: Dict[str, FaultProfile]):
+        self.receivers = {host: FaultReceiver(profile) for host, profile in profiles.items()}
+        self.transports = {
+            host: FaultTransport(receiver, receiver.profile, timeout=5.0) for host, receiver in self.receivers.items()
+        }
+        self.inflight = {host: 0 for host in profiles}
+        self.max_inflight = {host: 0 for host in profiles}
+        self.max_total = 0
+        self.started: List[str] = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.started.append(host)
+        self.inflight[host] += 1
+        self.max_inflight[host] = max(self.max_inflight[host], self.inflight[host])
+        self.max_total = max(self.max_total, sum(self.inflight.values()))
+        try:
+            return await self.transports[host].handle_async_request(request)
+        finally:
+            self.inflight[host] -= 1
+
+
+def _payload(tx_id: str) -> dict:
+    return {"tx_id": tx_id, "payment_id": f"pay_{tx_id}", "status": "PAYMENT_COMPLETED"}
+
+
+def test_slow_host_does_not_delay_fast_host_and_limits_hold():
+    async def main():
+        transport = _HostTransport({
+            "slow.local": FaultProfile("slow", latency=("fixed", 0.2)),
+            "fast.local": FaultProfile("fast", latency=("fixed", 0.002)),
+        })
+        client = WebhookClient(timeout=5.0, transport=transport, keepalive_interval=0)
+        dispatcher = WebhookDispatcher(global_limit=4, host_limit=2, client=client)
+        finished: Dict[str, List[float]] = {"slow.local": [], "fast.local": []}
+        started = time.monotonic()
+
+        async def deliver(host: str, i: int) -> None:
+            await dispatcher.deliver(f"http://{host}/webhook", _payload(f"{host}_{i}"))
+            finished[host].append(time.monotonic() - started)
+
+        try:
+            # 느린 호스트 작업이 먼저 밀려 있어도 빠른 호스트는 자기 몫의 슬롯으로 계속 전송
+            await asyncio.gather(
+                *(deliver("slow.local", i) for i in range(8)),
+                *(deliver("fast.local", i) for i in range(20)),
+            )
+        finally:
+            await dispatcher.stop()
+            await client.stop()
+
+        assert transport.max_inflight == {"slow.local": 2, "fast.local": 2}
+        assert transport.max_total <= 4
+        # 빠른 호스트는 느린 호스트의 첫 응답(0.2초)보다 먼저 모두 끝남
+        assert max(finished["fast.local"]) < min(finished["slow.local"])
+
+        hosts = dispatcher.metrics()["hosts"]
+        assert hosts["fast.local"]["delivered"] == 20 and hosts["slow.local"]["delivered"] == 8
+        assert hosts["fast.local"]["wait_ms"]["max"] < 150
+        # 느린 호스트는 자기 상한 때문에 응답 3번(0.6초) 이상 기다린 작업이 있음
+        assert hosts["slow.local"]["wait_ms"]["max"] >= 550
+    asyncio.run(main())
+
+
+def test_weights_share_the_global_limit():
+    async def main():
+        profile = FaultProfile("fast", latency=("fixed", 0.001))
+        transport = _HostTransport({"heavy.local": profile, "light.local": profile})
+        client = WebhookClient(timeout=5.0, transport=transport, keepalive_interval=0)
+        # 전역 상한 1: 한 번에 한 건만 보내므로 시작 순서가 곧 배분 비율
+        dispatcher = WebhookDispatcher(
+            global_limit=1, host_limit=2, weights={"heavy.local": 3.0, "light.local": 1.0}, client=client,
+        )
+        try:
+            await asyncio.gather(*(
+                dispatcher.deliver(f"http://{host}/webhook", _payload(f"{host}_{i}"))
+                for i in range(12) for host in ("heavy.local", "light.local")
+            ))
+        finally:
+            await dispatcher.stop()
+            await client.stop()
+
+        # 둘 다 밀려 있는 동안은 가중치 3:1로 시작 (전역 상한에 끊겨도 남은 deficit으로 이어서 전송)
+        assert transport.max_total == 1
+        assert transport.started[:8].count("heavy.local") == 6
+        assert transport.started[:8].count("light.local") == 2
+        assert transport.started.count("heavy.local") == transport.started.count("light.local") == 12
+    asyncio.run(main())
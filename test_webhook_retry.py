@@ -1,72 +1,212 @@
 """
-웹훅 재시도 로직 테스트 스크립트
+웹훅 재시도 로직 테스트 스크립트 (오프라인)
+
+tools/webhook_fault_receiver.py의 장애 주입 수신 앱을 프로세스 안에서 붙여 post_webhook을 실행하고,
+장애 프로파일별로 전송 성공률, 전송 1건당 총 소요 시간(재시도 대기 포함), 시도 횟수,
+CPU 시간/메모리 사용량을 측정합니다. 네트워크(외부 서비스, DNS)를 사용하지 않습니다.
+
+실행:
+    python -m pytest test_webhook_retry.py                        # 짧은 대기 시간으로 기대 동작만 확인
+    python test_webhook_retry.py                                  # 현재 설정값으로 전체 프로파일
+    python test_webhook_retry.py --profiles flaky,timeouts --deliveries 500
+    python test_webhook_retry.py --grid 1:0.1,3:0.1,3:0.5,5:0.2   # max_retries:retry_delay 조합 비교
 """
+import argparse
 import asyncio
 import logging
-import sys
 import os
+import statistics
+import sys
+import time
+import tracemalloc
 
 # 프로젝트 루트를 Python 경로에 추가
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.payment_utils import post_webhook
+# 서명 검증까지 확인하기 위해 테스트용 키 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from config.settings import WEBHOOK_MAX_RETRIES, WEBHOOK_RETRY_DELAY, WEBHOOK_SECRET, WEBHOOK_SECRET_ID
+from services.webhook_attempts import webhook_attempts
+from services.webhook_client import WebhookClient
+from tools.webhook_fault_receiver import FAULT_PROFILES, FaultReceiver, FaultTransport
+from utils.payment_utils import post_webhook, WebhookRejected
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("test_webhook_retry")
 
-async def test_webhook_retry():
-    """웹훅 재시도 로직 테스트"""
-    
-    # 테스트용 페이로드
-    test_payload = {
+RECEIVER_URL = "http://fault-receiver.local/api/orders/payment/webhook/v2"
+
+
+def _payload(run: str, i: int) -> dict:
+    return {
         "version": "v2",
-        "payment_id": "pay_test_123",
-        "order_id": 12345,
-        "tx_id": "test_123",
+        "payment_id": f"pay_{run}_{i}",
+        "order_id": i,
+        "tx_id": f"{run}_{i}",
         "user_id": 1,
         "amount": 10000,
         "status": "PAYMENT_COMPLETED",
         "created_at": "2024-01-01T00:00:00Z",
-        "confirmed_at": "2024-01-01T00:00:00Z",
+        "confirmed_at": "2024-01-01T00:00:02Z",
     }
-    
-    # 테스트 케이스들
-    test_cases = [
-        {
-            "name": "정상 URL (200 응답)",
-            "url": "https://httpbin.org/status/200",
-            "should_succeed": True
-        },
-        {
-            "name": "서버 에러 (500 응답) - 재시도 후 실패",
-            "url": "https://httpbin.org/status/500",
-            "should_succeed": False
-        },
-        {
-            "name": "클라이언트 에러 (400 응답) - 재시도 안함",
-            "url": "https://httpbin.org/status/400",
-            "should_succeed": False
-        },
-        {
-            "name": "존재하지 않는 URL - 연결 실패 재시도",
-            "url": "https://nonexistent-domain-12345.com/webhook",
-            "should_succeed": False
-        }
-    ]
-    
-    for test_case in test_cases:
-        print(f"\n=== {test_case['name']} ===")
-        try:
-            await post_webhook(test_case['url'], test_payload)
-            print(f"✅ 성공: {test_case['url']}")
-        except Exception as e:
-            print(f"❌ 실패: {test_case['url']} - {str(e)}")
-        
-        # 테스트 간 잠시 대기
-        await asyncio.sleep(1)
 
-if __name__ == "__main__":
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def run_profile(
+    profile_name: str,
+    deliveries: int,
+    concurrency: int,
+    max_retries: int,
+    retry_delay: float,
+    timeout: float,
+    receiver_secret: str = WEBHOOK_SECRET,
+) -> dict:
+    """프로파일 1개에 대해 deliveries건 전송 후 측정 결과 반환"""
+    profile = FAULT_PROFILES[profile_name]
+    receiver = FaultReceiver(profile, secrets={WEBHOOK_SECRET_ID: receiver_secret})
+    transport = FaultTransport(receiver, profile, timeout=timeout)
+    client = WebhookClient(timeout=timeout, transport=transport, keepalive_interval=0)
+    run = f"{profile_name}_{max_retries}_{retry_delay}_{time.monotonic_ns()}"
+    semaphore = asyncio.Semaphore(concurrency)
+    durations, outcomes = [], {}
+
+    async def deliver(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await post_webhook(RECEIVER_URL, _payload(run, i), max_retries=max_retries,
+                                   retry_delay=retry_delay, client=client)
+                outcome = "delivered"
+            except WebhookRejected:
+                outcome = "rejected"
+            except Exception as e:
+                outcome = type(e).__name__
+            durations.append(time.perf_counter() - started)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    tracemalloc.start()
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(deliver(i) for i in range(deliveries)))
+    wall, cpu = time.perf_counter() - wall_started, time.process_time() - cpu_started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await client.stop()
+
+    attempts = [len(webhook_attempts.payment_history(f"pay_{run}_{i}")) for i in range(deliveries)]
+    return {
+        "profile": profile_name,
+        "max_retries": max_retries,
+        "retry_delay": retry_delay,
+        "deliveries": deliveries,
+        "delivered": outcomes.get("delivered", 0),
+        "outcomes": outcomes,
+        "attempts_avg": statistics.mean(attempts),
+        "attempts_max": max(attempts),
+        "duration_p50": _percentile(durations, 0.50),
+        "duration_p95": _percentile(durations, 0.95),
+        "duration_max": max(durations),
+        "wall": wall,
+        "cpu": cpu,
+        "peak_kb": peak / 1024,
+        "receiver": dict(receiver.stats),
+        "faults": dict(transport.faults),
+        "duplicates": sum(1 for count in receiver.deliveries.values() if count > 1),
+    }
+
+
+def _check(result: dict) -> list:
+    """프로파일별 기대 동작 확인, 어긋난 항목 목록 반환"""
+    problems = []
+    name, n, retries = result["profile"], result["deliveries"], result["max_retries"]
+    if name == "healthy" and (result["delivered"] != n or result["attempts_max"] != 1):
+        problems.append("healthy: 모든 웹훅이 1회에 전송되어야 합니다")
+    if name == "rejecting" and (result["delivered"] != 0 or result["attempts_max"] != 1):
+        problems.append("rejecting: 4xx는 재시도 없이 1회만 시도해야 합니다")
+    if name == "down" and (result["delivered"] != 0 or result["attempts_max"] != retries + 1):
+        problems.append(f"down: 연결 실패는 {retries + 1}회 시도 후 실패해야 합니다")
+    if name == "bad_signature" and (result["receiver"]["bad_signature"] != n or result["attempts_max"] != 1):
+        problems.append("bad_signature: 서명 불일치(401)는 재시도 없이 실패해야 합니다")
+    if result["duplicates"]:
+        problems.append(f"{name}: 중복 수신 {result['duplicates']}건")
+    return problems
+
+
+def _print_result(result: dict) -> None:
+    print(
+        f"{result['profile']:<14}{result['max_retries']:>3} x {result['retry_delay']:<6g}"
+        f"{result['delivered'] / result['deliveries']:>8.1%}"
+        f"{result['attempts_avg']:>7.2f}{result['attempts_max']:>4}"
+        f"{result['duration_p50'] * 1000:>10.1f}{result['duration_p95'] * 1000:>10.1f}{result['duration_max'] * 1000:>10.1f}"
+        f"{result['wall']:>8.2f}{result['cpu']:>8.2f}{result['peak_kb']:>9.0f}"
+        f"  {result['outcomes']}"
+    )
+
+
+async def run_webhook_retry_tests(
+    profiles: list | None = None,
+    grid: list | None = None,
+    deliveries: int = 100,
+    concurrency: int = 50,
+    timeout: float = 1.0,
+) -> list:
+    """프로파일 x (max_retries, retry_delay) 조합별 측정, 기대 동작과 어긋난 항목 반환"""
+    profiles = profiles or [*FAULT_PROFILES, "bad_signature"]
+    grid = grid or [(WEBHOOK_MAX_RETRIES, WEBHOOK_RETRY_DELAY)]
+    print(f"{'profile':<14}{'retry':>12}{'success':>8}{'att':>7}{'max':>4}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'wall s':>8}{'cpu s':>8}{'peak KB':>9}  outcomes")
+    problems = []
+    for max_retries, retry_delay in grid:
+        for name in profiles:
+            if name == "bad_signature":
+                # 수신 측이 다른 키로 검증하는 경우 (키 교체 누락)
+                result = await run_profile("healthy", deliveries, concurrency, max_retries, retry_delay, timeout,
+                                           receiver_secret="rotated_" + WEBHOOK_SECRET)
+                result["profile"] = "bad_signature"
+            else:
+                result = await run_profile(name, deliveries, concurrency, max_retries, retry_delay, timeout)
+            _print_result(result)
+            problems += _check(result)
+    return problems
+
+
+def test_webhook_retry():
+    """웹훅 재시도 로직 테스트 (pytest용 - 짧은 대기 시간으로 전체 프로파일 확인)"""
+    problems = asyncio.run(run_webhook_retry_tests(grid=[(2, 0.01)], deliveries=20, concurrency=20, timeout=0.05))
+    assert not problems, problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="웹훅 재시도 오프라인 테스트/벤치마크")
+    parser.add_argument("--profiles", default="", help=f"프로파일 (쉼표 구분): {', '.join(FAULT_PROFILES)}, bad_signature")
+    parser.add_argument("--grid", default="", help="max_retries:retry_delay 조합 (쉼표 구분, 기본: 현재 설정값)")
+    parser.add_argument("--deliveries", type=int, default=100, help="프로파일당 전송 건수")
+    parser.add_argument("--concurrency", type=int, default=50, help="동시 전송 수")
+    parser.add_argument("--timeout", type=float, default=1.0, help="요청 타임아웃(초) - timeout 장애 시 실제 대기 시간")
+    parser.add_argument("--verbose", action="store_true", help="post_webhook 로그 출력")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    profiles = [name.strip() for name in args.profiles.split(",") if name.strip()] or None
+    grid = [
+        (int(item.split(":")[0]), float(item.split(":")[1]))
+        for item in args.grid.split(",") if item.strip()
+    ] or None
+
     print("웹훅 재시도 로직 테스트 시작...")
-    asyncio.run(test_webhook_retry())
-    print("\n테스트 완료!")
+    problems = asyncio.run(run_webhook_retry_tests(profiles, grid, args.deliveries, args.concurrency, args.timeout))
+    if problems:
+        print("\n기대 동작과 다른 항목:")
+        for problem in problems:
+            print(f"  ❌ {problem}")
+        sys.exit(1)
+    print("\n테스트 완료! ✅")
+
+
+if __name__ == "__main__":
+    main()
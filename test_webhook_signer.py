@@ -0,0 +1,104 @@
+"""
+웹훅 서명기(WebhookSigner) 키 교체 테스트 (오프라인)
+
+키 파일에 next 키를 추가하고 current로 올리는 교체 절차를 따라가며 단계마다 서명 헤더를 확인하고,
+mtime이 바뀐 경우에만 다시 읽는지, 서명이 hmac.new로 새로 계산한 값과 같은지 확인합니다.
+
+실행:
+    python -m pytest test_webhook_signer.py
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+
+import pytest
+
+# 프로젝트 루트를 Python 경로에 추가
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 같은 pytest 실행의 다른 테스트와 같은 키로 설정 모듈을 불러오도록 지정 (설정 모듈 로드 전)
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test_webhook_secret")
+
+from utils.webhook_signer import WebhookSigner
+
+BODY = json.dumps({"tx_id": "sig1", "status": "PAYMENT_COMPLETED"}, separators=(",", ":")).encode("utf-8")
+
+
+def _expected(secret: str, body: bytes = BODY) -> str:
+    return base64.b64encode(hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()).decode("ascii")
+
+
+def _write(path, data, mtime: float) -> None:
+    path.write_text(json.dumps(data), encoding="utf-8")
+    # 파일 시스템 mtime 해상도와 무관하게 변경 여부를 정하도록 직접 지정
+    os.utime(path, (mtime, mtime))
+
+
+def test_rotation_through_secrets_file(tmp_path):
+    path = tmp_path / "webhook_secrets.json"
+    _write(path, {"current": {"kid": "v1", "secret": "old-secret"}}, mtime=1000)
+    signer = WebhookSigner(secrets_file=str(path), reload_interval=0)
+
+    assert signer.key_ids == ["v1"]
+    assert signer.headers(BODY) == {
+        "X-Payment-Signature": _expected("old-secret"),
+        "X-Payment-Signatures": f"v1={_expected('old-secret')}",
+    }
+
+    # 1단계: next 추가 -> 두 키 서명을 모두 보내고 기존 헤더는 그대로 현재 키
+    rotating = {"current": {"kid": "v1", "secret": "old-secret"}, "next": {"kid": "v2", "secret": "new=secret"}}
+    _write(path, rotating, 1001)
+    headers = signer.headers(BODY)
+    assert signer.key_ids == ["v1", "v2"]
+    assert headers["X-Payment-Signature"] == _expected("old-secret")
+    assert headers["X-Payment-Signatures"] == f"v1={_expected('old-secret')}, v2={_expected('new=secret')}"
+    # 수신 측은 첫 '='까지를 kid로 나눔 (Base64 서명의 '='와 무관)
+    parsed = dict(item.strip().split("=", 1) for item in headers["X-Payment-Signatures"].split(","))
+    assert parsed == {"v1": _expected("old-secret"), "v2": _expected("new=secret")}
+
+    # mtime이 같으면 내용이 바뀌어도 다시 읽지 않음
+    _write(path, {"current": {"kid": "v9", "secret": "ignored"}}, 1001)
+    assert signer.key_ids == ["v1", "v2"] and signer.reload() is False
+
+    # 2단계: next를 current로 올리고 next 제거
+    _write(path, {"current": {"kid": "v2", "secret": "new=secret"}}, 1002)
+    assert signer.headers(BODY) == {
+        "X-Payment-Signature": _expected("new=secret"),
+        "X-Payment-Signatures": f"v2={_expected('new=secret')}",
+    }
+    assert signer.signature(b"other") == _expected("new=secret", b"other")
+
+    # 잘못된 파일(current 없이 next만)은 오류 로그 후 기존 키 유지
+    _write(path, {"current": {"kid": "v3", "secret": ""}, "next": {"kid": "v4", "secret": "x"}}, 1003)
+    assert signer.reload() is False
+    assert signer.key_ids == ["v2"]
+    _write(path, "not a dict", 1004)
+    assert signer.reload() is False and signer.key_ids == ["v2"]
+
+
+def test_reload_interval_limits_mtime_checks(tmp_path):
+    path = tmp_path / "webhook_secrets.json"
+    _write(path, {"current": {"kid": "v1", "secret": "first"}}, mtime=2000)
+    signer = WebhookSigner(secrets_file=str(path), reload_interval=3600)
+    assert signer.signature(BODY) == _expected("first")
+
+    # 확인 주기 전에는 파일이 바뀌어도 기존 키로 서명, reload()를 직접 호출하면 바로 반영
+    _write(path, {"current": {"kid": "v2", "secret": "second"}}, 2001)
+    assert signer.signature(BODY) == _expected("first")
+    assert signer.reload() is True
+    assert signer.signature(BODY) == _expected("second")
+
+
+def test_environment_keys_require_current_secret():
+    signer = WebhookSigner(secret="env-secret", secret_id="v1", next_secret="env-next", next_secret_id="v2",
+                           secrets_file="")
+    signatures = signer.headers(BODY)["X-Payment-Signatures"]
+    assert signatures == f"v1={_expected('env-secret')}, v2={_expected('env-next')}"
+
+    with pytest.raises(ValueError):
+        WebhookSigner(secret="", next_secret="env-next", secrets_file="")
+    with pytest.raises(RuntimeError):
+        WebhookSigner(secret="", next_secret="", secrets_file="").signature(BODY)
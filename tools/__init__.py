@@ -0,0 +1 @@
+# tools 패키지
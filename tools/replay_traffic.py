@@ -0,0 +1,226 @@
+"""
+트래픽 재생 도구
+TRAFFIC_CAPTURE로 기록한 JSONL(기본 captures/traffic.jsonl)을 로컬 서버에 다시 보내고,
+엔드포인트별 지연 시간/에러 비율을 캡처 당시 값과 비교합니다.
+
+캡처의 latency_ms는 서버 안에서 잰 처리 시간이고 재생 지연은 클라이언트에서 잰 값(연결/전송 포함)이므로,
+절대값보다 같은 재생 조건에서 변경 전후 결과를 비교하는 데 사용하세요.
+
+요청 간격(inter-arrival)은 캡처의 ts 차이를 --speed로 나눈 값으로 유지합니다.
+    --speed 1    캡처와 같은 속도
+    --speed 10   10배 빠르게 (간격 1/10)
+    --speed max  간격 없이 최대 속도 (--concurrency로 동시 요청 수 제한)
+
+실행:
+    python -m tools.replay_traffic captures/traffic.jsonl --base-url http://localhost:9002 --speed 1
+    python -m tools.replay_traffic captures/traffic.jsonl --speed max --concurrency 200 --id-suffix _r1 \\
+        --callback-url http://127.0.0.1:9100/webhook      # tools.webhook_fault_receiver로 웹훅 수신
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+
+def load_capture(path: str, prefixes: List[str] | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+    """캡처 파일 읽기 (ts 오름차순, 본문이 너무 커서 기록되지 않은 요청은 제외)"""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "body_bytes" in entry or (prefixes and not entry["path"].startswith(tuple(prefixes))):
+                continue
+            entries.append(entry)
+    entries.sort(key=lambda entry: entry["ts"])
+    return entries[:limit] if limit else entries
+
+
+def endpoint_of(entry: Dict[str, Any]) -> str:
+    """집계용 엔드포인트 이름 (결제 ID 경로 구간은 {payment_id}로 묶음)"""
+    parts = ["{payment_id}" if part.startswith("pay_") else part for part in entry["path"].split("/")]
+    return f"{entry['method']} {'/'.join(parts)}"
+
+
+def _rewrite(entry: Dict[str, Any], id_suffix: str, callback_url: str | None) -> tuple:
+    """재생할 경로/본문 (id_suffix로 tx_id/payment_id를 바꿔 이전 재생·캡처 데이터와 겹치지 않게 함)"""
+    path, body = entry["path"], entry.get("body")
+    if id_suffix:
+        path = "/".join(part + id_suffix if part.startswith("pay_") else part for part in path.split("/"))
+    if isinstance(body, dict):
+        body = dict(body)
+        for field in ("tx_id", "payment_id"):
+            if id_suffix and isinstance(body.get(field), str):
+                body[field] += id_suffix
+        if callback_url and "callback_url" in body:
+            body["callback_url"] = callback_url
+    return path, body
+
+
+def _request_args(entry: Dict[str, Any], id_suffix: str, callback_url: str | None) -> tuple[str, Dict[str, Any]]:
+    """재생 요청의 (URL, httpx 요청 인자) - 캡처한 헤더를 그대로 보내고 JSON 본문은 다시 JSON으로 인코딩"""
+    path, body = _rewrite(entry, id_suffix, callback_url)
+    url = f"{path}?{entry['query']}" if entry.get("query") else path
+    kwargs: Dict[str, Any] = {"headers": dict(entry.get("headers") or {})}
+    if "body_text" in entry:
+        kwargs["content"] = entry["body_text"].encode("utf-8")
+    elif body is not None:
+        kwargs["json"] = body
+    return url, kwargs
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def replay(
+    entries: List[Dict[str, Any]],
+    base_url: str,
+    speed: float | None,
+    concurrency: int = 1000,
+    timeout: float = 30.0,
+    id_suffix: str = "",
+    callback_url: str | None = None,
+) -> tuple[List[Dict[str, Any]], float]:
+    """
+    캡처 재생, (요청별 결과 목록, 전체 소요 시간) 반환
+
+    speed가 None이면 최대 속도. 각 요청은 (캡처 ts - 첫 ts) / speed 시점에 보내며,
+    실제 보낸 시점과의 차이(lag)를 함께 기록합니다 (동시 요청 상한에 걸리면 lag가 커짐).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, Any]] = []
+    first_ts = entries[0]["ts"] if entries else 0.0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+
+        async def send(entry: Dict[str, Any]) -> None:
+            due = (entry["ts"] - first_ts) / speed if speed else 0.0
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            url, kwargs = _request_args(entry, id_suffix, callback_url)
+            result = {
+                "endpoint": endpoint_of(entry),
+                "captured_status": entry["status"],
+                "captured_ms": entry["latency_ms"],
+                "status": None,
+                "error": None,
+            }
+            async with semaphore:
+                sent = time.perf_counter()
+                result["lag_ms"] = max(0.0, (sent - started - due) * 1000)
+                try:
+                    response = await client.request(entry["method"], url, **kwargs)
+                    result["status"] = response.status_code
+                except httpx.HTTPError as e:
+                    result["error"] = type(e).__name__
+                result["ms"] = (time.perf_counter() - sent) * 1000
+            results.append(result)
+
+        await asyncio.gather(*(send(entry) for entry in entries))
+        wall = time.perf_counter() - started
+    return results, wall
+
+
+def _failed(status: int | None) -> bool:
+    """에러로 보는 응답 (5xx 또는 연결 오류/타임아웃, 4xx는 상태 불일치로만 집계)"""
+    return status is None or status >= 500
+
+
+def summarize(entries: List[Dict[str, Any]], results: List[Dict[str, Any]], wall: float) -> Dict[str, Any]:
+    """엔드포인트별 캡처 대비 지연/에러 비교"""
+    by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_endpoint.setdefault(result["endpoint"], []).append(result)
+
+    endpoints = {}
+    for name, rows in sorted(by_endpoint.items()):
+        captured = [row["captured_ms"] for row in rows]
+        replayed = [row["ms"] for row in rows]
+        captured_errors = sum(_failed(row["captured_status"]) for row in rows) / len(rows)
+        replay_errors = sum(_failed(row["status"]) for row in rows) / len(rows)
+        endpoints[name] = {
+            "count": len(rows),
+            "captured_error_rate": captured_errors,
+            "replay_error_rate": replay_errors,
+            "error_rate_delta": replay_errors - captured_errors,
+            "status_mismatch": sum(row["status"] != row["captured_status"] for row in rows),
+            "captured_ms": {f"p{int(p * 100)}": _percentile(captured, p) for p in (0.5, 0.95, 0.99)},
+            "replay_ms": {f"p{int(p * 100)}": _percentile(replayed, p) for p in (0.5, 0.95, 0.99)},
+            "errors": sorted({row["error"] for row in rows if row["error"]}),
+        }
+
+    lags = [row["lag_ms"] for row in results]
+    captured_span = entries[-1]["ts"] - entries[0]["ts"] if entries else 0.0
+    return {
+        "requests": len(results),
+        "captured_span_s": captured_span,
+        "replay_wall_s": wall,
+        "replay_rps": len(results) / wall if wall else 0.0,
+        "lag_ms": {"p50": _percentile(lags, 0.5), "p99": _percentile(lags, 0.99), "max": max(lags, default=0.0)},
+        "endpoints": endpoints,
+    }
+
+
+def _print_summary(summary: Dict[str, Any], speed_label: str) -> None:
+    print(f"요청 {summary['requests']}건, 캡처 구간 {summary['captured_span_s']:.1f}s -> 재생 {summary['replay_wall_s']:.1f}s "
+          f"({speed_label}, {summary['replay_rps']:.1f} req/s), 전송 지연 lag p50 {summary['lag_ms']['p50']:.1f}ms "
+          f"p99 {summary['lag_ms']['p99']:.1f}ms max {summary['lag_ms']['max']:.1f}ms")
+    print(f"\n{'endpoint':<48}{'n':>7}{'err 캡처':>10}{'err 재생':>10}"
+          f"{'p50 캡처':>11}{'p50 재생':>11}{'p95 캡처':>11}{'p95 재생':>11}{'Δp95':>9}{'상태 불일치':>12}")
+    for name, row in summary["endpoints"].items():
+        captured, replayed = row["captured_ms"], row["replay_ms"]
+        delta = (replayed["p95"] / captured["p95"] - 1) if captured["p95"] else 0.0
+        print(f"{name:<48}{row['count']:>7}{row['captured_error_rate']:>10.1%}{row['replay_error_rate']:>10.1%}"
+              f"{captured['p50']:>11.1f}{replayed['p50']:>11.1f}{captured['p95']:>11.1f}{replayed['p95']:>11.1f}"
+              f"{delta:>+9.0%}{row['status_mismatch']:>12}")
+        if row["errors"]:
+            print(f"    연결 오류: {', '.join(row['errors'])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="캡처한 API 트래픽 재생")
+    parser.add_argument("capture", nargs="?", default="captures/traffic.jsonl", help="캡처 JSONL 파일")
+    parser.add_argument("--base-url", default="http://localhost:9002", help="재생 대상 서버")
+    parser.add_argument("--speed", default="1", help="재생 배속 (1, 10, ... 또는 max)")
+    parser.add_argument("--concurrency", type=int, default=1000, help="동시 요청 상한")
+    parser.add_argument("--timeout", type=float, default=30.0, help="요청 타임아웃(초)")
+    parser.add_argument("--paths", default="", help="재생할 경로 prefix (쉼표 구분, 기본 전체)")
+    parser.add_argument("--limit", type=int, default=None, help="앞에서부터 재생할 요청 수")
+    parser.add_argument("--id-suffix", default="", help="tx_id/payment_id 뒤에 붙일 문자열 (반복 재생 시 결제 중복 방지)")
+    parser.add_argument("--callback-url", default=None, help="결제 생성 요청의 callback_url 대체 (운영 서버로 웹훅이 가지 않도록)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    if speed is not None and speed <= 0:
+        parser.error("--speed는 0보다 커야 합니다 (최대 속도는 max)")
+    prefixes = [prefix.strip() for prefix in args.paths.split(",") if prefix.strip()]
+    entries = load_capture(args.capture, prefixes, args.limit)
+    if not entries:
+        print(f"재생할 요청이 없습니다: {args.capture}")
+        sys.exit(1)
+
+    results, wall = asyncio.run(replay(entries, args.base_url, speed, args.concurrency, args.timeout,
+                                       args.id_suffix, args.callback_url))
+    summary = summarize(entries, results, wall)
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    else:
+        _print_summary(summary, "max" if speed is None else f"{speed:g}x")
+
+
+if __name__ == "__main__":
+    main()
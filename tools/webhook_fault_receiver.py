@@ -0,0 +1,229 @@
+"""
+장애 주입 웹훅 수신 서버 (로컬 테스트/벤치마크용)
+
+운영 서버의 웹훅 수신 엔드포인트를 흉내 내는 ASGI 앱과, 연결 단계 장애(연결 거부/연결 끊김/타임아웃)를
+만들어 내는 httpx 트랜스포트를 제공합니다. 둘 다 네트워크 없이 프로세스 안에서 동작합니다.
+
+    profile = FAULT_PROFILES["flaky"]
+    receiver = FaultReceiver(profile, secrets={"v1": "secret"})
+    client = WebhookClient(transport=FaultTransport(receiver, profile, timeout=0.2))
+    await post_webhook("http://receiver.local/webhook", payload, client=client)
+
+실제 포트로 띄울 수도 있습니다 (응답 지연/상태 코드/서명 검증만 적용, 연결 장애는 트랜스포트에서만 가능):
+    python -m tools.webhook_fault_receiver --profile slow --port 9100 --secret v1:secret,v2:next_secret
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+from typing import Any, Dict, Tuple
+
+import httpx
+
+
+class FaultProfile:
+    """
+    장애 프로파일
+
+    latency: 응답 지연 분포 (초)
+        ("fixed", s) / ("uniform", lo, hi) / ("lognormal", median, sigma)
+    p_5xx, p_4xx: 상태 코드 비율 (나머지는 200)
+    p_refused: 연결 거부 (httpx.ConnectError)
+    p_reset: 요청 전송 후 연결 끊김 (httpx.ReadError)
+    p_timeout: 응답 없음 -> 클라이언트 타임아웃 (httpx.ReadTimeout)
+    """
+
+    __slots__ = ("name", "latency", "p_5xx", "p_4xx", "p_refused", "p_reset", "p_timeout")
+
+    def __init__(
+        self,
+        name: str,
+        latency: Tuple = ("fixed", 0.0),
+        p_5xx: float = 0.0,
+        p_4xx: float = 0.0,
+        p_refused: float = 0.0,
+        p_reset: float = 0.0,
+        p_timeout: float = 0.0,
+    ):
+        self.name = name
+        self.latency = latency
+        self.p_5xx = p_5xx
+        self.p_4xx = p_4xx
+        self.p_refused = p_refused
+        self.p_reset = p_reset
+        self.p_timeout = p_timeout
+
+    def sample_latency(self, rng: random.Random) -> float:
+        kind = self.latency[0]
+        if kind == "uniform":
+            return rng.uniform(self.latency[1], self.latency[2])
+        if kind == "lognormal":
+            median, sigma = self.latency[1], self.latency[2]
+            return rng.lognormvariate(0.0, sigma) * median
+        return self.latency[1]
+
+
+# 기본 장애 프로파일
+FAULT_PROFILES: Dict[str, FaultProfile] = {
+    profile.name: profile
+    for profile in (
+        FaultProfile("healthy", latency=("lognormal", 0.005, 0.3)),
+        FaultProfile("slow", latency=("lognormal", 0.2, 0.6)),
+        FaultProfile("flaky", latency=("lognormal", 0.01, 0.5), p_5xx=0.3),
+        FaultProfile("overloaded", latency=("uniform", 0.05, 0.3), p_5xx=0.6, p_timeout=0.1),
+        FaultProfile("resets", latency=("fixed", 0.005), p_reset=0.3, p_refused=0.1),
+        FaultProfile("timeouts", latency=("fixed", 0.005), p_timeout=0.3),
+        FaultProfile("rejecting", latency=("fixed", 0.005), p_4xx=1.0),
+        FaultProfile("down", p_refused=1.0),
+    )
+}
+
+
+class FaultReceiver:
+    """
+    웹훅 수신 ASGI 앱
+
+    - 프로파일에 따라 응답 지연 후 200/4xx/5xx 응답
+    - secrets가 주어지면 X-Payment-Signatures(없으면 X-Payment-Signature)를 검증해 실패 시 401
+    - 요청/결과별 건수와 tx_id별, X-Payment-Delivery-Id별 수신 횟수(중복 전송 확인용)를 기록
+    """
+
+    def __init__(self, profile: FaultProfile, secrets: Dict[str, str] | None = None, seed: int | None = 0):
+        self.profile = profile
+        self.secrets = secrets or {}
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "4xx": 0, "5xx": 0, "bad_signature": 0}
+        self.deliveries: Dict[str, int] = {}
+        self.delivery_ids: Dict[str, int] = {}
+
+    def _verify(self, body: bytes, headers: Dict[str, str]) -> bool:
+        if not self.secrets:
+            return True
+        expected = {
+            kid: base64.b64encode(hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()).decode("ascii")
+            for kid, secret in self.secrets.items()
+        }
+        signatures = headers.get("x-payment-signatures")
+        if signatures:
+            for item in signatures.split(","):
+                kid, _, signature = item.strip().partition("=")
+                if kid in expected and hmac.compare_digest(signature, expected[kid]):
+                    return True
+            return False
+        signature = headers.get("x-payment-signature", "")
+        return any(hmac.compare_digest(signature, value) for value in expected.values())
+
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        self.stats["requests"] += 1
+        delivery_id = headers.get("x-payment-delivery-id")
+        if delivery_id:
+            self.delivery_ids[delivery_id] = self.delivery_ids.get(delivery_id, 0) + 1
+
+        await asyncio.sleep(self.profile.sample_latency(self.rng))
+        roll = self.rng.random()
+        if scope["method"] != "POST":
+            status = 200
+        elif not self._verify(body, headers):
+            status = 401
+            self.stats["bad_signature"] += 1
+        elif roll < self.profile.p_5xx:
+            status = 503
+        elif roll < self.profile.p_5xx + self.profile.p_4xx:
+            status = 400
+        else:
+            status = 200
+
+        if status == 200:
+            self.stats["ok"] += 1
+            if scope["method"] == "POST":
+                try:
+                    tx_id = json.loads(body).get("tx_id")
+                except ValueError:
+                    tx_id = None
+                if tx_id is not None:
+                    self.deliveries[tx_id] = self.deliveries.get(tx_id, 0) + 1
+        elif status >= 500:
+            self.stats["5xx"] += 1
+        else:
+            self.stats["4xx"] += 1
+
+        response = json.dumps({"ok": status == 200}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(response)).encode())],
+        })
+        await send({"type": "http.response.body", "body": response})
+
+
+class FaultTransport(httpx.AsyncBaseTransport):
+    """
+    연결 단계 장애를 주입하는 httpx 트랜스포트 (정상 요청은 ASGI 수신 앱으로 전달)
+
+    timeout 장애는 timeout초를 실제로 기다린 뒤 ReadTimeout을 일으키므로
+    재시도 비용(대기 시간)이 측정 결과에 그대로 반영됩니다.
+    """
+
+    def __init__(self, app: FaultReceiver, profile: FaultProfile, timeout: float = 1.0, seed: int | None = 1):
+        self.app = app
+        self.profile = profile
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.faults: Dict[str, int] = {"refused": 0, "reset": 0, "timeout": 0}
+        self._asgi = httpx.ASGITransport(app=app)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        roll = self.rng.random()
+        profile = self.profile
+        if roll < profile.p_refused:
+            self.faults["refused"] += 1
+            raise httpx.ConnectError("[fault] connection refused", request=request)
+        roll -= profile.p_refused
+        if roll < profile.p_reset:
+            self.faults["reset"] += 1
+            await asyncio.sleep(profile.sample_latency(self.rng))
+            raise httpx.ReadError("[fault] connection reset by peer", request=request)
+        roll -= profile.p_reset
+        if roll < profile.p_timeout:
+            self.faults["timeout"] += 1
+            await asyncio.sleep(self.timeout)
+            raise httpx.ReadTimeout("[fault] read timed out", request=request)
+        return await self._asgi.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._asgi.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="장애 주입 웹훅 수신 서버")
+    parser.add_argument("--profile", default="healthy", choices=sorted(FAULT_PROFILES))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--secret", default="", help="서명 검증 키 (kid:secret 또는 secret, 쉼표 구분)")
+    args = parser.parse_args()
+
+    secrets = {}
+    for i, item in enumerate(value for value in args.secret.split(",") if value):
+        # base64 키는 끝에 '='가 붙을 수 있으므로 kid 구분자는 ':'만 인정
+        kid, sep, secret = item.partition(":")
+        secrets[kid if sep else f"key{i}"] = secret if sep else item
+
+    import uvicorn
+    uvicorn.run(FaultReceiver(FAULT_PROFILES[args.profile], secrets=secrets, seed=None),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Payment Server 응답 압축
+Accept-Encoding 협상과 gzip/zstd 압축(한 번에 / 스트리밍)을 제공합니다.
+zstd는 zstandard 패키지가 설치되어 있을 때만 사용하고, 없으면 gzip만 협상합니다.
+"""
+import asyncio
+import zlib
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List
+
+from config.settings import (
+    RESPONSE_COMPRESSION, RESPONSE_COMPRESSION_MIN_BYTES, RESPONSE_COMPRESSION_THREAD_BYTES,
+    RESPONSE_GZIP_LEVEL, RESPONSE_ZSTD_LEVEL,
+)
+
+try:
+    import zstandard
+except ImportError:  # 선택 의존성
+    zstandard = None
+
+# 서버가 선호하는 순서 (클라이언트 q값이 같으면 앞쪽 선택)
+SUPPORTED_ENCODINGS = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+# 스트리밍 압축 시 이 크기만큼 모아서 압축기에 넣음 (줄 단위 호출 오버헤드 감소)
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    return weights
+
+
+def negotiate_encoding(accept_encoding: str | None, enabled: bool = RESPONSE_COMPRESSION) -> str | None:
+    """Accept-Encoding에서 사용할 압축 방식 선택 (없거나 압축하지 않으면 None)"""
+    if not enabled or not accept_encoding:
+        return None
+    weights = _parse_accept_encoding(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def should_compress(size: int, min_bytes: int = RESPONSE_COMPRESSION_MIN_BYTES) -> bool:
+    return size >= min_bytes
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """본문 전체 압축"""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=RESPONSE_ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        compressor = zlib.compressobj(RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+    raise ValueError(f"지원하지 않는 압축 방식입니다: {encoding}")
+
+
+async def compress_async(body: bytes, encoding: str, thread_min_bytes: int = RESPONSE_COMPRESSION_THREAD_BYTES) -> bytes:
+    """본문 전체 압축 (thread_min_bytes 이상이면 스레드에서 - 큰 응답 압축 중에도 다른 요청 처리)"""
+    if len(body) >= thread_min_bytes:
+        return await asyncio.to_thread(compress, body, encoding)
+    return compress(body, encoding)
+
+
+def _stream_compressor(encoding: str):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=RESPONSE_ZSTD_LEVEL).compressobj()
+    if encoding == "gzip":
+        return zlib.compressobj(RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+    raise ValueError(f"지원하지 않는 압축 방식입니다: {encoding}")
+
+
+class StreamCompressor:
+    """
+    스트리밍 압축기 (전체 본문을 메모리에 모으지 않음)
+    입력을 STREAM_CHUNK_BYTES 단위로 모아 압축기에 넣고, 압축기가 내놓은 출력만 돌려줍니다.
+    """
+
+    def __init__(self, encoding: str):
+        self._compressor = _stream_compressor(encoding)
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+
+    def feed(self, chunk: bytes) -> bytes:
+        self._pending.append(chunk)
+        self._pending_size += len(chunk)
+        if self._pending_size < STREAM_CHUNK_BYTES:
+            return b""
+        out = self._compressor.compress(b"".join(self._pending))
+        self._pending, self._pending_size = [], 0
+        return out
+
+    def finish(self) -> bytes:
+        return self._compressor.compress(b"".join(self._pending)) + self._compressor.flush()
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """스트리밍 압축 (동기 이터러블)"""
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        if out := compressor.feed(chunk):
+            yield out
+    if out := compressor.finish():
+        yield out
+
+
+async def compress_async_stream(chunks: AsyncIterable[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """스트리밍 압축 (비동기 이터러블, 압축은 64KB 단위라 이벤트 루프를 오래 막지 않음)"""
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        if out := compressor.feed(chunk):
+            yield out
+    if out := compressor.finish():
+        yield out
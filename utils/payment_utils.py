@@ -2,35 +2,61 @@
 Payment Server 유틸리티 함수들
 공통으로 사용되는 헬퍼 함수들을 정의합니다.
 """
-import hmac
-import hashlib
-import base64
 import json
 import logging
 import asyncio
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any
 import httpx
 
-from config.settings import WEBHOOK_SECRET, SERVICE_AUTH_TOKEN, WEBHOOK_MAX_RETRIES, WEBHOOK_RETRY_DELAY, WEBHOOK_TIMEOUT
+from config.settings import SERVICE_AUTH_TOKEN, WEBHOOK_MAX_RETRIES, WEBHOOK_RETRY_DELAY
+from services.webhook_client import WebhookClient, webhook_client
+from services.webhook_attempts import webhook_attempts
+from utils.webhook_signer import webhook_signer
 
 log = logging.getLogger("payment_utils")
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 def now_iso() -> str:
     """UTC ISO8601 형식의 현재 시간 반환 (Z suffix)"""
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def iso_to_epoch_ns(value: str) -> int:
+    """ISO8601 문자열을 UTC epoch 나노초로 변환 (timezone 없으면 UTC로 간주)"""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1) * 1_000
+
+
+def epoch_ns_to_iso(value: int) -> str:
+    """UTC epoch 나노초를 ISO8601 문자열로 변환 (Z suffix)"""
+    dt = _EPOCH + timedelta(microseconds=value // 1_000)
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+class WebhookRejected(Exception):
+    """수신 서버가 4xx로 거절한 웹훅 (재시도하지 않음)"""
+
+
 def sign_webhook(body: bytes) -> str:
-    """웹훅 서명 생성 (HMAC-SHA256 Base64)"""
-    if not WEBHOOK_SECRET:
-        raise RuntimeError("PAYMENT_WEBHOOK_SECRET(.env)이 설정되어야 합니다.")
-    mac = hmac.new(WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).digest()
-    return base64.b64encode(mac).decode("ascii")
+    """웹훅 서명 생성 (HMAC-SHA256 Base64, 현재 키)"""
+    return webhook_signer.signature(body)
 
 
-async def post_webhook(url: str, payload: Dict[str, Any], event: str = "payment.completed") -> None:
+async def post_webhook(
+    url: str,
+    payload: Dict[str, Any],
+    event: str = "payment.completed",
+    max_retries: int | None = None,
+    retry_delay: float | None = None,
+    client: WebhookClient | None = None,
+    delivery_id: str | None = None,
+) -> None:
     """
     웹훅 전송 (재시도 로직 포함)
     
@@ -38,87 +64,118 @@ async def post_webhook(url: str, payload: Dict[str, Any], event: str = "payment.
         url: 웹훅 수신 URL
         payload: 전송할 데이터
         event: 이벤트 타입 (기본값: payment.completed)
+        max_retries: 재시도 횟수 (기본값: WEBHOOK_MAX_RETRIES)
+        retry_delay: 재시도 기본 대기(초), 지수 백오프 (기본값: WEBHOOK_RETRY_DELAY)
+        client: 웹훅 HTTP 클라이언트 (기본값: 전역 webhook_client)
+        delivery_id: 전송 건 식별자 (X-Payment-Delivery-Id, 재시도·재시작 후 재전송에도 같은 값 - 수신 측 중복 제거용)
     
     Raises:
+        WebhookRejected: 4xx 응답 (재시도 안 함)
         Exception: 모든 재시도 실패 시
     """
+    max_retries = WEBHOOK_MAX_RETRIES if max_retries is None else max_retries
+    retry_delay = WEBHOOK_RETRY_DELAY if retry_delay is None else retry_delay
+    client = client or webhook_client
     raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
     headers = {
         "Content-Type": "application/json",
         "X-Payment-Event": event,                     # <- payment_router 기대값
-        "X-Payment-Signature": sign_webhook(raw),     # <- payment_router 기대값
+        # X-Payment-Signature(현재 키, payment_router 기대값) + X-Payment-Signatures(키 교체 중 다중 서명)
+        **webhook_signer.headers(raw),
     }
     if SERVICE_AUTH_TOKEN:
         headers["Authorization"] = f"Bearer {SERVICE_AUTH_TOKEN}"
+    if delivery_id:
+        headers["X-Payment-Delivery-Id"] = delivery_id
 
+    log_fields = {"payment_id": payload.get("payment_id"), "tx_id": payload.get("tx_id"), "url": url}
     last_exception = None
     
-    for attempt in range(WEBHOOK_MAX_RETRIES + 1):  # 0부터 시작하므로 +1
+    for attempt in range(max_retries + 1):  # 0부터 시작하므로 +1
         try:
-            async with httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT) as client:
+            started = time.perf_counter()
+            try:
                 resp = await client.post(url, content=raw, headers=headers)
+            except Exception as e:
+                webhook_attempts.record(url, log_fields["payment_id"], event, attempt,
+                                        time.perf_counter() - started, error=f"{type(e).__name__}: {e}")
+                raise
+            webhook_attempts.record(url, log_fields["payment_id"], event, attempt,
+                                    time.perf_counter() - started, status_code=resp.status_code)
+            
+            if attempt > 0:
+                log.info("[webhook] 재시도 %d 성공: %s %d", attempt, url, resp.status_code,
+                         extra={**log_fields, "msg_type": "webhook.response", "attempt": attempt,
+                                "status_code": resp.status_code})
+            else:
+                log.info("[webhook] -> %s %d", url, resp.status_code,
+                         extra={**log_fields, "msg_type": "webhook.response", "attempt": attempt,
+                                "status_code": resp.status_code})
+            
+            # 응답 상태 코드 확인
+            if resp.status_code >= 400:
+                error_msg = f"HTTP {resp.status_code}: {resp.text}"
+                log.error("[webhook] HTTP 에러: %s %d - %s", url, resp.status_code, resp.text,
+                          extra={**log_fields, "attempt": attempt, "status_code": resp.status_code})
                 
-                if attempt > 0:
-                    log.info(f"[webhook] 재시도 {attempt} 성공: {url} {resp.status_code}")
-                else:
-                    log.info(f"[webhook] -> {url} {resp.status_code}")
+                # 4xx 에러는 재시도하지 않음 (클라이언트 에러)
+                if 400 <= resp.status_code < 500:
+                    raise WebhookRejected(error_msg)
                 
-                # 응답 상태 코드 확인
-                if resp.status_code >= 400:
-                    error_msg = f"HTTP {resp.status_code}: {resp.text}"
-                    log.error(f"[webhook] HTTP 에러: {url} {resp.status_code} - {resp.text}")
-                    
-                    # 4xx 에러는 재시도하지 않음 (클라이언트 에러)
-                    if 400 <= resp.status_code < 500:
-                        raise Exception(error_msg)
-                    
-                    # 5xx 에러는 재시도 가능
-                    last_exception = Exception(error_msg)
-                    if attempt < WEBHOOK_MAX_RETRIES:
-                        log.warning(f"[webhook] 서버 에러로 재시도 예정: {url} (시도 {attempt + 1}/{WEBHOOK_MAX_RETRIES + 1})")
-                        await asyncio.sleep(WEBHOOK_RETRY_DELAY * (2 ** attempt))  # 지수 백오프
-                        continue
-                    else:
-                        raise last_exception
+                # 5xx 에러는 재시도 가능
+                last_exception = Exception(error_msg)
+                if attempt < max_retries:
+                    log.warning("[webhook] 서버 에러로 재시도 예정: %s (시도 %d/%d)", url, attempt + 1, max_retries + 1,
+                                extra={**log_fields, "attempt": attempt})
+                    await asyncio.sleep(retry_delay * (2 ** attempt))  # 지수 백오프
+                    continue
                 else:
-                    # 성공
-                    return
-                    
+                    raise last_exception
+            else:
+                # 성공
+                return
+                
+        except WebhookRejected:
+            raise
+                
         except httpx.ConnectError as e:
             last_exception = Exception(f"연결 실패: {str(e)}")
-            log.error(f"[webhook] 연결 실패: {url} - {str(e)}")
+            log.error("[webhook] 연결 실패: %s - %s", url, e, extra={**log_fields, "attempt": attempt})
             
-            if attempt < WEBHOOK_MAX_RETRIES:
-                log.warning(f"[webhook] 연결 실패로 재시도 예정: {url} (시도 {attempt + 1}/{WEBHOOK_MAX_RETRIES + 1})")
-                await asyncio.sleep(WEBHOOK_RETRY_DELAY * (2 ** attempt))  # 지수 백오프
+            if attempt < max_retries:
+                log.warning("[webhook] 연결 실패로 재시도 예정: %s (시도 %d/%d)", url, attempt + 1, max_retries + 1,
+                            extra={**log_fields, "attempt": attempt})
+                await asyncio.sleep(retry_delay * (2 ** attempt))  # 지수 백오프
                 continue
             else:
                 raise last_exception
                 
         except httpx.TimeoutException as e:
             last_exception = Exception(f"타임아웃: {str(e)}")
-            log.error(f"[webhook] 타임아웃: {url} - {str(e)}")
+            log.error("[webhook] 타임아웃: %s - %s", url, e, extra={**log_fields, "attempt": attempt})
             
-            if attempt < WEBHOOK_MAX_RETRIES:
-                log.warning(f"[webhook] 타임아웃으로 재시도 예정: {url} (시도 {attempt + 1}/{WEBHOOK_MAX_RETRIES + 1})")
-                await asyncio.sleep(WEBHOOK_RETRY_DELAY * (2 ** attempt))  # 지수 백오프
+            if attempt < max_retries:
+                log.warning("[webhook] 타임아웃으로 재시도 예정: %s (시도 %d/%d)", url, attempt + 1, max_retries + 1,
+                            extra={**log_fields, "attempt": attempt})
+                await asyncio.sleep(retry_delay * (2 ** attempt))  # 지수 백오프
                 continue
             else:
                 raise last_exception
                 
         except Exception as e:
             last_exception = e
-            log.error(f"[webhook] 기타 에러: {url} - {str(e)}")
+            log.error("[webhook] 기타 에러: %s - %s", url, e, extra={**log_fields, "attempt": attempt})
             
-            if attempt < WEBHOOK_MAX_RETRIES:
-                log.warning(f"[webhook] 에러로 재시도 예정: {url} (시도 {attempt + 1}/{WEBHOOK_MAX_RETRIES + 1})")
-                await asyncio.sleep(WEBHOOK_RETRY_DELAY * (2 ** attempt))  # 지수 백오프
+            if attempt < max_retries:
+                log.warning("[webhook] 에러로 재시도 예정: %s (시도 %d/%d)", url, attempt + 1, max_retries + 1,
+                            extra={**log_fields, "attempt": attempt})
+                await asyncio.sleep(retry_delay * (2 ** attempt))  # 지수 백오프
                 continue
             else:
                 raise last_exception
     
     # 모든 재시도 실패
-    log.error(f"[webhook] 모든 재시도 실패: {url} (총 {WEBHOOK_MAX_RETRIES + 1}회 시도)")
+    log.error("[webhook] 모든 재시도 실패: %s (총 %d회 시도)", url, max_retries + 1, extra=log_fields)
     if last_exception is None:
         raise Exception("웹훅 전송 실패: 알 수 없는 오류")
     raise last_exception
@@ -0,0 +1,147 @@
+"""
+Payment Server 웹훅 서명기
+키별로 미리 초기화한 HMAC 상태를 복사해 서명하고, 키 파일 변경 시 재시작 없이 키를 교체합니다.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from typing import Dict, List
+
+from config.settings import (
+    WEBHOOK_SECRET, WEBHOOK_SECRET_ID, WEBHOOK_NEXT_SECRET, WEBHOOK_NEXT_SECRET_ID,
+    WEBHOOK_SECRETS_FILE, WEBHOOK_SECRETS_RELOAD_INTERVAL,
+)
+
+log = logging.getLogger("webhook_signer")
+
+
+class _SigningKey:
+    __slots__ = ("kid", "prefix", "state")
+
+    def __init__(self, kid: str, secret: str):
+        self.kid = kid
+        self.prefix = kid + "="
+        # 키 설정(ipad/opad 처리)까지 끝난 HMAC 상태 - 메시지마다 copy()해서 사용
+        self.state = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def sign(self, body: bytes) -> str:
+        mac = self.state.copy()
+        mac.update(body)
+        return base64.b64encode(mac.digest()).decode("ascii")
+
+
+class WebhookSigner:
+    """
+    웹훅 HMAC-SHA256 서명기
+
+    키 소스:
+    - secrets_file이 있으면 JSON 파일 {"current": {"kid", "secret"}, "next": {"kid", "secret"}}
+      (next는 선택). reload_interval초마다 mtime을 확인해 바뀌었으면 다시 읽습니다.
+    - 없으면 환경변수 PAYMENT_WEBHOOK_SECRET(+ PAYMENT_WEBHOOK_NEXT_SECRET)
+
+    키 교체 절차: next에 새 키 추가 -> 운영 서버가 새 키를 받아들이도록 배포 ->
+    새 키를 current로 올리고 next 제거. next가 있는 동안은 두 키의 서명을 모두 보냅니다.
+    current 없이 next만 설정하면 환경변수는 시작 시 ValueError, 키 파일은 오류 로그 후 기존 키를 유지합니다.
+    """
+
+    def __init__(
+        self,
+        secret: str = WEBHOOK_SECRET,
+        secret_id: str = WEBHOOK_SECRET_ID,
+        next_secret: str = WEBHOOK_NEXT_SECRET,
+        next_secret_id: str = WEBHOOK_NEXT_SECRET_ID,
+        secrets_file: str = WEBHOOK_SECRETS_FILE,
+        reload_interval: float = WEBHOOK_SECRETS_RELOAD_INTERVAL,
+    ):
+        self.secrets_file = secrets_file
+        self.reload_interval = reload_interval
+        self._keys: List[_SigningKey] = []
+        self._mtime: float | None = None
+        self._next_check = 0.0
+        if secrets_file:
+            self.reload()
+        else:
+            self._set_keys([(secret_id, secret), (next_secret_id, next_secret)])
+
+    def _set_keys(self, pairs: List[tuple]) -> None:
+        """
+        (kid, secret) 목록으로 키 설정 (current, next 순)
+        current 없이 next만 있으면 next가 current로 올라가 아직 새 키를 모르는 수신 측이 모든 웹훅을 거절하므로 ValueError
+        """
+        (current_kid, current_secret), *others = pairs
+        if not current_secret and any(secret for _, secret in others):
+            raise ValueError(
+                f"다음 웹훅 키({', '.join(kid for kid, secret in others if secret)})만 있고 현재 키({current_kid})가 없습니다 - "
+                "PAYMENT_WEBHOOK_SECRET(키 파일의 current)을 설정하세요"
+            )
+        self._keys = [_SigningKey(kid, secret) for kid, secret in pairs if secret]
+
+    @property
+    def key_ids(self) -> List[str]:
+        """서명에 쓰는 키 ID (current, next 순)"""
+        return [key.kid for key in self._keys]
+
+    def reload(self) -> bool:
+        """키 파일 다시 읽기 (mtime이 바뀐 경우만), 키가 바뀌었으면 True"""
+        try:
+            mtime = os.stat(self.secrets_file).st_mtime
+        except OSError as e:
+            if self._mtime is None:
+                log.error("웹훅 키 파일을 읽을 수 없습니다: %s - %s", self.secrets_file, e)
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.secrets_file, encoding="utf-8") as f:
+                data = json.load(f)
+            pairs = [(data["current"]["kid"], data["current"]["secret"])]
+            if data.get("next"):
+                pairs.append((data["next"]["kid"], data["next"]["secret"]))
+            self._set_keys(pairs)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # 잘못된 파일이면 기존 키 유지 (다음 변경 때 다시 시도)
+            log.error("웹훅 키 파일 형식 오류, 기존 키 유지: %s - %s", self.secrets_file, e)
+            self._mtime = mtime
+            return False
+        self._mtime = mtime
+        log.info("웹훅 서명 키 로드: %s", ", ".join(self.key_ids))
+        return True
+
+    def _maybe_reload(self) -> None:
+        if not self.secrets_file:
+            return
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.reload_interval
+            self.reload()
+
+    def _active_keys(self) -> List[_SigningKey]:
+        self._maybe_reload()
+        if not self._keys:
+            raise RuntimeError("PAYMENT_WEBHOOK_SECRET(.env) 또는 WEBHOOK_SECRETS_FILE이 설정되어야 합니다.")
+        return self._keys
+
+    def signature(self, body: bytes) -> str:
+        """현재 키 서명 (HMAC-SHA256 Base64)"""
+        return self._active_keys()[0].sign(body)
+
+    def headers(self, body: bytes) -> Dict[str, str]:
+        """
+        서명 헤더
+            X-Payment-Signature: 현재 키 서명 (기존 수신 측 호환)
+            X-Payment-Signatures: "kid=서명, kid=서명" (현재 + 다음 키, 첫 '='까지가 kid)
+        """
+        keys = self._active_keys()
+        current = keys[0].sign(body)
+        signatures = keys[0].prefix + current
+        for key in keys[1:]:
+            signatures += ", " + key.prefix + key.sign(body)
+        return {"X-Payment-Signature": current, "X-Payment-Signatures": signatures}
+
+
+# 전역 웹훅 서명기 인스턴스
+webhook_signer = WebhookSigner()